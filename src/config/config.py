@@ -1,6 +1,77 @@
 # API_KEY = "your_api_key_here"
 BASE_URL = "https://fantasy.premierleague.com/api/" # base url for all FPL API endpoints
 
+API_CACHE = {
+    "offline": False, # serve every fetch_data_from_api call from the on-disk cache only, without touching the network
+    "max_entries": 2000, # least recently used endpoints are evicted beyond this
+    "default_ttl": 300, # seconds a response is served from disk before being revalidated, for endpoints not listed below
+    "ttls": {
+        "bootstrap-static/": 300,
+        "fixtures/": 600,
+        "leagues-classic/": 900,
+        "entry/": 300,
+        "element-summary/": 1800,
+        "event/": 60,
+    },
+    "pool_maxsize": 16,
+    "request_timeout": 30,
+}
+
+# endpoints whose responses are memoized for the duration of one pipeline run, identical requests being collapsed into one
+RUN_MEMOIZED_ENDPOINTS = [
+    r"^entry/\d+$",
+    r"^entry/\d+/event/\d+/picks$",
+]
+
+# adaptive per-host concurrency shared by every FPL / Understat client: +1 slot after a window of healthy responses, cut by
+# decrease_factor on a 429 / 5xx / connection error (at most once per decrease_cooldown seconds). Host entries override "default".
+RATE_CONTROL = {
+    "default": {
+        "initial_limit": 4,
+        "min_limit": 1,
+        "max_limit": 32,
+        "decrease_factor": 0.5,
+        "decrease_cooldown": 5.0,
+        "max_retries": 3, # retries of a throttled request, for clients without their own retry policy
+        "backoff_base": 1.0, # seconds, doubled on every retry (jittered)
+        "backoff_cap": 60.0,
+    },
+    "understat.com": {
+        "max_limit": 16,
+        "backoff_base": 2.0,
+    },
+}
+
+OWNERSHIP_FETCH_CONCURRENCY = 8 # simultaneous entry/picks/standings requests when aggregating beacon and league ownership
+
+UNDERSTAT_PLAYER_INGESTION = {
+    "max_concurrency": 8, # players fetched at once, each sending its shot and match requests together
+    "checkpoint_every": 25, # players completed between checkpoint writes
+}
+
+PLAYER_NAME_MATCHING = {
+    "min_score": 0.6, # lowest name similarity (0 to 1) accepted as an FPL <-> understat player match
+    "min_margin": 0.05, # lowest lead over the next best FPL player, closer calls go to the overrides file for review
+    "confident_margin": 0.2, # lead over the next best FPL player from which a match gets full confidence, narrower leads scale it down
+}
+
+UNDERSTAT_TEAM_CONCURRENCY = 10 # pooled connections shared by the team stats/results requests
+
+MASTER_SUMMARY_SOURCE = "element_summary" # "element_summary" (one request per player) or "event_live" (one request per gameweek)
+
+ELEMENT_SUMMARY_CRAWLER = {
+    "max_concurrency": 16, # simultaneous element-summary requests in flight
+    "connection_limit": 32, # size of the pooled aiohttp connector shared by the crawl
+    "request_timeout": 30, # seconds before a single request is abandoned
+    "max_retries": 5, # retries per player before it is reported as failed
+    "retry_budget": 250, # retries allowed across the whole crawl
+    "backoff_base": 1.0, # seconds, doubled on every attempt before jitter is applied
+    "backoff_cap": 60.0, # upper bound in seconds for a single backoff sleep
+}
+
+# bootstrap-static element fields compared against the last sync to decide whether a stored element summary needs refetching
+ELEMENT_SUMMARY_FRESHNESS_FIELDS = ['event_points', 'total_points', 'minutes', 'transfers_in_event', 'transfers_out_event', 'news', 'status', 'now_cost', 'chance_of_playing_next_round']
+
 TEAM_COLOR_SCHEMES = {
     'ARS': {'bg': (206, 78, 95), 'text': (255, 255, 255), 'line':(212, 0, 0)},
     'AVL': {'bg': (133, 60, 83), 'text': (207, 200, 99), 'line':(133, 60, 83)},
@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import time
+import atexit
+import hashlib
+import threading
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.functions.data_exporter import output_data_to_json
+from src.functions.rate_controller import grab_rate_controller, record_requests_response
+
+class APIResponseCache:
+    """
+    On-disk cache of API responses keyed by endpoint, sitting in front of a pooled requests session.
+
+    A response younger than its endpoint's TTL is served straight from disk. Once it is older, the request is revalidated with
+    If-None-Match / If-Modified-Since so an unchanged resource costs a 304 rather than a full payload. The number of cached
+    endpoints is capped, evicting the least recently used. In offline mode responses are only ever served from disk. Requests
+    go through the host's shared rate controller, and throttled ones (429 / 5xx / connection errors) are retried with backoff.
+
+    The index (validators, fetch and access times) is kept in memory and only written out on eviction and by save_index, which
+    runs at the end of a fetch run and at exit. Files are written aside and swapped in with os.replace, so concurrent fetches
+    of the same endpoint or an interrupted run never leave a truncated file behind.
+    """
+
+    def __init__(self, cache_dir: str, ttls: dict, default_ttl: int = 300, max_entries: int = 2000, offline: bool = False, pool_maxsize: int = 16, request_timeout: int = 30):
+        self.cache_dir = cache_dir
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.offline = offline
+        self.request_timeout = request_timeout
+        self.index_path = f"{cache_dir}/index.json"
+        self.index = self._load_index()
+        self._index_changed = False
+        self._lock = threading.Lock()
+        atexit.register(self.save_index)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Accept': 'application/json'})
+        self.session.hooks['response'].append(record_requests_response)
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, 'r') as file:
+            return json.load(file)
+
+    def save_index(self):
+        """Write the index to disk if it has changed since it was last written."""
+        with self._lock:
+            if self._index_changed:
+                self._write_json(self.index, self.index_path)
+                self._index_changed = False
+
+    @staticmethod
+    def _write_json(data, file_path: str):
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp" # Unique per writer, so concurrent writes never share a temp file
+        output_data_to_json(data, temp_path)
+        os.replace(temp_path, file_path)
+
+    def _grab_payload_path(self, endpoint: str):
+        return f"{self.cache_dir}/{hashlib.sha1(endpoint.encode()).hexdigest()}.json"
+
+    def grab_ttl(self, endpoint: str):
+        """Return the TTL (seconds) of the longest configured prefix matching the endpoint, or the default TTL."""
+        matching_prefixes = [prefix for prefix in self.ttls if endpoint.startswith(prefix)]
+        return self.ttls[max(matching_prefixes, key=len)] if matching_prefixes else self.default_ttl
+
+    def fetch(self, endpoint: str, url: str):
+        """
+        Fetch the JSON payload of an endpoint, from disk if it is still fresh, otherwise through a conditional request.
+
+        Parameters:
+        - endpoint (str): Endpoint relative to the API base url, used as the cache key
+        - url (str): Full url of the endpoint
+
+        Returns:
+        - dict or list: Parsed JSON payload.
+        """
+        endpoint = endpoint.strip('/') + '/'
+        entry = self.index.get(endpoint)
+        payload_path = self._grab_payload_path(endpoint)
+        if entry is not None and not os.path.exists(payload_path):
+            entry = None
+
+        if entry is not None and (self.offline or time.time() - entry['fetched_at'] < self.grab_ttl(endpoint)):
+            return self._read_payload(endpoint, entry)
+        if self.offline:
+            raise ConnectionError(f"Offline mode: no cached response for '{endpoint}'.")
+
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        response = self._send_throttled(url, headers)
+        if response.status_code == 304 and entry is not None:
+            with self._lock:
+                entry['fetched_at'] = time.time()
+            return self._read_payload(endpoint, entry)
+        response.raise_for_status()
+
+        payload = response.json()
+        self._write_json(payload, payload_path)
+        with self._lock:
+            self.index[endpoint] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+                'last_accessed': time.time(),
+            }
+            self._index_changed = True
+            self._evict_least_recently_used()
+        return payload
+
+    def _send_throttled(self, url: str, headers: dict):
+        """Send a GET within a slot of the host's rate controller, retrying throttled requests until the controller's max_retries."""
+        rate_controller = grab_rate_controller(url)
+        for attempt in range(rate_controller.max_retries + 1):
+            try:
+                with rate_controller.slot():
+                    response = self.session.get(url, headers=headers, timeout=self.request_timeout)
+                if not rate_controller.is_throttle(response.status_code) or attempt == rate_controller.max_retries:
+                    return response
+            except (requests.ConnectionError, requests.Timeout):
+                rate_controller.record(None)
+                if attempt == rate_controller.max_retries:
+                    raise
+            time.sleep(rate_controller.backoff_delay(attempt))
+
+    def _read_payload(self, endpoint: str, entry: dict):
+        with open(self._grab_payload_path(endpoint), 'r') as file:
+            payload = json.load(file)
+        with self._lock:
+            entry['last_accessed'] = time.time()
+            self._index_changed = True
+        return payload
+
+    def _evict_least_recently_used(self):
+        """Drop the least recently used entries beyond max_entries, persisting the index so it never lists deleted payloads. Caller holds the lock."""
+        excess = len(self.index) - self.max_entries
+        if excess <= 0:
+            return
+        for endpoint, _ in sorted(self.index.items(), key=lambda x: x[1]['last_accessed'])[:excess]:
+            payload_path = self._grab_payload_path(endpoint)
+            if os.path.exists(payload_path):
+                os.remove(payload_path)
+            del self.index[endpoint]
+        self._write_json(self.index, self.index_path)
+        self._index_changed = False
+
+class RequestCoalescer:
+    """
+    Memo of endpoint payloads scoped to a single pipeline run. Identical requests for endpoints matching one of the given patterns
+    are collapsed: a completed request is answered from memory, and a request still in flight is waited on rather than re-sent,
+    including from other worker threads.
+    """
+
+    def __init__(self, endpoint_patterns: list):
+        self.endpoint_patterns = [re.compile(pattern) for pattern in endpoint_patterns]
+        self.stats = {'hits': 0, 'in_flight_hits': 0, 'misses': 0}
+        self._requests = {}
+        self._lock = threading.Lock()
+
+    def handles(self, endpoint: str):
+        return any(pattern.match(endpoint.strip('/')) for pattern in self.endpoint_patterns)
+
+    def _claim(self, endpoint: str):
+        """Return the (possibly pending) future for an endpoint, and whether the caller is responsible for resolving it."""
+        key = endpoint.strip('/')
+        with self._lock:
+            request = self._requests.get(key)
+            if request is None:
+                self.stats['misses'] += 1
+                self._requests[key] = Future()
+                return self._requests[key], True
+            self.stats['hits' if request.done() else 'in_flight_hits'] += 1
+            return request, False
+
+    def _release_failed(self, endpoint: str, request: Future, error: Exception):
+        with self._lock:
+            self._requests.pop(endpoint.strip('/'), None) # Failures are not memoized, the next caller retries
+        request.set_exception(error)
+
+    def fetch(self, endpoint: str, fetch_fn):
+        """
+        Parameters:
+        - endpoint (str): Endpoint used as the memo key
+        - fetch_fn (callable): Performs the request when the endpoint has not been requested yet this run
+
+        Returns:
+        - Payload of the endpoint.
+        """
+        request, is_owner = self._claim(endpoint)
+        if is_owner:
+            try:
+                request.set_result(fetch_fn())
+            except Exception as e:
+                self._release_failed(endpoint, request, e)
+                raise
+        return request.result()
+
+    def describe(self):
+        total = sum(self.stats.values())
+        saved = self.stats['hits'] + self.stats['in_flight_hits']
+        return f"{saved}/{total} requests served from the run memo ({self.stats['hits']} completed, {self.stats['in_flight_hits']} in flight), {self.stats['misses']} sent"
@@ -7,12 +7,16 @@ import os
 import json
 
 from src.functions.generated_helper_fns import FPLDataConsolidationInterpreter, UnderstatDataInterpreter
+from src.functions.elo_engine import BatchEloEngine, IncrementalEloTracker, gather_windows
+from src.functions.data_exporter import grab_path_relative_to_root
 
 helper_fns_fpl = FPLDataConsolidationInterpreter()
 
 class FPLDataAnalytics():
     def __init__(self):
         self.helper_fns = helper_fns_fpl
+        self.elo_engine = BatchEloEngine()
+        self.elo_tracker = self._initialize_elo_tracker()
         # self.personal_team_df = self.compile_fpl_team() #df_out
         self.personal_team_data = self._compile_personal_team_data() #df_fpl
         self.replacement_players = self._compile_prospects()
@@ -30,317 +34,158 @@ class FPLDataAnalytics():
 #========================================================== ELO RANKINGS ==========================================================
 #==================================================================================================================================
 
-    def _calculate_expected_score(self, player_score, average_score):
-        """Calculate the expected score based on player's score and average score."""
-        return player_score / average_score
-
-    def _update_elo(self, current_rating, player_score, average_score, k_factor=30, weight=1, adjustment_factor=0):
-        """Update the Elo rating based on a single round's score."""
-        expected_score = self._calculate_expected_score(player_score, average_score) # Apply penalty if the score is in the "Bad" bin
-        new_rating = current_rating + k_factor * (player_score - expected_score) * weight + adjustment_factor
-        return new_rating
-
-    def _bin_score(self, score):
-        """Bin the score into categories."""
-        if score < 4:
-            return 1  # Bad
-        elif 4 <= score <= 6:
-            return 2  # Average
-        elif 7 <= score <= 9:
-            return 3  # Good
-        else:
-            return 4  # Excellent
-
-    def _update_elo_with_fdr(self, current_rating, player_score, average_score, fdr, home_away, k_factor=30, weight=1, adjustment_factor=0):
-        """Update the Elo rating considering Fixture Difficulty Rating (FDR) and home/away status."""
-        expected_score = self._calculate_expected_score(player_score, average_score)
-        
-        # Determine home/away factor
-        home_away_factor = 0 if home_away == 1 else 200 if home_away == 0 else 0
-        
-        # Calculate FDR adjustment
-        fdr_adjustment = self._calculate_fdr_adjustment(fdr, home_away_factor)
-        
-        # Update new rating with both adjustments
-        new_rating = current_rating + k_factor * (player_score - expected_score) * weight + adjustment_factor + fdr_adjustment
-        return new_rating
-
-    def _calculate_fdr_adjustment(self, fdr, home_away_factor=0, base_adjustment=20):
+    def _initialize_elo_tracker(self):
         """
-        Calculate the adjustment factor based on Fixture Difficulty Rating (FDR).
-        
-        Parameters:
-        - fdr: The Fixture Difficulty Rating for the upcoming fixture.
-        - home_away_factor: Adjustment based on whether the match is home or away.
-        - base_adjustment: The base adjustment value to apply (default is 5).
-        
-        Returns:
-        - adjustment: The calculated adjustment factor based on FDR.
+        Load the per-player Elo state saved by previous runs and advance it through the gameweeks whose data has been checked since,
+        saving it back. Gameweeks still being played are left out of the saved state (their points can change) and replayed on demand.
         """
-        # Adjustments can be positive or negative based on FDR and home/away factor
-        adjustment = base_adjustment * (fdr - 3) + home_away_factor
-        return adjustment
-
-    def _calculate_current_elo(self, scores, average_scores, fdrs, h_a, initial_rating):
-        """Calculate the current Elo rating based on scores from all rounds."""
-        weights = [2.5, 2.0, 1.5, 1.0, 0.8, 0.5]
-        
-        current_rating = initial_rating
-        adjustment_factor = 0
-        consecutive_bad_count = 0
-        consecutive_good_count = 0
-        # print(f"{scores} {average_scores}")
-        for i in range(len(scores)):
-            player_score = scores[i]
-            weight = weights[i] if i < len(weights) else 0.5  # Default weight for older scores
-            
-            # Determine the bin of the current score
-            current_bin = self._bin_score(player_score)
-        
-            # Adjust adjustment factor based on current bin
-            if current_bin == 1:
-                # Increment consecutive bad count and apply negative adjustment
-                consecutive_bad_count += 1
-                if consecutive_bad_count >= 2: consecutive_good_count = 0
-                # Penalty increases with consecutive bad scores; more for recent ones
-                penalty = (-1*4**consecutive_bad_count) * (1 + (len(scores) - i) / len(scores))  # More penalty for recent bad scores
-                adjustment_factor += penalty
-                
-            elif current_bin == 2:
-                # Reset consecutive bad count and increase good count
-                consecutive_bad_count = 0
-                consecutive_good_count += 1
-                
-                # Increase bonus for good performances (average)
-                adjustment_factor += min(2**consecutive_good_count, 2000)  # Cap bonus to +20
-                
-            elif current_bin == 3:
-                # Reset bad count and increase good count
-                consecutive_bad_count = 0
-                consecutive_good_count += 1
-                
-                # Increase bonus for excellent performances
-                adjustment_factor += min(4**consecutive_good_count, 2000)  # Cap bonus to +30
-                
-            elif current_bin == 4:
-                # Reset bad count and increase good count
-                consecutive_bad_count = 0
-                consecutive_good_count += 1
-                
-                # Increase bonus for excellent performances
-                adjustment_factor += min(8**consecutive_good_count, 2000)  # Cap bonus to +30
-                
-            current_rating = self._update_elo_with_fdr(current_rating, player_score, average_scores[i], fdrs[i], h_a[i], weight=weight, adjustment_factor=adjustment_factor)
-        
-        return current_rating
+        season = self.helper_fns.season_year_span_id
+        file_path = f"{grab_path_relative_to_root(f'cached_data/fpl/{season}', absolute=True, create_if_nonexistent=True)}/elo_state_{season}.npz"
+        player_stat_store = self.helper_fns.player_stat_store
+        fdr_matrix = self.helper_fns.grab_history_fdr_matrix(np.arange(len(player_stat_store.player_ids)))
+        elo_tracker = IncrementalEloTracker.load(file_path, player_stat_store, fdr_matrix, engine=self.elo_engine)
+        checked_gw = max((x['id'] for x in self.helper_fns.raw_data['events'] if x['data_checked']), default=0)
+        if checked_gw > elo_tracker.latest_gameweek:
+            print(f"Advancing Elo state from GW {elo_tracker.latest_gameweek} to GW {checked_gw}.")
+            elo_tracker.advance(checked_gw)
+            elo_tracker.save(file_path)
+        return elo_tracker
 
     def score_players_on_form(self, list_of_ids: list, lookback_period: int) -> dict:
         
-        full_data = self.helper_fns.compile_player_data(list_of_ids)
+        player_stat_store = self.helper_fns.player_stat_store
+        requested_ids = set(list_of_ids)
+
+        player_ids = [x for x in player_stat_store.player_ids.tolist() if x in requested_ids]
+        rows = np.array([player_stat_store.player_rows[x] for x in player_ids], dtype=np.intp)
+        points = player_stat_store.stat_matrix('total_points')[rows]
+        fdrs = self.helper_fns.grab_history_fdr_matrix(rows)
+        h_a = player_stat_store.stat_matrix('was_home')[rows]
+        lengths = player_stat_store.lengths[rows].astype(np.int64)
+        initial_elo = 500
+        average_score = 6
+
+        # Split each history at len - lookback_period, with list slicing semantics (a negative split counts from the end)
+        split = lengths - lookback_period
+        split = np.where(split >= 0, split, np.maximum(0, lengths + split))
+        elo_prior_to_lookback = self.elo_tracker.ratings_over_first_entries(rows, split)
+        present_lengths = lengths - split
+        present_elo = self.elo_engine.rate(
+            gather_windows(points, split, present_lengths),
+            average_score,
+            gather_windows(fdrs, split, present_lengths, fill_value=0),
+            gather_windows(h_a, split, present_lengths),
+            present_lengths,
+            initial_elo
+        )
+        final_elo_weighted = 0.9*present_elo + 0.1*elo_prior_to_lookback
 
         player_ratings = {}
-        for player_id, player_data in full_data.items():
-            points = [x[1] for x in player_data['total_points']]
-            fdrs = [self.helper_fns.team_rank(x[1]) for x in player_data['opponent_team']]
-            h_a = [x[1] for x in player_data['was_home']]
-            initial_elo = 500
-            average_scores = [6]*len(points)
-            # print(f"TEMP: {points} {average_scores}")
-            # current_elo_after_round_4 = 0
-            elo_prior_to_lookback = self._calculate_current_elo(
-                points[:(len(points)-lookback_period)],
-                average_scores[:(len(points)-lookback_period)],
-                fdrs[:(len(points)-lookback_period)],
-                h_a[:(len(points)-lookback_period)],
-                initial_elo
-            )
-            present_elo = self._calculate_current_elo(
-                points[(len(points)-lookback_period):],
-                average_scores[(len(points)-lookback_period):],
-                fdrs[(len(points)-lookback_period):],
-                h_a[(len(points)-lookback_period):],
-                initial_elo
-            )
-            final_elo_weighted = 0.9*present_elo + 0.1*elo_prior_to_lookback
-            # print(f"{player_id} {points} {average_scores} {current_elo_after_round_4} {final_elo}")
+        for player_id, prior, present, final in zip(player_ids, elo_prior_to_lookback.tolist(), present_elo.tolist(), final_elo_weighted.tolist()):
             player_ratings[player_id] = {
                 'initial_elo': round(initial_elo,2),
-                'elo_prior_to_lookback': round(elo_prior_to_lookback,2),
-                'present_elo': round(present_elo,2),
-                'final_elo_weighted': round(final_elo_weighted,2)
+                'elo_prior_to_lookback': round(prior,2),
+                'present_elo': round(present,2),
+                'final_elo_weighted': round(final,2)
             }
         return dict(sorted(player_ratings.items(), key=lambda x: x[1]['present_elo'], reverse=True))
 
 #========================================================== FIXTURE RANKINGS ==========================================================
 
-    def _calculate_fixture_score(self, past_data, future_data, weights={'w1':0.7, 'w2':0.2, 'w3':0.1}, gains={'fdr':100}):
+    def _compile_future_fixture_arrays(self, player_ids: list, games_ahead: int):
         """
-        Calculate the base score based on Fixture Difficulty Rating (FDR).
-        
-        Parameters:
-        - fdr: The Fixture Difficulty Rating for the fixture (1 to 5).
-        
-        Returns:
-        - base_score: The calculated base score (0 to 100).
+        Upcoming fixtures of every player's team over the next games_ahead gameweeks, gathered from the fixture calendar in one go and
+        flattened to players x fixture slots: is_home (1 home, 0 away, -1 no fixture) and difficulty.
         """
-        #============== PAST ==============
-        ppg_data = self._calculate_ppg_stats(past_data)
-        # print(f"ppg_data: {ppg_data}")
-        fdr_data_past = self._calculate_fdr_stats(past_data['fdr'], past_data['h_a'])
-        history_index_data = self._calculate_history_index_stats(ppg_data, fdr_data_past)
-        # print(f"fdr_data_past: {fdr_data_past}")
-        #============== PRESENT ==============
-        fdr_data_future = self._calculate_fdr_stats(future_data['fdr'], future_data['h_a'])
-        # print(f"fdr_data_future: {fdr_data_future}")
-        round_score = 0
-        for h_a, fdr_data in fdr_data_future.items():
-            # history_index_factor = history_index_data[h_a]['base_factor']*history_index_data[h_a]['sig_fdr']
-            round_score += weights['w1']*gains['fdr']*(1-(fdr_data['avg']/5)) + weights['w2']*history_index_data[h_a]['base_factor'] + weights['w3']*history_index_data[h_a]['player_factor']
-        return round_score
-
-    def _calculate_history_index_stats(self, ppg_data, fdr_data_past, gains={'k_base':100, 'k_plyr':100}):
+        reference_gw = self.helper_fns.latest_gw or 0
+        team_ids = [self.helper_fns.bootstrap_index.element(x)['team'] for x in player_ids]
+        _, is_home, difficulty, _ = self.helper_fns.fixture_calendar.gather(team_ids, reference_gw + 1, reference_gw + games_ahead)
+        flat_shape = (len(player_ids), is_home.shape[1] * is_home.shape[2]) # Explicit, as -1 cannot be inferred for no players
         return {
-            'h': {
-                'base_factor': gains['k_base']*ppg_data['h']['team']/(ppg_data['a']['team'] + ppg_data['h']['team']) if ((ppg_data['h']['team']>0) and (ppg_data['a']['team']>0)) else 0,
-                'player_factor': gains['k_plyr']*ppg_data['h']['player']/(ppg_data['a']['player'] + ppg_data['h']['player']) if ((ppg_data['h']['player']>0) and (ppg_data['a']['player']>0)) else 0,
-                'sig_fdr': 1-(fdr_data_past['h']['avg']/5),
-            },
-            'a': {
-                'base_factor': gains['k_base']*ppg_data['a']['team']/(ppg_data['a']['team'] + ppg_data['h']['team']) if ((ppg_data['h']['team']>0) and (ppg_data['a']['team']>0)) else 0,
-                'player_factor': gains['k_plyr']*ppg_data['a']['player']/(ppg_data['a']['player'] + ppg_data['h']['player']) if ((ppg_data['h']['player']>0) and (ppg_data['a']['player']>0)) else 0,
-                'sig_fdr': 1-(fdr_data_past['a']['avg']/5),
-            }
+            'is_home': is_home.reshape(flat_shape),
+            'fdr': difficulty.reshape(flat_shape).astype(np.int64),
         }
 
-    def _calculate_fdr_stats(self, fdrs, h_a_s):
-        # print(f"FDRS: {fdrs}")
-        # print(f"h_a_s: {h_a_s}")
-        fdr_h = [fdr for fdr, h_a in zip(fdrs, h_a_s) if h_a[-1] == 1]
-        fdr_a = [fdr for fdr, h_a in zip(fdrs, h_a_s) if h_a[-1] == 0]
-        return {
-            'h': {
-                'data': fdr_h,
-                'avg': np.mean([x[-1] for x in fdr_h]),
-                'sum': np.sum([x[-1] for x in fdr_h])
-            },
-            'a': {
-                'data': fdr_a,
-                'avg': np.mean([x[-1] for x in fdr_a]),
-                'sum': np.sum([x[-1] for x in fdr_a])
-            }
+    def _compile_past_fixture_arrays(self, player_ids: list):
+        """
+        History of every player as players x entries arrays aligned with player_stat_store: was_home, team scores (NaN where unknown),
+        total_points and an in_history mask. Players without history get empty rows.
+        """
+        player_stat_store = self.helper_fns.player_stat_store
+        known = np.array([x in player_stat_store for x in player_ids], dtype=bool)
+        rows = np.array([player_stat_store.player_rows[x] for x in player_ids if x in player_stat_store], dtype=np.intp)
+        num_entries = player_stat_store.rounds.shape[1]
+        past_data = {
+            'in_history': np.zeros((len(player_ids), num_entries), dtype=bool),
+            **{stat_name: np.full((len(player_ids), num_entries), np.nan) for stat_name in ['was_home', 'team_h_score', 'team_a_score', 'total_points']}
         }
+        past_data['in_history'][known] = np.arange(num_entries) < player_stat_store.lengths[rows][:, None]
+        for stat_name in ['was_home', 'team_h_score', 'team_a_score', 'total_points']:
+            past_data[stat_name][known] = self.helper_fns.grab_history_matrix(rows, stat_name)
+        return past_data
 
-    def _calculate_ppg_stats(self, matches):
+    def _calculate_ppg_arrays(self, past_data: dict):
+        """
+        Home and away points per game of every player's team (3 for a win, 1 for a draw, entries without both scores skipped) and of
+        the player themselves, as arrays aligned with the players of past_data.
         """
-        Calculate the home and away performance metrics for a team.
+        in_history = past_data['in_history']
+        team_h_score, team_a_score = past_data['team_h_score'], past_data['team_a_score']
+        is_h = in_history & (past_data['was_home'] == 1)
+        is_a = in_history & (past_data['was_home'] == 0)
+        has_score = ~np.isnan(team_h_score) & ~np.isnan(team_a_score)
+        team_match_pts = np.where((is_h & (team_h_score > team_a_score)) | (is_a & (team_a_score > team_h_score)), 3, np.where(team_h_score == team_a_score, 1, 0))
+
+        ppg_data = {}
+        for h_a, is_side in (('h', is_h), ('a', is_a)):
+            team_games = (is_side & has_score).sum(axis=1)
+            team_pts = np.where(is_side & has_score, team_match_pts, 0).sum(axis=1)
+            plyr_games = is_side.sum(axis=1)
+            plyr_pts = np.where(is_side, past_data['total_points'], 0).sum(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ppg_data[h_a] = {
+                    'team': np.where(team_games > 0, team_pts / team_games, 0),
+                    'player': np.where(plyr_games > 0, plyr_pts / plyr_games, 0),
+                }
+        return ppg_data
 
-        Parameters:
-        - matches: A list of dictionaries containing match results.
+    def _calculate_fixture_scores(self, past_data: dict, future_data: dict, weights={'w1':0.7, 'w2':0.2, 'w3':0.1}, gains={'fdr':100, 'k_base':100, 'k_plyr':100}):
+        """
+        Score every player's upcoming fixtures from aligned arrays: upcoming home and away FDR averages against the home/away split
+        of their team's and their own points per game.
 
         Returns:
-        - home_performance: Average points per game at home.
-        - away_performance: Average points per game away.
+        - np.ndarray: Fixture score per player (NaN where the player has no upcoming home or no upcoming away fixture).
         """
-        #============== TEAM ==============
-        team_pts_h = 0
-        team_pts_a = 0
-        team_games_h = 0
-        team_games_a = 0
-
-        def tabulate_match_points(team_a_score, team_h_score, h_a):
-            if (h_a == 1 and team_h_score > team_a_score) or (h_a == 0 and team_a_score > team_h_score):
-                return 3
-            elif team_h_score == team_a_score:
-                return 1
-            else:
-                return 0
-        
-        for i in range(0, len(matches['h_a'])):
-            try:
-                team_match_pts = tabulate_match_points(matches['team_a_score'][i][-1], matches['team_h_score'][i][-1], matches['h_a'][i][-1])
-            except:
-                continue
-            if matches['h_a'][i][-1] == 1:
-                team_pts_h += team_match_pts
-                team_games_h += 1
-            elif matches['h_a'][i][-1] == 0:
-                team_pts_a += team_match_pts
-                team_games_a += 1
-
-        team_ppg_h = team_pts_h / team_games_h if team_games_h > 0 else 0
-        team_ppg_a = team_pts_a / team_games_a if team_games_a > 0 else 0
-        
-        #============== PLAYER ==============
-        plyr_pts_h = 0
-        plyr_pts_a = 0
-        plyr_games_h = 0
-        plyr_games_a = 0
-        
-        for i in range(0, len(matches['h_a'])):
-            player_match_pts = matches['total_points'][i][-1]
-            if matches['h_a'][i][-1] == 1:
-                plyr_pts_h += player_match_pts
-                plyr_games_h += 1
-            elif matches['h_a'][i][-1] == 0:
-                plyr_pts_a += player_match_pts
-                plyr_games_a += 1
-
-        plyr_ppg_h = plyr_pts_h / plyr_games_h if plyr_games_h > 0 else 0
-        plyr_ppg_a = plyr_pts_a / plyr_games_a if plyr_games_a > 0 else 0
-        
-        return {
-            'h': {
-                'team': team_ppg_h,
-                'player': plyr_ppg_h
-            },
-            'a': {
-                'team': team_ppg_a,
-                'player': plyr_ppg_a
-            },
-        }
+        ppg_data = self._calculate_ppg_arrays(past_data)
+        round_score = 0
+        for h_a, is_home in (('h', 1), ('a', 0)):
+            other = 'a' if h_a == 'h' else 'h'
+            is_side = future_data['is_home'] == is_home
+            with np.errstate(divide='ignore', invalid='ignore'):
+                fdr_avg = np.where(is_side, future_data['fdr'], 0).sum(axis=1) / is_side.sum(axis=1)
+                base_factor = np.where((ppg_data[h_a]['team'] > 0) & (ppg_data[other]['team'] > 0),
+                                       gains['k_base']*ppg_data[h_a]['team']/(ppg_data['a']['team'] + ppg_data['h']['team']), 0)
+                player_factor = np.where((ppg_data[h_a]['player'] > 0) & (ppg_data[other]['player'] > 0),
+                                         gains['k_plyr']*ppg_data[h_a]['player']/(ppg_data['a']['player'] + ppg_data['h']['player']), 0)
+            round_score = round_score + (weights['w1']*gains['fdr']*(1-(fdr_avg/5)) + weights['w2']*base_factor + weights['w3']*player_factor)
+        return round_score
 
     def score_players_on_fixtures(self, list_of_ids: list, lookback_period: int) -> dict:
-        
-        gameweek_data = self.helper_fns.grab_upcoming_fixtures(list_of_ids, games_ahead=lookback_period)
-        full_data = {
-            key: {
-                'opponent_teams': [d['opponent_team'] for d in value if d['opponent_team'] is not None], 
-                'fdrs': [(d['gameweek'], self.helper_fns.team_rank(d['opponent_team'])) for d in value if d['opponent_team'] is not None], 
-                'is_home': [(d['gameweek'], d['is_home']) for d in value if d['is_home'] is not None]
-            } for key, value in gameweek_data.items()
+        """
+        Score every player on their next lookback_period gameweeks of fixtures, in one pass over aligned arrays (see
+        _calculate_fixture_scores). Players without any upcoming fixture in the window score None.
+        """
+        player_ids = sorted(set(list_of_ids))
+        future_data = self._compile_future_fixture_arrays(player_ids, games_ahead=lookback_period)
+        past_data = self._compile_past_fixture_arrays(player_ids)
+        fixture_scores = self._calculate_fixture_scores(past_data, future_data)
+        has_fixtures = (future_data['is_home'] >= 0).any(axis=1)
+
+        player_ratings = {
+            int(player_id): {'score': round(fixture_score, 3) if has_fixture else None}
+            for player_id, fixture_score, has_fixture in zip(player_ids, fixture_scores.tolist(), has_fixtures.tolist())
         }
-
-        historical_data = self.helper_fns.compile_player_data(list_of_ids)
-        
-        player_ratings = {}
-        for player_id, player_fixture_data in full_data.items():
-        
-            home_away_info = player_fixture_data['is_home']
-            difficulty_ratings = player_fixture_data['fdrs']
-
-            if not home_away_info or not difficulty_ratings:
-                player_ratings[int(player_id)] = {'score': None}
-            else:
-                # upcoming_fixtures = [(fdr,  h_a) for fdr,  h_a in zip(difficulty_ratings, home_away_info)]
-                player_future_data = {
-                    'fdr': difficulty_ratings,
-                    'h_a': home_away_info
-                }
-                
-                player_historical_dict = historical_data[int(player_id)]
-                player_historical_data = {
-                    'h_a': player_historical_dict['was_home'],
-                    'team_a_score': player_historical_dict['team_a_score'],
-                    'team_h_score': player_historical_dict['team_h_score'],
-                    'fdr': [(x[0], self.helper_fns.team_rank(x[1])) for x in player_historical_dict['opponent_team']],
-                    'total_points': player_historical_dict['total_points'],
-                }
-
-                fixture_score = self._calculate_fixture_score(player_historical_data, player_future_data)
-                # ppg_h_a = calculate_performance_metrics(player_historical_dict)
-                # print(f"{fpl_data_attributes.helper_fns.grab_player_name_fpl(int(player_id))} {home_performance_metric} {away_performance_metric}")
-                # average_fixture_score = calculate_adjusted_fixture_score(upcoming_fixtures, ppg_h_a)
-                player_ratings[int(player_id)] = {'score': round(fixture_score, 3)}
         return dict(
                     sorted(
                         player_ratings.items(),
@@ -352,32 +197,32 @@ class FPLDataAnalytics():
 #========================================================== CONSOLIDATE RANKINGS ==========================================================
 
     def apply_scores_and_compile_prospects(self, list_of_ids: list, lookback_period=6):
-        form_score_data = self.score_players_on_form(self.helper_fns.player_ids, lookback_period)
-        fixture_score_data = self.score_players_on_fixtures(self.helper_fns.player_ids, 4)
+        """
+        Form and fixture scores of the requested players, one row per unique ID. Players missing from player_stat_store (e.g. their
+        element summary could not be fetched) are kept with NaN form scores and sorted last.
+        """
+        player_ids = list(dict.fromkeys(list_of_ids))
+        form_score_data = self.score_players_on_form(player_ids, lookback_period)
+        fixture_score_data = self.score_players_on_fixtures(player_ids, 4)
         # team_score_data = self.score_players_on_fixtures(self.api_parser.player_ids)
 
-        df = pd.DataFrame.from_dict({
-                player_id: {
-                    'elo_form_score_pres': form_score_data[player_id]['present_elo'],
-                    'elo_form_score_hist': form_score_data[player_id]['elo_prior_to_lookback'],
-                    'elo_form_score_net': form_score_data[player_id]['final_elo_weighted'],
-                    'fixture_score': fixture_score_data[player_id]['score'],
-                    'minutes_score': fixture_score_data[player_id]['score']
-                } 
-                for player_id in list_of_ids
-            },
-            orient='index').reset_index()
-        
-        df = df.rename(columns={'index': 'player_id'})
+        missing_form_scores = {'present_elo': np.nan, 'elo_prior_to_lookback': np.nan, 'final_elo_weighted': np.nan}
+        form_scores = [form_score_data.get(player_id, missing_form_scores) for player_id in player_ids]
+        fixture_scores = [fixture_score_data[player_id]['score'] for player_id in player_ids]
+        df = pd.DataFrame({
+            'player_id': player_ids,
+            'elo_form_score_pres': [x['present_elo'] for x in form_scores],
+            'elo_form_score_hist': [x['elo_prior_to_lookback'] for x in form_scores],
+            'elo_form_score_net': [x['final_elo_weighted'] for x in form_scores],
+            'fixture_score': fixture_scores,
+            'minutes_score': fixture_scores
+        })
         return df.sort_values(by=['elo_form_score_pres'], ascending=False)
     
     def _compile_prospects(self, list_of_ids: list = None):
         if list_of_ids is None: list_of_ids = self.helper_fns.player_ids
         df = self.apply_scores_and_compile_prospects(list_of_ids)
-        df['player_name'] = df['player_id'].apply(self.helper_fns.grab_player_name_fpl)
-        df['player_pos'] = df['player_id'].apply(self.helper_fns.grab_player_pos)
-        df['player_team'] = df['player_id'].apply(self.helper_fns.grab_player_team)
-        return df
+        return df.join(self.helper_fns.player_dimension_table, on='player_id')
         # return df.loc[df['form_score'] > 0.5]['player_id'].to_list()
 
 #============================================  FPL EVALUATIONS  ============================================
@@ -698,8 +543,9 @@ class FPLDataAnalytics():
     def _generate_beacon_effective_ownership(self):
         id_count = self.helper_fns.rival_stats['id_count']
         id_dict = {}
+        player_positions = self.helper_fns.grab_player_positions(list(id_count))
         for i in id_count:
-            pos = self.helper_fns.grab_player_pos(i)
+            pos = player_positions[i]
             id_dict.setdefault(pos, []).append((i, id_count[i]))
         outlist = sorted(id_dict.items(), key=lambda x:x[1], reverse=True)
         beacon_eff_own_dict = {}
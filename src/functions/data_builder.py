@@ -1,26 +1,33 @@
 # from src.functions.helper_fns import calculate_mean_std_dev, progress_bar_update
 from src.functions.helper_utils import initialize_local_data
+from src.functions.data_exporter import grab_path_relative_to_root
 
 from src.functions.raw_data_fetcher import FPLFetcher, UnderstatFetcher
+from src.functions.rate_controller import describe_rate_controllers
+from src.functions.player_store import PlayerStatStore
+from src.functions.data_indexes import UnderstatCrosswalk
+from src.functions.team_history_store import TeamHistoryStore
+from src.functions.name_matching import PlayerNameMatcher, load_match_overrides, save_match_overrides
+from src.config import config
 # from src.functions.notebook_utils import setup_logger, log_timing
 
 # logger = setup_logger(__name__)
 
 from tqdm.notebook import tqdm_notebook
-from understatapi import UnderstatClient
-from collections import defaultdict, Counter
-import datetime
+from collections import defaultdict
 # from tqdm.notebook import tqdm_notebook
 import pandas as pd
 
-import nest_asyncio
-nest_asyncio.apply()
-
 class FPLRawDataCompiler(FPLFetcher):
     def __init__(self):
         super().__init__()
         print("Building master datasets from raw data via FPL API.")
         self.master_summary = self._build_master_summary()
+        self.player_stat_store = PlayerStatStore.from_master_summary(self.master_summary)
+        self.player_stat_store.export(
+            grab_path_relative_to_root(f"cached_data/fpl/{self.season_year_span_id}", absolute=True, create_if_nonexistent=True),
+            f"master_summary_stats_{self.season_year_span_id}"
+        )
         # logger.info(f"Testing logger: {self.master_summary}")
         initialize_local_data(self, [
             {
@@ -28,6 +35,13 @@ class FPLRawDataCompiler(FPLFetcher):
                 "attribute_name": "master_summary_tabular",
                 "file_name": f"master_summary_{self.season_year_span_id}",
                 "export_path": f"cached_data/fpl/{self.season_year_span_id}",
+            },
+            {
+                "function": self._build_master_summary_frame,
+                "attribute_name": "master_summary_frame",
+                "file_name": f"master_summary_{self.season_year_span_id}",
+                "export_path": f"cached_data/fpl/{self.season_year_span_id}",
+                "file_format": "pickle",
             }
         ], update_and_export_data = True)
         # self.master_summary = self.build_master_summary()
@@ -37,7 +51,8 @@ class FPLRawDataCompiler(FPLFetcher):
         self.positions_raw = pd.json_normalize(self.raw_data['element_types'])
         self.team_info_raw = self._get_team_info()
         # self.total_summary = asyncio.run(self.compile_dataframes())
-        self.league_data = self._initialize_league_data()
+        print(f"Entry requests: {self.request_memo.describe()}.")
+        print(f"Rate control: {describe_rate_controllers()}")
     
     def _get_team_info(self):
         list_of_dicts = [x for x in self.teams_raw]
@@ -69,115 +84,81 @@ class FPLRawDataCompiler(FPLFetcher):
             consolidated_dict[player_id]['round'].append(round_num)
             
         #Add additional info from bootstrap raw data
-        bootstrap_dict = self.raw_data['elements']
+        bootstrap_index = self.bootstrap_index
         for player_id in consolidated_dict.keys():
+            element_data = bootstrap_index.element(player_id)
             for raw_data_col in ['team', 'element_type', 'first_name', 'second_name', 'web_name', 'id']:
-                raw_data_val = next((x[raw_data_col] for x in iter(bootstrap_dict) if x['id'] == player_id))
-                consolidated_dict[player_id][raw_data_col] = raw_data_val
+                consolidated_dict[player_id][raw_data_col] = element_data[raw_data_col]
         
         #Add additional info from teams
-        bootstrap_teams = self.raw_data['teams']
         for player_id, player_data in consolidated_dict.items():
-            team_id = player_data["team"]
+            team_data = bootstrap_index.team(player_data["team"])
             for raw_data_col in ['short_name', 'name', 'strength_overall_home', 'strength_overall_away', 'strength_attack_home', 'strength_attack_away', 'strength_defence_home', 'strength_defence_away']:
-                raw_data_val = next((x[raw_data_col] for x in iter(bootstrap_teams) if x['id'] == team_id))
-                consolidated_dict[player_id][f'team_{raw_data_col}'] = raw_data_val
+                consolidated_dict[player_id][f'team_{raw_data_col}'] = team_data[raw_data_col]
         
         #Add additional info from positions
-        bootstrap_pos = self.raw_data['element_types']
         for player_id, player_data in consolidated_dict.items():
-            pos_id = player_data["element_type"]
+            pos_data = bootstrap_index.position(player_data["element_type"])
             for raw_data_col in ['singular_name_short']:
-                raw_data_val = next((x[raw_data_col] for x in iter(bootstrap_pos) if x['id'] == pos_id))
-                consolidated_dict[player_id][f'pos_{raw_data_col}'] = raw_data_val
+                consolidated_dict[player_id][f'pos_{raw_data_col}'] = pos_data[raw_data_col]
 
         return {player_id: dict(data) for player_id, data in consolidated_dict.items()}
 
     def grab_full_history(self):
         raw_data = self.full_element_summary
-        return [gw_data for player_id in sorted(self.player_ids) for gw_data in raw_data[player_id]['history']]
+        return [gw_data for player_id in sorted(self.player_ids) if player_id in raw_data for gw_data in raw_data[player_id]['history']]
 
     def convert_fpl_dict_to_tabular(self):
+        """
+        Flatten master_summary into one row per (player, round) in a single pass: the round's stats (first fixture's value in a
+        double gameweek) followed by the player's static fields (team, names, position, etc).
+
+        Returns:
+        - list: Rows as dicts, ordered by player then round.
+        """
         df_data = []
-        for _, player_data in self.master_summary.items():
-            org_data= {}
-            key_info_to_append = []
+        for player_data in self.master_summary.values():
+            static_data = {}
+            org_data = {}
             for col_name, col_data in player_data.items():
-                if isinstance(col_data, list):
-                    if all(isinstance(item, (str, int, float)) for item in col_data):
-                        continue
-                    if all(isinstance(item, tuple) and len(item) == 2 and all(isinstance(sub_item, (str, int, float)) for sub_item in item) for item in col_data):
-                        # print(col_name)
-                        for gw, param_val in col_data:
-                            org_data.setdefault(gw, {}).setdefault(col_name, param_val)
-                elif isinstance(col_data, (str, int, float)):
-                    key_info_to_append.append((col_name, col_data))
-            flattened_org_data = [{**value, 'round': key} for key, value in org_data.items()]
-            df_data.extend(flattened_org_data)
-            for data_per_gw in df_data:
-                for append_col, append_data in key_info_to_append:
-                    data_per_gw[append_col] = append_data
+                if not isinstance(col_data, list):
+                    static_data[col_name] = col_data
+                elif col_name != 'round': # 'round' is the only plain list, every other list holds (round, value) tuples
+                    for gw, param_val in col_data:
+                        org_data.setdefault(gw, {}).setdefault(col_name, param_val)
+            df_data.extend({**round_data, 'round': gw, **static_data} for gw, round_data in org_data.items())
         return df_data
 
-    def _initialize_league_data(self):
-        
-        pseudo_league_data = [
-            {"name": "beacon_aggregate", "symbol": "☆", "id": None, "custom_info": None},
-            {"name": "beacon_1k", "symbol": "☆₁ₖ", "id": None, "custom_info": {"rank": 1000}},
-            {"name": "beacon_10k", "symbol": "☆₁₀ₖ", "id": None, "custom_info": {"rank": 10000}},
-            {"name": "beacon_100k", "symbol": "☆₁₀₀ₖ", "id": None, "custom_info": {"rank": 100000}}
-        ]
-        specified_league_data = [
-            {
-                "name": str(league_data["id"]),
-                "symbol": league_data["symbol"],
-                "id": league_data["id"],
-                "custom_info": None,
-                }
-            for league_data in self.config_data["fpl_id_data"]["personal_league_ids"]
-        ]
-                
-        personal_user_name = self.fetch_player_fpl_name(self._get_personal_fpl_id())
-        points_window = 50
-
-        grouped_user_ids_by_league={}
-        for league_data in pseudo_league_data:
-            if league_data["custom_info"] is not None:
-                ids_that_cross_rank = [idx for idx in self._get_beacon_ids() if self.fetch_player_overall_fpl_rank(idx) <= league_data["custom_info"]["rank"]]
-                grouped_user_ids_by_league[league_data["name"]] = ids_that_cross_rank
-            elif league_data["name"] == "beacon_aggregate":
-                grouped_user_ids_by_league[league_data["name"]] = [idx for idx in self._get_beacon_ids()]
-
-        for rival_league_data in specified_league_data:
-            league_r = self.fetch_data_from_api(f'leagues-classic/{rival_league_data["id"]}/standings/')
-            league_players = league_r["standings"]["results"]
-            my_rank, my_points = [(x["rank"], x["total"]) for x in league_players if x["player_name"] == personal_user_name][0]
-            user_ids = [x["entry"] for x in league_players if ((x["rank"] < my_rank) or (x["total"] > my_points - points_window and x["rank"] > my_rank))]
-            grouped_user_ids_by_league[rival_league_data["name"]] = user_ids
+    def _build_master_summary_frame(self):
+        """
+        Typed DataFrame of master_summary_tabular: integer keys, booleans, datetimes and categorical text columns.
 
-        agg_league_data = pseudo_league_data + specified_league_data
+        Returns:
+        - pd.DataFrame: One row per (player, round).
+        """
+        frame = pd.DataFrame.from_records(self.master_summary_tabular)
+        if frame.empty:
+            return frame
+        for col_name in ['id', 'round', 'team', 'element_type', 'opponent_team', 'fixture']:
+            if col_name in frame:
+                frame[col_name] = pd.to_numeric(frame[col_name], downcast='integer')
+        if 'kickoff_time' in frame:
+            frame['kickoff_time'] = pd.to_datetime(frame['kickoff_time'], utc=True)
+        for col_name in frame.select_dtypes(include=['object', 'string']).columns:
+            value_types = frame[col_name].dropna().map(type)
+            if value_types.eq(bool).all():
+                frame[col_name] = frame[col_name].astype('boolean')
+            elif value_types.eq(str).all():
+                frame[col_name] = frame[col_name].astype('category')
+        return frame
 
-        def compile_ownership(league_info):
-
-            def fetch_latest_picks(user_id):
-                r = self.fetch_fpl_data(user_id)["latest_picks"]
-                return [x["element"] for x in r["picks"]]
-
-            user_ids = grouped_user_ids_by_league[league_info["name"]]
-            league_info["summary"] = {
-                "rivals": user_ids,
-                "players": dict(Counter(player_id for user_id in user_ids for player_id in fetch_latest_picks(user_id)))
-            }
-            return league_info
-
-        return [compile_ownership(league_info.copy()) for league_info in agg_league_data]
-    
 class UnderstatRawDataCompiler(UnderstatFetcher):
     def __init__(self, fpl_helper_fns, update_and_export_data):
-        self.find_best_match_fpl = fpl_helper_fns.find_best_match
+        self.player_name_matcher = PlayerNameMatcher(fpl_helper_fns.unique_player_data, **config.PLAYER_NAME_MATCHING)
         self.grab_player_name_fpl = fpl_helper_fns.grab_player_name_fpl
         self.raw_data_fpl = fpl_helper_fns.raw_data
         super().__init__(fpl_helper_fns, update_and_export_data)
+        self.understat_team_history_store = TeamHistoryStore.from_team_data(self.understat_team_data_raw)
         print("Mapping FPL to understat data.")
         initialize_local_data(self, [
             {
@@ -193,12 +174,35 @@ class UnderstatRawDataCompiler(UnderstatFetcher):
                 "export_path": f"cached_data/understat/{fpl_helper_fns.season_year_span_id}/players",
                 "update_bool_override": True,
              },
+            {
+                "function": self._build_understat_crosswalk,
+                "attribute_name": "understat_crosswalk_data",
+                "file_name": "understat_to_fpl_crosswalk",
+                "export_path": f"cached_data/understat/{fpl_helper_fns.season_year_span_id}/players",
+                "update_bool_override": True,
+             },
+        ], update_and_export_data)
+        self.understat_crosswalk = UnderstatCrosswalk.from_dict(self.understat_crosswalk_data)
+        initialize_local_data(self, [
             {
                 "function": self._build_understat_player_shot_data,
                 "attribute_name": "understat_player_shot_data",
                 "file_name": "player_shot_data",
                 "export_path": f"cached_data/understat/{fpl_helper_fns.season_year_span_id}/players"
              },
+            {
+                "function": self._build_understat_player_shot_facts,
+                "attribute_name": "understat_player_shot_facts",
+                "file_name": "player_shot_facts",
+                "export_path": f"cached_data/understat/{fpl_helper_fns.season_year_span_id}/players",
+                "file_format": "pickle"
+             },
+            {
+                "function": self._compile_understat_player_shot_data,
+                "attribute_name": "understat_player_shot_summary",
+                "file_name": "player_shot_summary",
+                "export_path": f"cached_data/understat/{fpl_helper_fns.season_year_span_id}/players"
+             },
             {
                 "function": self._build_understat_player_match_data,
                 "attribute_name": "understat_player_match_data",
@@ -206,6 +210,8 @@ class UnderstatRawDataCompiler(UnderstatFetcher):
                 "export_path": f"cached_data/understat/{fpl_helper_fns.season_year_span_id}/players"
              }
         ], update_and_export_data)
+        self.understat_player_shot_summary = self._key_by_fpl_player_id(self.understat_player_shot_summary)
+        print(f"Rate control: {describe_rate_controllers()}")
 
 #================================================================================================================================================================
 #===================================================================== MATCH FPL TO UNDERSTAT ===================================================================
@@ -229,27 +235,46 @@ class UnderstatRawDataCompiler(UnderstatFetcher):
         for d1, d2 in zip(fpl_data, understat_data)]
     
     def _match_fpl_to_understat_players(self):
+        """
+        Match every understat player to an FPL player in one batch (see PlayerNameMatcher), blocked by the FPL team(s) of the understat
+        team(s) they played for. Names the matcher cannot settle are listed in understat_to_fpl_player_overrides.json for review:
+        filling in their fpl_id there is picked up by the next run.
+        """
+        fpl_team_ids = {x["understat"]["name"]: x["fpl"]["id"] for x in self.understat_to_fpl_team_data}
+        queries = [{
+            "id": int(understat_player_info["id"]),
+            "name": understat_player_info["player_name"],
+            "team_ids": [fpl_team_ids[team_name] for team_name in understat_player_info["team_title"].split(",") if team_name in fpl_team_ids], #Account for cases where player switched teams in PL
+        } for understat_player_info in self.understat_player_data_raw]
+
+        overrides_path = f"{grab_path_relative_to_root(f'cached_data/understat/{self.season_year_span_id}/players', absolute=True, create_if_nonexistent=True)}/understat_to_fpl_player_overrides.json"
+        overrides = load_match_overrides(overrides_path)
+        matches, ambiguous = self.player_name_matcher.match(queries, overrides)
+        save_match_overrides(overrides_path, overrides, ambiguous, {query["id"]: query["name"] for query in queries})
+        if ambiguous:
+            print(f"{len(ambiguous)} understat player(s) could not be matched confidently to FPL, set their fpl_id in {overrides_path} to resolve them.")
 
         matched_data = []
-        for understat_player_info in self.understat_player_data_raw:
-            team_name_list = understat_player_info["team_title"].split(",") #Account for cases where player switched teams in PL
-            # print(f"{team_name_list}")
-            fpl_team_id_list = [next((x["fpl"]["id"] for x in iter(self.understat_to_fpl_team_data) if x["understat"]["name"] == team_name), 'null') for team_name in team_name_list]
-            matched_fpl_player_id = self.find_best_match_fpl(understat_player_info["player_name"], fpl_team_id_list)
-            if matched_fpl_player_id is not None:
+        for query in queries:
+            match = matches.get(query["id"])
+            if match is not None:
                 matched_data.append({
                     "fpl": {
-                        "id": int(matched_fpl_player_id),
-                        "name": self.grab_player_name_fpl(int(matched_fpl_player_id)),
+                        "id": match["fpl_id"],
+                        "name": self.grab_player_name_fpl(match["fpl_id"]),
                     },
                     "understat": {
-                        "id": int(understat_player_info["id"]),
-                        "name": understat_player_info["player_name"],
-                    }
+                        "id": query["id"],
+                        "name": query["name"],
+                    },
+                    "confidence": match["confidence"],
                 })
         return matched_data
     
         
+    def _build_understat_crosswalk(self):
+        return UnderstatCrosswalk(self.understat_to_fpl_team_data, self.understat_to_fpl_player_data).to_dict()
+
     def _build_understat_player_shot_data(self):
 
         # async def main():
@@ -266,41 +291,67 @@ class UnderstatRawDataCompiler(UnderstatFetcher):
         all_matched_fpl_player_ids = [x['fpl']['id'] for x in self.understat_to_fpl_player_data]
         all_player_shot_data = {}
         for fpl_player_id in tqdm_notebook(all_matched_fpl_player_ids, desc = "Building understat player shot data"):
-            understat_id = next(x["understat"]["id"] for x in iter(self.understat_to_fpl_player_data) if x["fpl"]["id"] == int(fpl_player_id))
+            understat_id = self.understat_crosswalk.player_understat_id(fpl_player_id)
             all_player_shot_data[int(fpl_player_id)] = self.understat_player_shot_data_raw.get(f"{understat_id}")
         return all_player_shot_data
 
-    def _compile_understat_player_shot_data(self):
+    def _build_understat_player_shot_facts(self):
+        """
+        Single shot fact table across every matched player: one row per understat shot with an fpl_player_id column, the date parsed
+        once and the numeric columns typed, restricted to shots on or after the day of the season's first deadline.
 
-        all_matched_fpl_player_ids = [x['fpl']['id'] for x in self.understat_to_fpl_player_data]
-        all_player_shot_data = {}
-        for fpl_player_id in all_matched_fpl_player_ids:
-            player_shot_data = self.understat_player_shot_data_raw[fpl_player_id]
+        Returns:
+        - pd.DataFrame: Shot facts (empty if no player has shots).
+        """
+        shot_records = [{**shot, 'fpl_player_id': int(fpl_player_id)} for fpl_player_id, player_shot_data in self.understat_player_shot_data.items() for shot in player_shot_data or []]
+        facts = pd.DataFrame.from_records(shot_records)
+        if facts.empty:
+            return facts
+        facts['date'] = pd.to_datetime(facts['date'])
+        for col_name in ['X', 'Y', 'xG', 'minute', 'h_goals', 'a_goals']:
+            if col_name in facts:
+                facts[col_name] = pd.to_numeric(facts[col_name])
+        season_start = pd.to_datetime(self.raw_data_fpl['events'][0]['deadline_time'], utc=True).tz_convert(None).normalize()
+        return facts[facts['date'].dt.normalize() >= season_start].reset_index(drop=True)
 
-            season_threshold_start_str = next(x['deadline_time'] for x in iter(self.raw_data_fpl['events']))
-            def convert_dtstr_to_dt(input_str: str):
-                adjusted_str = datetime.fromisoformat(input_str.replace('Z', ''))
-                return datetime.strptime(adjusted_str.strftime('%Y-%m-%d'), '%Y-%m-%d')
-            relevant_player_shot_data = [x for x in player_shot_data if convert_dtstr_to_dt(x['date']) >= convert_dtstr_to_dt(season_threshold_start_str)]
+    @staticmethod
+    def _key_by_fpl_player_id(player_data: dict):
+        """Key per-player data by int FPL player ID, whether freshly built or read back from JSON (which stores keys as str)."""
+        return {int(fpl_player_id): data for fpl_player_id, data in player_data.items()}
 
-            df = pd.DataFrame(relevant_player_shot_data)
-            grouped = df.groupby(['result', 'match_id','h_team','a_team']).size().reset_index(name='count')
-            chance_summary = grouped.pivot_table(index=['match_id','h_team','a_team'], columns='result', values='count', fill_value=0)
-            chance_summary.reset_index(inplace=True)
-            
-            hits_df = df[df["result"] == "Goal"]
-            grouped = hits_df.groupby(['shotType', 'match_id','h_team','a_team']).size().reset_index(name='count')
-            goal_summary = grouped.pivot_table(index=['match_id','h_team','a_team'], columns='shotType', values='count', fill_value=0)
-            goal_summary.reset_index(inplace=True)
+    def _compile_understat_player_shot_data(self):
+        """
+        Per (player, match) shot summary of every player in one grouped aggregation over the shot fact table: a count per shot result
+        (Goal, SavedShot, MissedShots, ...) and, for matches with goals, a count of goals per shot type (RightFoot, Head, ...), left
+        empty (None) for matches without a goal.
 
-            all_player_shot_data[int(fpl_player_id)] = pd.merge(chance_summary, goal_summary, on=['match_id','h_team','a_team'], how='outer').to_dict(orient='records')
-        return all_player_shot_data
+        Returns:
+        - dict: Records of {match_id, h_team, a_team, <result counts>, <goal shot type counts>} per FPL player ID (int, see
+                _key_by_fpl_player_id for the cached copy).
+        """
+        facts = self.understat_player_shot_facts
+        if facts.empty:
+            return {}
+        match_keys = ['fpl_player_id', 'match_id', 'h_team', 'a_team']
+        chance_summary = facts.groupby(match_keys + ['result']).size().unstack('result', fill_value=0)
+        goal_facts = facts[facts['result'] == 'Goal']
+        if not goal_facts.empty:
+            chance_summary = chance_summary.join(goal_facts.groupby(match_keys + ['shotType']).size().unstack('shotType', fill_value=0), how='left')
+        shot_summary = chance_summary.reset_index()
+        shot_summary.columns.name = None
+        count_columns = shot_summary.columns.drop(match_keys)
+        shot_summary[count_columns] = shot_summary[count_columns].astype('Int64') # Goal shot type counts are NaN for matches without a goal
+        shot_summary = shot_summary.astype(object).where(shot_summary.notna(), None) # Written to JSON as null rather than NaN
+        player_shot_summary = defaultdict(list)
+        for fpl_player_id, match_summary in zip(shot_summary['fpl_player_id'].tolist(), shot_summary.drop(columns='fpl_player_id').to_dict(orient='records')):
+            player_shot_summary[fpl_player_id].append(match_summary)
+        return dict(player_shot_summary)
     
     def _build_understat_player_match_data(self):
 
         all_matched_fpl_player_ids = [x['fpl']['id'] for x in self.understat_to_fpl_player_data]
         all_player_match_data = {}
         for fpl_player_id in tqdm_notebook(all_matched_fpl_player_ids, desc = "Building understat player match data"):
-            understat_id = next(x["understat"]["id"] for x in iter(self.understat_to_fpl_player_data) if x["fpl"]["id"] == int(fpl_player_id))
+            understat_id = self.understat_crosswalk.player_understat_id(fpl_player_id)
             all_player_match_data[int(fpl_player_id)] = self.understat_player_match_data_raw.get(f"{understat_id}")
         return all_player_match_data
\ No newline at end of file
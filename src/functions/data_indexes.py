@@ -0,0 +1,76 @@
+class BootstrapIndex:
+    """
+    Hash-map lookups over one bootstrap-static payload: id -> element, id -> team, id -> position and name -> team.
+    Built once per payload (see FPLFetcher.bootstrap_index), so that resolving a player, team or position is O(1) rather than a
+    scan of the payload's lists.
+    """
+
+    def __init__(self, raw_data: dict):
+        self.raw_data = raw_data
+        self.elements = {x['id']: x for x in raw_data['elements']}
+        self.teams = {x['id']: x for x in raw_data['teams']}
+        self.positions = {x['id']: x for x in raw_data['element_types']}
+        self.teams_by_name = {x['name']: x for x in raw_data['teams']}
+
+    def is_built_from(self, raw_data: dict):
+        return self.raw_data is raw_data
+
+    def element(self, player_id: int):
+        return self.elements[player_id]
+
+    def team(self, team_id: int):
+        return self.teams[team_id]
+
+    def position(self, position_id: int):
+        return self.positions.get(position_id)
+
+    def team_by_name(self, team_name: str):
+        return self.teams_by_name[team_name]
+
+class UnderstatCrosswalk:
+    """
+    Bidirectional FPL <-> understat ID lookups for players and teams, built once from the matched understat_to_fpl_player_data and
+    understat_to_fpl_team_data so that translating an ID either way is O(1) rather than a scan of the matched lists. Each side maps
+    an ID to the other side's {"id", "name"}.
+    """
+
+    def __init__(self, team_data: list, player_data: list):
+        self.fpl_to_understat_teams = {int(x["fpl"]["id"]): x["understat"] for x in team_data}
+        self.understat_to_fpl_teams = {int(x["understat"]["id"]): x["fpl"] for x in team_data}
+        self.fpl_to_understat_players = {int(x["fpl"]["id"]): x["understat"] for x in player_data}
+        self.understat_to_fpl_players = {int(x["understat"]["id"]): x["fpl"] for x in player_data}
+
+    def to_dict(self):
+        """JSON-ready form (stored next to the understat_to_fpl_* caches), read back with from_dict."""
+        return {
+            "teams": {"fpl_to_understat": self.fpl_to_understat_teams, "understat_to_fpl": self.understat_to_fpl_teams},
+            "players": {"fpl_to_understat": self.fpl_to_understat_players, "understat_to_fpl": self.understat_to_fpl_players},
+        }
+
+    @classmethod
+    def from_dict(cls, crosswalk_data: dict):
+        crosswalk = cls.__new__(cls)
+        for entity in ["teams", "players"]:
+            for direction, lookup in crosswalk_data[entity].items():
+                setattr(crosswalk, f"{direction}_{entity}", {int(k): v for k, v in lookup.items()}) # JSON keys come back as str
+        return crosswalk
+
+    def player_understat_id(self, fpl_player_id: int):
+        match = self.fpl_to_understat_players.get(int(fpl_player_id))
+        return match["id"] if match else None
+
+    def player_fpl_id(self, understat_player_id: int):
+        match = self.understat_to_fpl_players.get(int(understat_player_id))
+        return match["id"] if match else None
+
+    def team_understat_id(self, fpl_team_id: int):
+        match = self.fpl_to_understat_teams.get(int(fpl_team_id))
+        return match["id"] if match else None
+
+    def team_understat_name(self, fpl_team_id: int):
+        match = self.fpl_to_understat_teams.get(int(fpl_team_id))
+        return match["name"] if match else None
+
+    def team_fpl_id(self, understat_team_id: int):
+        match = self.understat_to_fpl_teams.get(int(understat_team_id))
+        return match["id"] if match else None
@@ -467,7 +467,7 @@ class DashboardVisualizer():
         for i, selected_y in enumerate(selection_options_for_y_axis, start=1):
             for key, d in data.items():
                 understat_id = key
-                fpl_team_id = next(x['fpl']['id'] for x in self.understat_helper_fns.understat_to_fpl_team_data if int(x['understat']['id']) == int(understat_id))
+                fpl_team_id = self.understat_helper_fns.grab_team_FPLID_from_USID(understat_id)
                 fpl_team_name = self.fpl_helper_fns.grab_team_name_short(fpl_team_id)
                 fpl_color_scheme_rgb = config.TEAM_COLOR_SCHEMES.get(fpl_team_name).get('line')
                 fig.add_trace(
@@ -0,0 +1,299 @@
+import os
+
+import numpy as np
+
+class BatchEloEngine:
+    """
+    Form Elo of FPLDataAnalytics, rating every player at once from padded players x rounds arrays.
+    Rounds are stepped through in order (the streak counters are sequential) but each step updates all players together, applying
+    exactly the same operations in the same order as the round-by-round scalar version it replaced (kept in tests/test_elo_engine.py
+    as the reference) so the ratings are identical.
+    """
+
+    def __init__(self, weights: tuple = (2.5, 2.0, 1.5, 1.0, 0.8, 0.5), default_weight: float = 0.5, k_factor: int = 30,
+                 base_adjustment: int = 20, away_factor: int = 200, bonus_cap: int = 2000):
+        self.weights = weights
+        self.default_weight = default_weight
+        self.k_factor = k_factor
+        self.base_adjustment = base_adjustment
+        self.away_factor = away_factor
+        self.bonus_cap = bonus_cap
+
+    def initial_state(self, num_players: int, initial_rating: float):
+        """State carried between rounds: rating, adjustment factor and the consecutive bad/good counters of every player."""
+        return {
+            'rating': np.full(num_players, float(initial_rating)),
+            'adjustment_factor': np.zeros(num_players),
+            'consecutive_bad_count': np.zeros(num_players, dtype=np.int64),
+            'consecutive_good_count': np.zeros(num_players, dtype=np.int64),
+        }
+
+    def step(self, state: dict, round_num: int, scores, average_scores, fdrs, h_a, num_rounds, is_active=None):
+        """
+        Apply one round to every player in place.
+
+        Parameters:
+        - state (dict): Output of initial_state, updated in place
+        - round_num (int): Position of the round within each player's window (drives the weight and the recency of penalties)
+        - scores, average_scores, fdrs, h_a (np.ndarray): The round's values per player
+        - num_rounds (np.ndarray): Length of each player's window
+        - is_active (np.ndarray): Players to update (those whose window covers this round), all of them if None
+        """
+        weight = self.weights[round_num] if round_num < len(self.weights) else self.default_weight
+        is_bad, consecutive_bad_count, consecutive_good_count, penalty_scale, bonus = self.bin_scores(scores, state['consecutive_bad_count'], state['consecutive_good_count'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            penalty = -penalty_scale * (1 + (num_rounds - round_num) / num_rounds)
+        adjustment_factor = state['adjustment_factor'] + np.where(is_bad, penalty, bonus)
+        rating = state['rating'] + self.round_gain(scores, average_scores, weight) + adjustment_factor + self.fdr_adjustment(fdrs, h_a)
+
+        if is_active is None:
+            is_active = np.ones(len(scores), dtype=bool)
+        for key, value in (('rating', rating), ('adjustment_factor', adjustment_factor), ('consecutive_bad_count', consecutive_bad_count), ('consecutive_good_count', consecutive_good_count)):
+            state[key][is_active] = value[is_active]
+
+    def bin_scores(self, scores, consecutive_bad_count, consecutive_good_count):
+        """
+        Bin a round's scores and update the streak counters.
+
+        Returns:
+        - tuple: (is_bad, consecutive_bad_count, consecutive_good_count, penalty_scale, bonus), where a bad round's penalty is
+                 penalty_scale scaled by its recency and any other round adds bonus to the adjustment factor.
+        """
+        is_bad = scores < 4
+        is_average = (scores >= 4) & (scores <= 6)
+        is_good = (scores >= 7) & (scores <= 9)
+        consecutive_bad_count = np.where(is_bad, consecutive_bad_count + 1, 0)
+        consecutive_good_count = np.where(is_bad, np.where(consecutive_bad_count >= 2, 0, consecutive_good_count), consecutive_good_count + 1)
+        penalty_scale = 4.0 ** consecutive_bad_count
+        bonus = np.minimum(np.where(is_average, 2.0, np.where(is_good, 4.0, 8.0)) ** consecutive_good_count, self.bonus_cap)
+        return is_bad, consecutive_bad_count, consecutive_good_count, penalty_scale, bonus
+
+    def round_gain(self, scores, average_scores, weight):
+        expected_scores = scores / average_scores
+        return self.k_factor * (scores - expected_scores) * weight
+
+    def fdr_adjustment(self, fdrs, h_a):
+        home_away_factor = np.where(h_a == 0, self.away_factor, 0)
+        return self.base_adjustment * (fdrs - 3) + home_away_factor
+
+    def rate(self, scores, average_scores, fdrs, h_a, lengths, initial_rating: float):
+        """
+        Rate every player over their window of rounds.
+
+        Parameters:
+        - scores, fdrs, h_a (np.ndarray): players x rounds arrays, each player's window left-aligned (padding is ignored)
+        - average_scores (np.ndarray or float): players x rounds array, or a single average for every round
+        - lengths (np.ndarray): Number of rounds in each player's window
+        - initial_rating (float): Rating before the first round
+
+        Returns:
+        - np.ndarray: Final rating per player (the initial rating for empty windows).
+        """
+        lengths = np.asarray(lengths)
+        fdrs = np.asarray(fdrs, dtype=float)
+        average_scores = np.broadcast_to(np.asarray(average_scores, dtype=float), np.shape(scores))
+        state = self.initial_state(len(lengths), initial_rating)
+        for round_num in range(int(lengths.max()) if len(lengths) else 0):
+            self.step(state, round_num, scores[:, round_num], average_scores[:, round_num], fdrs[:, round_num], h_a[:, round_num], lengths, is_active=round_num < lengths)
+        return state['rating']
+
+def gather_windows(matrix: np.ndarray, starts: np.ndarray, lengths: np.ndarray, fill_value=np.nan):
+    """
+    Left-align a window [start, start + length) of every row of a players x rounds matrix.
+
+    Returns:
+    - np.ndarray: players x max(lengths) array, padded with fill_value.
+    """
+    width = int(lengths.max()) if len(lengths) else 0
+    columns = starts[:, None] + np.arange(width)
+    in_window = np.arange(width) < lengths[:, None]
+    windows = np.take_along_axis(matrix, np.minimum(columns, matrix.shape[1] - 1), axis=1) if matrix.shape[1] else np.zeros((len(starts), width))
+    return np.where(in_window, windows, fill_value)
+
+class IncrementalEloTracker:
+    """
+    Per-player Elo state over each player's history from their first entry, advanced one gameweek at a time so that a weekly refresh
+    only applies the new entries (O(players)) instead of replaying every round.
+
+    The recency factor of a bad round's penalty, (1 + (n - i) / n), depends on the length n of the window being rated, so rather than
+    a single running rating the state keeps sums from which the rating over the first n entries closes in O(1):
+    - base: initial rating plus the score gains and FDR adjustments of every entry
+    - bonus_sum / bonus_moment: sum of the bonuses and of bonus x entry index
+    - penalty_sum / penalty_moment / penalty_second_moment: sum of the penalty scales (4 ** consecutive bad rounds) and of scale x
+      index and scale x index ** 2
+    - consecutive_bad_count / consecutive_good_count: the streak counters
+    Since every round adds the running adjustment factor to the rating, an entry's adjustment counts (n - i) times, which expands to
+    rating = base + (n * bonus_sum - bonus_moment) - (2 * n * penalty_sum - 3 * penalty_moment + penalty_second_moment / n), the same
+    rating as BatchEloEngine.rate up to floating point rounding.
+
+    A checkpoint of the state is kept for every gameweek advanced through, for as-of queries, and the whole history of checkpoints
+    can be saved and reloaded so that later runs pick up from the last gameweek applied.
+    """
+
+    STATE_FIELDS = ('entries', 'base', 'bonus_sum', 'bonus_moment', 'penalty_sum', 'penalty_moment', 'penalty_second_moment', 'consecutive_bad_count', 'consecutive_good_count')
+    COUNT_FIELDS = ('entries', 'consecutive_bad_count', 'consecutive_good_count')
+
+    def __init__(self, player_stat_store, fdr_matrix: np.ndarray, engine: BatchEloEngine = None, initial_rating: float = 500, average_score: float = 6):
+        """
+        Parameters:
+        - player_stat_store (PlayerStatStore): Source of the points, home/away flags and rounds of every player's entries
+        - fdr_matrix (np.ndarray): players x entries FDRs aligned with player_stat_store (see grab_history_fdr_matrix)
+        - engine (BatchEloEngine): Elo parameters to apply, defaults to BatchEloEngine()
+        - initial_rating (float): Rating before a player's first entry
+        - average_score (float): Average score the expected score is measured against
+        """
+        self.player_stat_store = player_stat_store
+        self.fdr_matrix = fdr_matrix
+        self.engine = engine or BatchEloEngine()
+        self.initial_rating = initial_rating
+        self.average_score = average_score
+        self.player_ids = player_stat_store.player_ids
+        self.latest_gameweek = 0
+        self.state = self._initial_state(len(self.player_ids))
+        self.checkpoints = {0: self._copy_state(self.state)}
+
+    def _initial_state(self, num_players: int):
+        state = {field: np.zeros(num_players, dtype=np.int64 if field in self.COUNT_FIELDS else float) for field in self.STATE_FIELDS}
+        state['base'][:] = self.initial_rating
+        return state
+
+    @staticmethod
+    def _copy_state(state: dict):
+        return {field: values.copy() for field, values in state.items()}
+
+    def _apply_next_entries(self, state: dict, is_active: np.ndarray):
+        """Apply the next unapplied entry of every active player to state, in place."""
+        rows = np.flatnonzero(is_active)
+        entry_nums = state['entries'][rows]
+        scores = self.player_stat_store.stat_matrix('total_points')[rows, entry_nums]
+        h_a = self.player_stat_store.stat_matrix('was_home')[rows, entry_nums]
+        fdrs = self.fdr_matrix[rows, entry_nums].astype(float)
+        weights = np.where(entry_nums < len(self.engine.weights), np.array(self.engine.weights)[np.minimum(entry_nums, len(self.engine.weights) - 1)], self.engine.default_weight)
+
+        is_bad, consecutive_bad_count, consecutive_good_count, penalty_scale, bonus = self.engine.bin_scores(scores, state['consecutive_bad_count'][rows], state['consecutive_good_count'][rows])
+        bonus = np.where(is_bad, 0, bonus)
+        penalty_scale = np.where(is_bad, penalty_scale, 0)
+
+        state['base'][rows] += self.engine.round_gain(scores, self.average_score, weights) + self.engine.fdr_adjustment(fdrs, h_a)
+        state['bonus_sum'][rows] += bonus
+        state['bonus_moment'][rows] += bonus * entry_nums
+        state['penalty_sum'][rows] += penalty_scale
+        state['penalty_moment'][rows] += penalty_scale * entry_nums
+        state['penalty_second_moment'][rows] += penalty_scale * entry_nums.astype(float) ** 2
+        state['consecutive_bad_count'][rows] = consecutive_bad_count
+        state['consecutive_good_count'][rows] = consecutive_good_count
+        state['entries'][rows] += 1
+
+    def advance(self, gameweek: int):
+        """
+        Apply every entry of every player up to and including a gameweek that has not been applied yet, checkpointing the state
+        after each gameweek on the way. Gameweeks already applied are left untouched.
+
+        Parameters:
+        - gameweek (int): Gameweek to advance to
+        """
+        lengths = self.player_stat_store.lengths
+        rounds = self.player_stat_store.rounds
+        for next_gameweek in range(self.latest_gameweek + 1, gameweek + 1):
+            while True:
+                has_entry = self.state['entries'] < lengths
+                next_rounds = rounds[np.arange(len(lengths)), np.minimum(self.state['entries'], rounds.shape[1] - 1)] if rounds.shape[1] else np.zeros(len(lengths))
+                is_active = has_entry & (next_rounds <= next_gameweek)
+                if not is_active.any():
+                    break
+                self._apply_next_entries(self.state, is_active)
+            self.checkpoints[next_gameweek] = self._copy_state(self.state)
+            self.latest_gameweek = next_gameweek
+
+    def _close_ratings(self, state: dict):
+        entries = state['entries'].astype(float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratings = (state['base'] + (entries * state['bonus_sum'] - state['bonus_moment'])
+                       - (2 * entries * state['penalty_sum'] - 3 * state['penalty_moment'] + state['penalty_second_moment'] / entries))
+        return np.where(state['entries'] > 0, ratings, float(self.initial_rating))
+
+    def ratings(self, gameweek: int = None):
+        """
+        Parameters:
+        - gameweek (int): Gameweek to read the ratings as of, defaults to the latest one applied
+
+        Returns:
+        - np.ndarray: Rating of every player over their entries up to that gameweek, in the row order of player_stat_store.
+        """
+        state = self.state if gameweek is None or gameweek >= self.latest_gameweek else self.checkpoints[gameweek]
+        return self._close_ratings(state)
+
+    def adjustment_factors(self, gameweek: int = None):
+        """Adjustment factor of every player at the end of their entries up to a gameweek (the latest one applied by default)."""
+        state = self.state if gameweek is None or gameweek >= self.latest_gameweek else self.checkpoints[gameweek]
+        entries = state['entries'].astype(float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            adjustment_factors = state['bonus_sum'] - (2 * state['penalty_sum'] - state['penalty_moment'] / entries)
+        return np.where(state['entries'] > 0, adjustment_factors, 0.0)
+
+    def ratings_over_first_entries(self, rows: np.ndarray, entry_counts: np.ndarray):
+        """
+        Rating of players over their first entry_counts entries, starting from the latest checkpoint not past that count and applying
+        only the few entries between it and the count.
+
+        Parameters:
+        - rows (np.ndarray): Row numbers in player_stat_store
+        - entry_counts (np.ndarray): Number of leading entries to rate each player over
+
+        Returns:
+        - np.ndarray: Rating per row.
+        """
+        entry_counts = np.minimum(np.asarray(entry_counts), self.player_stat_store.lengths[rows])
+        checkpoint_gameweeks = sorted(self.checkpoints)
+        checkpoint_entries = np.stack([self.checkpoints[x]['entries'][rows] for x in checkpoint_gameweeks])
+        latest_usable = np.where(checkpoint_entries <= entry_counts, np.arange(len(checkpoint_gameweeks))[:, None], 0).max(axis=0)
+        rows_state = self._initial_state(len(self.player_ids))
+        for field in self.STATE_FIELDS:
+            rows_state[field][rows] = np.stack([self.checkpoints[x][field][rows] for x in checkpoint_gameweeks])[latest_usable, np.arange(len(rows))]
+        targets = np.zeros(len(self.player_ids), dtype=np.int64)
+        targets[rows] = entry_counts
+        while True:
+            is_active = np.zeros(len(self.player_ids), dtype=bool)
+            is_active[rows] = rows_state['entries'][rows] < targets[rows]
+            if not is_active.any():
+                break
+            self._apply_next_entries(rows_state, is_active)
+        return self._close_ratings(rows_state)[rows]
+
+    #========================== Persistence ==========================
+
+    def save(self, file_path: str):
+        """Write every checkpoint to a single .npz (written aside and swapped in), keyed by player ID for reloading."""
+        arrays = {'player_ids': self.player_ids, 'gameweeks': np.array(sorted(self.checkpoints))}
+        for gameweek, state in self.checkpoints.items():
+            for field, values in state.items():
+                arrays[f"{gameweek}/{field}"] = values
+        with open(f"{file_path}.tmp", 'wb') as file:
+            np.savez(file, **arrays)
+        os.replace(f"{file_path}.tmp", file_path)
+
+    @classmethod
+    def load(cls, file_path: str, player_stat_store, fdr_matrix: np.ndarray, **kwargs):
+        """
+        Rebuild a tracker from a file written by save, realigned to the rows of the current player_stat_store. Players new to the
+        store start from scratch, and checkpoints past a player's current history (e.g. the cache was written from fresher data) are
+        discarded for everyone. Returns a fresh tracker if the file does not exist.
+        """
+        tracker = cls(player_stat_store, fdr_matrix, **kwargs)
+        if not os.path.isfile(file_path):
+            return tracker
+        with np.load(file_path) as saved:
+            saved_rows = {int(player_id): row for row, player_id in enumerate(saved['player_ids'])}
+            row_pairs = [(row, saved_rows[int(player_id)]) for row, player_id in enumerate(tracker.player_ids) if int(player_id) in saved_rows]
+            rows = np.array([x[0] for x in row_pairs], dtype=np.intp)
+            saved_row_nums = np.array([x[1] for x in row_pairs], dtype=np.intp)
+            for gameweek in saved['gameweeks'].tolist():
+                state = tracker._initial_state(len(tracker.player_ids))
+                for field in cls.STATE_FIELDS:
+                    state[field][rows] = saved[f"{gameweek}/{field}"][saved_row_nums]
+                if (state['entries'] > player_stat_store.lengths).any():
+                    break
+                tracker.checkpoints[gameweek] = state
+                tracker.latest_gameweek = gameweek
+        tracker.state = tracker._copy_state(tracker.checkpoints[tracker.latest_gameweek])
+        return tracker
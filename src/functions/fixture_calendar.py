@@ -0,0 +1,170 @@
+import numpy as np
+
+class FixtureCalendar:
+    """
+    Team x gameweek grid of the season's fixtures, built once from the fixtures/ payload. Arrays are indexed directly by FPL team ID
+    and gameweek, with a trailing axis for the fixtures a team plays in that gameweek (in kickoff order), so a double gameweek fills
+    two slots and a blank none:
+    - opponents: opponent team ID (0 where there is no fixture)
+    - is_home: 1 at home, 0 away, -1 where there is no fixture
+    - difficulty: the team's FDR for the fixture (0 where there is no fixture)
+    - fixture_counts: fixtures per team and gameweek, flagging blanks (0) and doubles (> 1)
+    Fixtures not (re)scheduled to a gameweek yet are left out of the grid until the API assigns them one.
+
+    Difficulty is also held per fixture (fixture_difficulty[fixture ID, is_home], from team_h_difficulty / team_a_difficulty) so
+    that rows already carrying a fixture ID (e.g. player history) resolve their FDR with one array index.
+    """
+
+    def __init__(self, fixtures: list, team_ids: list, last_gameweek: int):
+        self.team_ids = sorted(team_ids)
+        self.last_gameweek = last_gameweek
+        scheduled_fixtures = sorted((x for x in fixtures if x['event']), key=lambda x: (x['event'], x['kickoff_time'] or ''))
+        grid_shape = (max(self.team_ids) + 1, last_gameweek + 1)
+
+        self.fixture_counts = np.zeros(grid_shape, dtype=np.int8)
+        for fixture_data in scheduled_fixtures:
+            self.fixture_counts[fixture_data['team_h'], fixture_data['event']] += 1
+            self.fixture_counts[fixture_data['team_a'], fixture_data['event']] += 1
+
+        max_slots = max(1, int(self.fixture_counts.max()))
+        self.opponents = np.zeros(grid_shape + (max_slots,), dtype=np.int16)
+        self.is_home = np.full(grid_shape + (max_slots,), -1, dtype=np.int8)
+        self.difficulty = np.zeros(grid_shape + (max_slots,), dtype=np.int8)
+        self.fixture_ids = np.zeros(grid_shape + (max_slots,), dtype=np.int32)
+        filled_slots = np.zeros(grid_shape, dtype=np.int8)
+        for fixture_data in scheduled_fixtures:
+            gameweek = fixture_data['event']
+            for team_id, opponent_id, is_home, difficulty in (
+                (fixture_data['team_h'], fixture_data['team_a'], 1, fixture_data['team_h_difficulty']),
+                (fixture_data['team_a'], fixture_data['team_h'], 0, fixture_data['team_a_difficulty']),
+            ):
+                slot = filled_slots[team_id, gameweek]
+                self.opponents[team_id, gameweek, slot] = opponent_id
+                self.is_home[team_id, gameweek, slot] = is_home
+                self.difficulty[team_id, gameweek, slot] = difficulty
+                self.fixture_ids[team_id, gameweek, slot] = fixture_data['id']
+                filled_slots[team_id, gameweek] += 1
+
+        self.fixture_difficulty = np.zeros((max((x['id'] for x in fixtures), default=0) + 1, 2), dtype=np.int8)
+        for fixture_data in fixtures:
+            self.fixture_difficulty[fixture_data['id']] = (fixture_data['team_a_difficulty'], fixture_data['team_h_difficulty'])
+
+    def gather(self, team_ids, first_gw: int, last_gw: int):
+        """
+        Gather the fixtures of many teams over a gameweek window in one indexing operation.
+
+        Parameters:
+        - team_ids (array-like): FPL team IDs, repeated as needed (e.g. one per player)
+        - first_gw (int): First gameweek of the window
+        - last_gw (int): Last gameweek of the window (inclusive, capped to the last gameweek of the season)
+
+        Returns:
+        - tuple: (opponents, is_home, difficulty, fixture_counts), the first three shaped (teams, gameweeks, slots) and the last (teams, gameweeks).
+        """
+        team_ids = np.asarray(team_ids, dtype=np.intp)
+        gameweeks = slice(max(first_gw, 1), min(last_gw, self.last_gameweek) + 1)
+        return self.opponents[team_ids, gameweeks], self.is_home[team_ids, gameweeks], self.difficulty[team_ids, gameweeks], self.fixture_counts[team_ids, gameweeks]
+
+    def lookup_fixture_fdrs(self, fixture_ids, is_home):
+        """
+        Vectorized FDR of fixtures from one side's point of view.
+
+        Parameters:
+        - fixture_ids (array-like): FPL fixture IDs
+        - is_home (array-like): 1/True for the home side, 0/False for the away side, aligned with fixture_ids
+
+        Returns:
+        - np.ndarray: Difficulty faced by that side in each fixture, 0 for fixture IDs not in the payload.
+        """
+        fixture_ids = np.asarray(fixture_ids, dtype=np.intp)
+        is_home = np.asarray(is_home).astype(np.intp)
+        known = (fixture_ids > 0) & (fixture_ids < len(self.fixture_difficulty))
+        fdrs = np.zeros(fixture_ids.shape, dtype=np.int8)
+        fdrs[known] = self.fixture_difficulty[fixture_ids[known], is_home[known]]
+        return fdrs
+
+    def lookup_fdrs(self, team_ids, gameweeks, opponent_ids):
+        """
+        Vectorized FDR faced by teams in given gameweeks against given opponents, matching the opponent so that either fixture of
+        a double gameweek resolves correctly.
+
+        Parameters:
+        - team_ids (array-like): FPL team IDs
+        - gameweeks (array-like): Gameweeks, aligned with team_ids
+        - opponent_ids (array-like): Opponent team IDs, aligned with team_ids
+
+        Returns:
+        - np.ndarray: Difficulty of each fixture, 0 where the teams do not meet in that gameweek.
+        """
+        team_ids = np.asarray(team_ids, dtype=np.intp)
+        gameweeks = np.clip(np.asarray(gameweeks, dtype=np.intp), 0, self.last_gameweek)
+        opponent_ids = np.asarray(opponent_ids)
+        is_opponent = self.opponents[team_ids, gameweeks] == opponent_ids[..., None]
+        return np.where(is_opponent, self.difficulty[team_ids, gameweeks], 0).max(axis=-1)
+
+    def grab_opponent_difficulties(self, after_gw: int):
+        """
+        Single difficulty of facing each team, for places that need one number per team (e.g. colour coding past opponents): the FDR
+        their opponent gets in their first fixture after the given gameweek, or in their last fixture once none are left.
+
+        Returns:
+        - dict: Difficulty per team ID.
+        """
+        team_ids = np.array(self.team_ids, dtype=np.intp)
+        has_fixture = self.fixture_counts[team_ids] > 0
+        upcoming = has_fixture & (np.arange(self.last_gameweek + 1) > after_gw)
+        opponent_difficulties = {}
+        for row, team_id in enumerate(self.team_ids):
+            gameweeks = np.flatnonzero(upcoming[row]) if upcoming[row].any() else np.flatnonzero(has_fixture[row])[::-1]
+            if len(gameweeks):
+                gameweek = gameweeks[0]
+                opponent_id = int(self.opponents[team_id, gameweek, 0])
+                opponent_difficulties[team_id] = int(self.lookup_fdrs([opponent_id], [gameweek], [team_id])[0])
+        return opponent_difficulties
+
+    def grab_team_fixtures(self, team_id: int, first_gw: int, last_gw: int):
+        """
+        Parameters:
+        - team_id (int): FPL team ID
+        - first_gw (int): First gameweek of the window
+        - last_gw (int): Last gameweek of the window (inclusive)
+
+        Returns:
+        - list: One {'gameweek', 'team', 'opponent_team', 'is_home'} per fixture in gameweek then kickoff order, with a blank gameweek
+                holding a single entry whose 'team', 'opponent_team' and 'is_home' are None.
+        """
+        return self.grab_teams_fixtures([team_id], first_gw, last_gw)[team_id]
+
+    def grab_teams_fixtures(self, team_ids: list, first_gw: int, last_gw: int):
+        """Batch variant of grab_team_fixtures, gathering every team's window at once. Returns the fixture lists per team ID."""
+        unique_team_ids = sorted(set(team_ids))
+        opponents, is_home, _, fixture_counts = self.gather(unique_team_ids, first_gw, last_gw)
+        first_gw = max(first_gw, 1)
+        teams_fixtures = {}
+        for row, team_id in enumerate(unique_team_ids):
+            team_fixtures = []
+            for offset, fixture_count in enumerate(fixture_counts[row].tolist()):
+                gameweek = first_gw + offset
+                if not fixture_count:
+                    team_fixtures.append({'gameweek': gameweek, 'team': None, 'opponent_team': None, 'is_home': None})
+                for slot in range(fixture_count):
+                    team_fixtures.append({'gameweek': gameweek, 'team': team_id, 'opponent_team': int(opponents[row, offset, slot]), 'is_home': bool(is_home[row, offset, slot])})
+            teams_fixtures[team_id] = team_fixtures
+        return teams_fixtures
+
+    def grab_blanks_and_doubles(self):
+        """
+        Returns:
+        - dict: {"bgws": {gameweek: [team IDs without a fixture]}, "dgws": {gameweek: [team IDs with more than one]}}, listing only
+                gameweeks with at least one blanking / doubling team.
+        """
+        team_counts = self.fixture_counts[self.team_ids, 1:]
+        blank_gameweeks, double_gameweeks = {}, {}
+        for offset in range(team_counts.shape[1]):
+            blank_teams = [self.team_ids[row] for row in np.flatnonzero(team_counts[:, offset] == 0)]
+            double_teams = [self.team_ids[row] for row in np.flatnonzero(team_counts[:, offset] > 1)]
+            if blank_teams:
+                blank_gameweeks[offset + 1] = blank_teams
+            if double_teams:
+                double_gameweeks[offset + 1] = double_teams
+        return {"bgws": blank_gameweeks, "dgws": double_gameweeks}
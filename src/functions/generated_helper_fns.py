@@ -5,12 +5,12 @@ import pandas as pd
 import difflib
 
 from src.functions.data_exporter import output_data_to_json, grab_path_relative_to_root
-from src.functions.helper_utils import initialize_local_data
+from src.functions.helper_utils import initialize_local_data, run_coroutine_sync
 
 from src.functions.data_builder import FPLRawDataCompiler, UnderstatRawDataCompiler
+from src.functions.fixture_calendar import FixtureCalendar
 
 from collections import defaultdict
-import asyncio
 import json
 
 # from understatapi import UnderstatClient
@@ -21,15 +21,25 @@ class FPLDataConsolidationInterpreter(FPLRawDataCompiler):
     def __init__(self):
         super().__init__()
         print("Assigning FPL helper functions to parsed and consolidated data via FPL.")
+        self.fixture_calendar = FixtureCalendar(self.fixtures, list(self.bootstrap_index.teams), max(x['id'] for x in self.raw_data['events']))
         self.fdr_data = self._compile_fdr_data()
         self.unique_player_data = self._grab_all_unique_fpl_player_data()
+        self.player_dimension_table = self._build_player_dimension_table()
         self.special_gws = self._grab_blanks_and_dgws()
         self.personal_fpl_id = self._get_personal_fpl_id()
         self.personal_beacon_ids = self._get_beacon_ids()
         self.league_ids = self._get_league_ids()
     
     def compile_player_data(self, id_values: list):
-        return {k:v for k,v in self.master_summary.items() if k in id_values}
+        player_rows = self.player_stat_store.player_rows # Same order as master_summary
+        return {k: self.master_summary[k] for k in sorted({x for x in id_values if x in player_rows}, key=player_rows.get)}
+
+    def grab_player_record(self, idx):
+        return self.player_stat_store.records[idx]
+
+    def grab_player_records(self, id_values: list):
+        records = self.player_stat_store.records
+        return {idx: records[idx] for idx in id_values if idx in records}
 
     def slice_player_data(self, compiled_player_data: dict, look_back: int):
 
@@ -38,7 +48,9 @@ class FPLDataConsolidationInterpreter(FPLRawDataCompiler):
             temp_dict = defaultdict(lambda: defaultdict(list))
             temp_dict['id'] = player_id
             for k,v in player_data.items():
-                if isinstance(v, list):
+                if isinstance(v, list) and self.player_stat_store.has_stat(k) and player_id in self.player_stat_store:
+                    temp_dict[k] = self.player_stat_store.stat(player_id, k, look_back).tolist()
+                elif isinstance(v, list):
                     if all(isinstance(item, (tuple)) for item in v):
                         v = [x[1] for x in v]
                     temp_dict[k] = v[-1*abs(look_back):]
@@ -56,89 +68,91 @@ class FPLDataConsolidationInterpreter(FPLRawDataCompiler):
     #========================== General Parsing ==========================
     
     def _grab_blanks_and_dgws(self):
-        all_gameweeks = {}
-        for fixture_data in self.fixtures:
-            gameweek = fixture_data['event']
-            if gameweek:
-                if gameweek not in all_gameweeks.keys():
-                    all_gameweeks[gameweek] = []
-                all_gameweeks[gameweek].extend((fixture_data['team_a'],fixture_data['team_h']))
-        blank_gameweeks = {}
-        double_gameweeks = {}
-        for gw,teams in all_gameweeks.items():
-            blank_gameweeks[gw] = [x for x in range(1,21) if x not in teams]
-            double_gameweeks[gw] = [x for x in teams if teams.count(x) > 1]
-        return {"bgws": {k: v for k, v in blank_gameweeks.items() if v},
-                "dgws": {k: v for k, v in double_gameweeks.items() if v}}
+        return self.fixture_calendar.grab_blanks_and_doubles()
 
     def grab_player_name_fpl(self, idx):
-        return next(x['web_name'] for x in self.raw_data['elements'] if x['id'] == idx)
+        return self.bootstrap_index.element(idx)['web_name']
 
     def grab_player_value(self, idx):
-        return self.compile_player_data([idx])[idx]['value'][-1][-1]/10
+        return self.grab_player_record(idx).value
+
+    def grab_player_values(self, id_values: list):
+        return {idx: value/10 for idx, value in self.player_stat_store.latest_values('value', id_values).items()}
 
     def grab_player_pos(self, idx):
-        return self.compile_player_data([idx])[idx]['pos_singular_name_short']
+        return self.grab_player_record(idx).pos_singular_name_short
+
+    def grab_player_positions(self, id_values: list):
+        return {idx: record.pos_singular_name_short for idx, record in self.grab_player_records(id_values).items()}
      
     def grab_player_team(self, idx):
-        return self.compile_player_data([idx])[idx]['team_short_name']
+        return self.grab_player_record(idx).team_short_name
+
+    def grab_player_teams(self, id_values: list):
+        return {idx: record.team_short_name for idx, record in self.grab_player_records(id_values).items()}
      
     def grab_player_team_id(self, idx):
-        return self.compile_player_data([idx])[idx]['team']
+        return self.grab_player_record(idx).team
+
+    def _grab_player_stat(self, idx, stat_name: str, include_gws: bool):
+        record = self.grab_player_record(idx)
+        stat_values = record.stat(stat_name)
+        return stat_values if not include_gws else list(zip(record.rounds().tolist(), stat_values.tolist()))
      
     def grab_player_hist(self, idx, include_gws=False):
-        return [param_val if not include_gws else (gw, param_val) for gw, param_val in self.compile_player_data([idx])[idx]['total_points']]
+        return self._grab_player_stat(idx, 'total_points', include_gws)
      
     def grab_player_returns(self, idx, include_gws=False):
-        def process_binary_returns(points_tup):
-            return (points_tup[0], 2) if (points_tup[1] > 9) else (points_tup[0], 1) if (points_tup[1] > 3 and points_tup[1] <= 9) else (points_tup[0], 0)
-        return [process_binary_returns(param_val) if not include_gws else (gw, process_binary_returns(param_val)) for gw, param_val in self.compile_player_data([idx])[idx]['total_points']]
+        def process_binary_returns(points):
+            return 2 if points > 9 else 1 if points > 3 else 0
+        return [process_binary_returns(param_val) if not include_gws else (gw, process_binary_returns(param_val)) for gw, param_val in self.grab_player_hist(idx, include_gws=True)]
      
     def grab_player_minutes(self, idx, include_gws=False):
-        return [param_val if not include_gws else (gw, param_val) for gw, param_val in self.compile_player_data([idx])[idx]['minutes']]
+        return self._grab_player_stat(idx, 'minutes', include_gws)
      
     def grab_player_bps(self, idx, include_gws=False):
-        return [param_val if not include_gws else (gw, param_val) for gw, param_val in self.compile_player_data([idx])[idx]['bps']]
+        return self._grab_player_stat(idx, 'bps', include_gws)
 
     def grab_team_id(self, team_name):
-        return next(x['id'] for x in self.raw_data['teams'] if x['name'] == team_name)
+        return self.bootstrap_index.team_by_name(team_name)['id']
 
     def grab_team_name_full(self, team_id):
-        return next(x['name'] for x in self.raw_data['teams'] if x['id'] == team_id)
+        return self.bootstrap_index.team(team_id)['name']
     
     def grab_team_name_short(self, team_id):
-        return next(x['short_name'] for x in self.raw_data['teams'] if x['id'] == team_id)
+        return self.bootstrap_index.team(team_id)['short_name']
 
     def grab_pos_name(self, idx):
-        return next((x['plural_name_short'] for x in iter(self.raw_data['element_types']) if x['id'] == idx), None)
+        pos_data = self.bootstrap_index.position(idx)
+        return pos_data['plural_name_short'] if pos_data else None
 
     def grab_upcoming_fixtures(self, id_values: list, games_ahead: int = 99, reference_gw: int = None):
         '''
-        NB: We enable gw_data['event'] to handle Nonetypes as sometimes there are games that are yet to be rescheduled by the PL, so we remove it until it has been officially announced and updated in API.
+        NB: Fixtures yet to be rescheduled by the PL (no gameweek in the API) are left out until they have been officially announced and updated in API.
         We also need to preserve gameweeks that are considered blanks, as once data is returned without including it there is no information to point to there being a blank outside of external functions.
+        Fixtures are looked up per team from the fixture calendar, so every player of a team shares the same (gathered once) window.
         '''
-        if reference_gw is None: reference_gw = self.latest_gw
-        raw_data = self.full_element_summary
-        def process_fixtures(all_fixtures: list):            
-            return [{'gameweek': gw_info['event'], 'team': gw_info['team_h'] if gw_info['is_home'] else gw_info['team_a'], 'opponent_team': gw_info['team_a'] if gw_info['is_home'] else gw_info['team_h'], 'is_home': gw_info['is_home']} for gw_info in all_fixtures if (gw_info['event'] and (gw_info['event'] >= reference_gw+1 and gw_info['event'] <= reference_gw + games_ahead))]
-        compiled_player_data = {str(player_id): process_fixtures(raw_data[player_id]['fixtures']) for player_id in sorted(id_values)}
-        
-        #Handle blanks, which are usually not present at all
-        for player_id, player_data in compiled_player_data.items():
-            last_gw = max([x['id'] for x in self.raw_data['events']])
-            expected_gws = list(range(reference_gw+1, min(last_gw+1, reference_gw+games_ahead+1)))
-            compiled_gws = list({x['gameweek'] for x in player_data})
-            gw_conflicts = [gw for gw in expected_gws if gw not in compiled_gws]
-            if len(gw_conflicts) >= 1:
-                for gw in gw_conflicts:
-                    compiled_player_data[player_id].append({'gameweek': gw, 'team': None, 'opponent_team': None, 'is_home': None})
-                compiled_player_data[player_id] = sorted(compiled_player_data[player_id], key=lambda x: x['gameweek'])
-                
-        return compiled_player_data
+        if reference_gw is None: reference_gw = self.latest_gw or 0
+        player_teams = {player_id: self.bootstrap_index.element(player_id)['team'] for player_id in sorted(id_values)}
+        teams_fixtures = self.fixture_calendar.grab_teams_fixtures(list(player_teams.values()), reference_gw + 1, reference_gw + games_ahead)
+        return {str(player_id): [dict(x) for x in teams_fixtures[team_id]] for player_id, team_id in player_teams.items()}
 
     def _grab_all_unique_fpl_player_data(self):
         return [{**{k: v for k, v in self.master_summary[x].items() if k in ['first_name', 'second_name', 'web_name', 'pos_singular_name_short', 'team_short_name', 'team']}, 'id': x} for x in self.player_ids]
 
+    def _build_player_dimension_table(self):
+        """
+        Player metadata as a DataFrame indexed by player_id (player_name, player_pos, player_team), built once so that player-level
+        frames pick up their display columns with a single join rather than a lookup per row.
+        """
+        records = self.player_stat_store.records
+        player_ids = list(self.bootstrap_index.elements)
+        return pd.DataFrame({
+            'player_name': [self.bootstrap_index.element(idx)['web_name'] for idx in player_ids],
+            'player_pos': [records[idx].pos_singular_name_short if idx in records else np.nan for idx in player_ids],
+            'player_team': [records[idx].team_short_name if idx in records else np.nan for idx in player_ids],
+        }, index=pd.Index(player_ids, name='player_id'))
+
     def grab_bins_from_param(self, input_param):
         if input_param == 'ict_index':
             return (3.5, 5, 7.5)
@@ -160,36 +174,43 @@ class FPLDataConsolidationInterpreter(FPLRawDataCompiler):
 #================================================================================================================================================================
     
     def _compile_fdr_data(self):
-#       #========================== Compile FDRs from team_info ==========================
-        init_id = 1
-        fdr_data = {}
-        while init_id < len(self.player_ids):
-            if init_id in self.player_ids:
-                null_team_id = self.grab_player_team_id(init_id)
-                player_element_summary = self.full_element_summary[init_id]["fixtures"]
-                try:
-                    fdr_info = [[([i['team_h'],i['team_a']],i['difficulty']) for i in player_element_summary][0]]
-                    fdr_simpl = [((set(x[0]) - {null_team_id}).pop(),x[1]) for x in fdr_info]
-                    for pair in fdr_simpl:
-                        if pair[0] not in fdr_data.keys():
-                            fdr_data[pair[0]] = pair[1]
-                except:
-                    pass
-            init_id += 10
-        init_id = 1
-        while len(fdr_data) < 20 and init_id < len(self.player_ids):
-            null_team_id = self.grab_player_team_id(init_id)
-            player_element_summary = self.full_element_summary[init_id]["fixtures"]
-            fdr_info = [([i['team_h'],i['team_a']],i['difficulty']) for i in player_element_summary][:3]
-            fdr_simpl = [((set(x[0]) - {null_team_id}).pop(),x[1]) for x in fdr_info]
-            for pair in fdr_simpl:
-                if pair[0] not in fdr_data.keys():
-                    fdr_data[pair[0]] = pair[1] 
-            init_id += 10
-        if len(fdr_data) < 20:
-            fdr_data = {
-                1:4,2:3,3:2,4:3,5:2,6:4,7:2,8:2,9:3,10:2,11:5,12:5,13:4,14:3,15:1,16:2,17:4,18:1,19:3,20:2}
-        return fdr_data
+        return self.fixture_calendar.grab_opponent_difficulties(self.latest_gw or 0)
+
+    def grab_history_matrix(self, rows: np.ndarray, stat_name: str):
+        """
+        Stat of the given player_stat_store rows laid out like player_stat_store.stat_matrix (rows x entries, NaN padded). Stats kept
+        out of the cube for holding None (e.g. team scores of fixtures still being played) are built from master_summary, None as NaN.
+        """
+        player_stat_store = self.player_stat_store
+        if player_stat_store.has_stat(stat_name):
+            return player_stat_store.stat_matrix(stat_name)[rows]
+        stat_matrix = np.full((len(rows), player_stat_store.rounds.shape[1]), np.nan)
+        for row_num, row in enumerate(rows):
+            stat_data = self.master_summary[int(player_stat_store.player_ids[row])].get(stat_name) or []
+            stat_matrix[row_num, :len(stat_data)] = [np.nan if x[1] is None else x[1] for x in stat_data]
+        return stat_matrix
+
+    def grab_history_fdr_matrix(self, rows: np.ndarray):
+        """
+        FDR each player's team faced in each history entry of the given player_stat_store rows, laid out like
+        player_stat_store.stat_matrix for batch consumers (e.g. the Elo engine). FDRs are resolved per fixture from the fixtures
+        payload in one vectorized lookup, entries whose fixture is missing from it falling back to team_rank of the opponent.
+
+        Parameters:
+        - rows (np.ndarray): Row numbers in player_stat_store (see player_stat_store.player_rows)
+
+        Returns:
+        - np.ndarray: rows x entries FDRs, 0 in the padding.
+        """
+        player_stat_store = self.player_stat_store
+        in_history = np.arange(player_stat_store.rounds.shape[1]) < player_stat_store.lengths[rows][:, None]
+        fixture_ids = np.where(in_history, player_stat_store.stat_matrix('fixture')[rows], 0)
+        was_home = np.where(in_history, player_stat_store.stat_matrix('was_home')[rows], 0)
+        fdrs = self.fixture_calendar.lookup_fixture_fdrs(fixture_ids, was_home)
+        opponent_ids = player_stat_store.stat_matrix('opponent_team')[rows]
+        for row_num, entry_num in zip(*np.nonzero(in_history & (fdrs == 0))):
+            fdrs[row_num, entry_num] = self.team_rank(int(opponent_ids[row_num, entry_num]))
+        return fdrs
 
     def team_rank(self,team_id):
         try:
@@ -199,7 +220,7 @@ class FPLDataConsolidationInterpreter(FPLRawDataCompiler):
         return rank
     
     def rem_fixtures_difficulty(self, idx: int):
-        r = asyncio.run(self.fetch_element_summaries(idx))
+        r = run_coroutine_sync(self.fetch_element_summaries(idx))
         difflist=[]
         for diff in r['fixtures']:
             difflist.append(diff['difficulty'])
@@ -369,8 +390,9 @@ class FPLDataConsolidationInterpreter(FPLRawDataCompiler):
             print("Need 15 entries for list!")
             return
         team_dict = {}
+        player_positions = self.grab_player_positions(team_ids)
         for idx in team_ids:
-            pos = self.grab_player_pos(idx)
+            pos = player_positions[idx]
             if pos not in team_dict:
                 team_dict[pos]=[]
             name = self.grab_player_name_fpl(idx)
@@ -554,13 +576,19 @@ class UnderstatDataInterpreter(UnderstatRawDataCompiler):
         super().__init__(fpl_helper_fns, update_bool)
 
     def grab_player_USID_from_FPLID(self, fpl_player_id):
-        return next((x["understat"]["id"] for x in iter(self.understat_to_fpl_player_data) if x["fpl"]["id"] == fpl_player_id), None)
+        return self.understat_crosswalk.player_understat_id(fpl_player_id)
         
-    def grab_team_USID_from_FPLID(self, fpl_player_id):
-        return next((x["understat"]["id"] for x in iter(self.understat_to_fpl_team_data) if x["fpl"]["id"] == fpl_player_id), None)
+    def grab_team_USID_from_FPLID(self, fpl_team_id):
+        return self.understat_crosswalk.team_understat_id(fpl_team_id)
         
-    def grab_team_USname_from_FPLID(self, fpl_player_id):
-        return next((x["understat"]["id"] for x in iter(self.understat_to_fpl_team_data) if x["fpl"]["id"] == fpl_player_id), None)
+    def grab_team_USname_from_FPLID(self, fpl_team_id):
+        return self.understat_crosswalk.team_understat_name(fpl_team_id)
+
+    def grab_player_FPLID_from_USID(self, understat_player_id):
+        return self.understat_crosswalk.player_fpl_id(understat_player_id)
+
+    def grab_team_FPLID_from_USID(self, understat_team_id):
+        return self.understat_crosswalk.team_fpl_id(understat_team_id)
 
     def fetch_team_xg_against_teams_data(self, fpl_team_id) -> list:
         """
@@ -595,25 +623,54 @@ class UnderstatDataInterpreter(UnderstatRawDataCompiler):
         Usefulness is in stats like PPDA which outline how well-pressing certain teams are, which can be later be used to match up upcoming 
         teams and assess weaknesses based on general PPDA and specific PPDA.
 
+        Sums and averages are read off the prefix sums of understat_team_history_store, so any look back costs the same; use
+        fetch_team_param_stats_sweep to evaluate many look back periods at once.
+
         Args:
-            look_back (int): Number of gameweeks in the past to evaluate statistics over.
+            look_back (int): Number of gameweeks in the past to evaluate statistics over, 0 for the whole season.
 
         Returns:
             list: List of dictionaries, where each dictionary represents each team and the associated finite value of each parameter evaluated across the look back period.
         """
-        cols_to_omit = ['h_a', 'result', 'date', 'id', 'title']
-        
+        team_history_store = self.understat_team_history_store
+        sums = team_history_store.window_sums(look_back).tolist()
+        averages = team_history_store.window_averages(look_back).tolist()
+
         compiled_team_data = []
-        for _, team_data in self.understat_team_data.items():
-            temp_data = {'id': team_data['id'], 'title': team_data['title']}
-            for key, values in team_data['history'].items():
-                if key not in cols_to_omit:
-                    temp_data[f"{key}_avg"] = np.mean(values[-look_back:])
-                    temp_data[f"{key}_sum"] = np.sum(values[-look_back:])
-                else: continue
+        for team_id, title, team_sums, team_averages in zip(team_history_store.team_ids, team_history_store.team_titles, sums, averages):
+            temp_data = {'id': team_id, 'title': title}
+            for metric_name, metric_sum, metric_average in zip(team_history_store.metric_names, team_sums, team_averages):
+                temp_data[f"{metric_name}_avg"] = metric_average
+                temp_data[f"{metric_name}_sum"] = metric_sum
             compiled_team_data.append(temp_data)
         return compiled_team_data
 
+    def fetch_team_param_stats_sweep(self, look_backs: list) -> pd.DataFrame:
+        """
+        Averages and sums of all stats of all teams over several look back periods in one vectorized pass, e.g. for dashboards
+        sliding across look backs.
+
+        Args:
+            look_backs (list): Look back periods (number of gameweeks, 0 for the whole season)
+
+        Returns:
+            pd.DataFrame: One row per look back and team ('look_back', 'id', 'title'), with a "{stat}_avg" and "{stat}_sum" column per stat.
+        """
+        team_history_store = self.understat_team_history_store
+        num_teams, num_look_backs = len(team_history_store.team_ids), len(look_backs)
+        sums = team_history_store.window_sums(look_backs).reshape(num_look_backs * num_teams, -1)
+        averages = team_history_store.window_averages(look_backs).reshape(num_look_backs * num_teams, -1)
+
+        columns = {
+            'look_back': np.repeat(look_backs, num_teams),
+            'id': np.tile(team_history_store.team_ids, num_look_backs),
+            'title': np.tile(team_history_store.team_titles, num_look_backs),
+        }
+        for col, metric_name in enumerate(team_history_store.metric_names):
+            columns[f"{metric_name}_avg"] = averages[:, col]
+            columns[f"{metric_name}_sum"] = sums[:, col]
+        return pd.DataFrame(columns)
+
 #     def fetch_player_shots_against_teams(self, fpl_player_id, TEAM_AGAINST_ID):
 #         player_shot_data = self.understat_player_shot_data_group[fpl_player_id]
 #         df = pd.DataFrame(data=player_shot_data)
@@ -2,6 +2,9 @@ import sys
 import os
 import math
 import json
+import pickle
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from src.functions.data_exporter import output_data_to_json, grab_path_relative_to_root
 
 def calculate_mean_std_dev(data):
@@ -18,6 +21,25 @@ def progress_bar_update(i, num_iter, complete=False):
         sys.stdout.write('\rProcessing... \x1b[32m\u2714\x1b[0m\n')
     sys.stdout.flush()
 
+def run_coroutine_sync(coroutine):
+    """
+    Run a coroutine to completion from synchronous code and return its result, whether or not an event loop is already running.
+    In a plain script this is asyncio.run(). Under Jupyter, where the kernel's loop is already running (and asyncio.run() would
+    raise), the coroutine gets its own loop on a worker thread instead, so nest_asyncio is not needed.
+
+    Parameters:
+    - coroutine (coroutine): Coroutine to run
+
+    Returns:
+    - Result of the coroutine.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
 def initialize_local_data(instance, data_list, update_and_export_data = False):
 
     """
@@ -31,7 +53,8 @@ def initialize_local_data(instance, data_list, update_and_export_data = False):
                 "attribute_name": <ENTER ATTRIBUTE NAME>,
                 "file_name": <ENTER FILE NAME>,
                 "export_path": <ENTER DIRECTORY TO FILE>,
-                "update_bool_override": <[OPTIONAL] ENTER UPDATE BOOL FOR SPECIFIC SET TO OVERRIDE GENERAL SETTING>
+                "update_bool_override": <[OPTIONAL] ENTER UPDATE BOOL FOR SPECIFIC SET TO OVERRIDE GENERAL SETTING>,
+                "file_format": <[OPTIONAL] "json" (default) OR "pickle" FOR OBJECTS JSON CANNOT HOLD, E.G. TYPED DATAFRAMES>
         }]
     - update_and_export_data (bool): Description of parameter2.
 
@@ -47,13 +70,21 @@ def initialize_local_data(instance, data_list, update_and_export_data = False):
         if "update_bool_override" in item.keys():
             custom_update_bool = item.get('update_bool_override')
         else: custom_update_bool = None
+        is_pickled = item.get('file_format') == "pickle"
         file_path_written = grab_path_relative_to_root(file_path, absolute=True, create_if_nonexistent=True)
-        full_path = f'{file_path_written}/{file_name}.json'
+        full_path = f'{file_path_written}/{file_name}.{"pkl" if is_pickled else "json"}'
 
         if function and attribute and file_path:
             if update_and_export_data or not os.path.exists(full_path) or custom_update_bool:
                 data = function()
-                output_data_to_json(data, full_path)
+                if is_pickled:
+                    with open(full_path, 'wb') as file:
+                        pickle.dump(data, file)
+                else:
+                    output_data_to_json(data, full_path)
+            elif is_pickled:
+                with open(full_path, 'rb') as file:
+                    data = pickle.load(file)
             else:
                 with open(full_path, 'r') as file:
                     data = json.load(file)
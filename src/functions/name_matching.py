@@ -0,0 +1,202 @@
+import re
+import os
+import html
+import json
+import unicodedata
+
+import numpy as np
+
+from src.functions.data_exporter import output_data_to_json
+
+FOLDED_CHARACTERS = str.maketrans({'ø': 'o', 'æ': 'ae', 'œ': 'oe', 'ß': 'ss', 'ł': 'l', 'đ': 'd', 'ð': 'd', 'þ': 'th', 'ı': 'i'}) # Letters NFKD does not decompose
+
+def normalize_name(name: str):
+    """
+    Fold a player name to lowercase ASCII words: HTML entities unescaped (understat sends e.g. N&#039;Golo), accents stripped,
+    apostrophes dropped and any other punctuation (hyphens, dots) treated as a word break.
+    """
+    name = html.unescape(name or '').lower().translate(FOLDED_CHARACTERS)
+    name = ''.join(c for c in unicodedata.normalize('NFKD', name) if not unicodedata.combining(c))
+    name = re.sub(r"['’`]", '', name)
+    return ' '.join(re.findall(r'[a-z0-9]+', name))
+
+def name_ngrams(normalized_name: str, n: int = 3):
+    padded_name = f" {normalized_name} "
+    return {padded_name[i:i + n] for i in range(len(padded_name) - n + 1)}
+
+class PlayerNameMatcher:
+    """
+    Non-interactive batch matcher of external player names (e.g. understat) onto FPL players.
+
+    Every FPL player is indexed once under each of their name variants (web_name and "first_name second_name"), normalized with
+    normalize_name and broken into character trigrams and word tokens held as binary matrices. Names are matched in blocks sharing
+    the same team(s), each block scored with two matrix products:
+    - trigram cosine similarity, robust to spelling variants and missing accents
+    - token Jaccard similarity, robust to word order (e.g. "Son Heung-Min" vs "Heung-Min Son")
+    A player's score is the best of their variants, averaging both similarities. A match is accepted when its score reaches
+    min_score and beats the best other player by min_margin. Its confidence is the score scaled by the lead over the runner-up as a
+    fraction of confident_margin, so a narrow lead is accepted but trusted less than a clear one, and it orders the names claiming
+    the same FPL player. Anything else (or an FPL player claimed by several names) is reported as ambiguous along with its top candidates.
+    """
+
+    def __init__(self, fpl_player_data: list, min_score: float = 0.6, min_margin: float = 0.05, confident_margin: float = 0.2, ngram_weight: float = 0.5,
+                 num_candidates: int = 3):
+        """
+        Parameters:
+        - fpl_player_data (list): One dict per FPL player with 'id', 'team', 'web_name', 'first_name' and 'second_name'
+        - min_score (float): Lowest score accepted as a match
+        - min_margin (float): Lowest lead over the runner-up accepted as a match
+        - confident_margin (float): Lead over the runner-up from which a match gets full confidence (at least min_margin)
+        - ngram_weight (float): Weight of the trigram similarity in the score (the token similarity gets the rest)
+        - num_candidates (int): Candidates listed for ambiguous names
+        """
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.confident_margin = max(confident_margin, min_margin)
+        self.ngram_weight = ngram_weight
+        self.num_candidates = num_candidates
+        self.players = {x['id']: x for x in fpl_player_data}
+
+        variant_player_ids, variant_teams, variant_ngrams, variant_tokens = [], [], [], []
+        for player in fpl_player_data:
+            normalized_names = dict.fromkeys(normalize_name(name) for name in (player['web_name'], f"{player['first_name']} {player['second_name']}"))
+            for normalized_name in filter(None, normalized_names):
+                variant_player_ids.append(player['id'])
+                variant_teams.append(player['team'])
+                variant_ngrams.append(name_ngrams(normalized_name))
+                variant_tokens.append(set(normalized_name.split()))
+        self.variant_player_ids = np.array(variant_player_ids, dtype=np.int64)
+        self.variant_teams = np.array(variant_teams, dtype=np.int64)
+        self.ngram_columns = {ngram: col for col, ngram in enumerate(sorted(set().union(*variant_ngrams)))}
+        self.token_columns = {token: col for col, token in enumerate(sorted(set().union(*variant_tokens)))}
+        self.variant_ngram_matrix = self._build_matrix(variant_ngrams, self.ngram_columns)
+        self.variant_token_matrix = self._build_matrix(variant_tokens, self.token_columns)
+        self.variant_ngram_counts = np.array([len(x) for x in variant_ngrams], dtype=np.float32)
+        self.variant_token_counts = np.array([len(x) for x in variant_tokens], dtype=np.float32)
+
+    @staticmethod
+    def _build_matrix(feature_sets: list, columns: dict):
+        matrix = np.zeros((len(feature_sets), len(columns)), dtype=np.float32)
+        for row, feature_set in enumerate(feature_sets):
+            matrix[row, [columns[x] for x in feature_set if x in columns]] = 1
+        return matrix
+
+    def _score_block(self, names: list, variant_rows: np.ndarray):
+        """
+        Similarity of every name in a block against the given name variants.
+
+        Returns:
+        - tuple: (player IDs of the block, names x players score matrix), each player scored by their best variant.
+        """
+        normalized_names = [normalize_name(name) for name in names]
+        ngram_sets = [name_ngrams(x) for x in normalized_names]
+        token_sets = [set(x.split()) for x in normalized_names]
+        ngram_overlap = self._build_matrix(ngram_sets, self.ngram_columns) @ self.variant_ngram_matrix[variant_rows].T
+        token_overlap = self._build_matrix(token_sets, self.token_columns) @ self.variant_token_matrix[variant_rows].T
+        ngram_counts = np.array([len(x) for x in ngram_sets], dtype=np.float32)[:, None]
+        token_counts = np.array([len(x) for x in token_sets], dtype=np.float32)[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ngram_similarity = np.nan_to_num(ngram_overlap / np.sqrt(ngram_counts * self.variant_ngram_counts[variant_rows]))
+            token_similarity = np.nan_to_num(token_overlap / (token_counts + self.variant_token_counts[variant_rows] - token_overlap))
+        variant_scores = self.ngram_weight * ngram_similarity + (1 - self.ngram_weight) * token_similarity
+
+        # Variants of a player are contiguous, so each player's best variant is a reduceat over their run of rows
+        block_player_ids = self.variant_player_ids[variant_rows]
+        run_starts = np.flatnonzero(np.r_[True, block_player_ids[1:] != block_player_ids[:-1]])
+        return block_player_ids[run_starts], np.maximum.reduceat(variant_scores, run_starts, axis=1)
+
+    def match(self, queries: list, overrides: dict = None):
+        """
+        Match a batch of names.
+
+        Parameters:
+        - queries (list): One dict per name with 'id', 'name' and 'team_ids' (FPL team IDs the player may belong to, empty to search
+                          every team)
+        - overrides (dict): Resolved matches by query ID (as str), each {"fpl_id": int or None}; a None fpl_id leaves the query to the
+                            matcher
+
+        Returns:
+        - tuple: (matches, ambiguous), matches being {query ID: {"fpl_id", "score", "confidence", "source"}} and ambiguous being
+                 {query ID: [top candidates as {"fpl_id", "name", "team", "score"}]}.
+        """
+        overrides = overrides or {}
+        matches = {}
+        for query in queries:
+            override = overrides.get(str(query['id']))
+            if override and override.get("fpl_id") is not None:
+                matches[query['id']] = {"fpl_id": int(override["fpl_id"]), "score": None, "confidence": 1.0, "source": "override"}
+
+        blocks = {}
+        for query in queries:
+            if query['id'] not in matches:
+                blocks.setdefault(tuple(sorted(set(query['team_ids']))), []).append(query)
+
+        proposals, ambiguous = {}, {}
+        for team_ids, block_queries in blocks.items():
+            variant_rows = np.flatnonzero(np.isin(self.variant_teams, team_ids)) if team_ids else np.arange(len(self.variant_player_ids))
+            if not len(variant_rows):
+                ambiguous.update({query['id']: [] for query in block_queries})
+                continue
+            block_player_ids, scores = self._score_block([query['name'] for query in block_queries], variant_rows)
+            ranking = np.argsort(-scores, axis=1, kind='stable')
+            for query, query_scores, query_ranking in zip(block_queries, scores, ranking):
+                best_score = float(query_scores[query_ranking[0]])
+                margin = best_score - float(query_scores[query_ranking[1]]) if len(query_ranking) > 1 else best_score
+                if best_score >= self.min_score and margin >= self.min_margin:
+                    proposals[query['id']] = {
+                        "fpl_id": int(block_player_ids[query_ranking[0]]),
+                        "score": round(best_score, 3),
+                        "confidence": round(best_score * min(1.0, margin / self.confident_margin), 3) if self.confident_margin else round(best_score, 3),
+                        "source": "matcher",
+                    }
+                else:
+                    ambiguous[query['id']] = self._describe_candidates(block_player_ids, query_scores, query_ranking)
+
+        # An FPL player claimed by several names goes to the override, or else the most confident name, the others being left for review
+        overridden_fpl_ids = {x["fpl_id"] for x in matches.values()}
+        claims = {}
+        for query_id, proposal in proposals.items():
+            claims.setdefault(proposal["fpl_id"], []).append(query_id)
+        for fpl_id, query_ids in claims.items():
+            query_ids = sorted(query_ids, key=lambda x: proposals[x]["confidence"], reverse=True)
+            if fpl_id not in overridden_fpl_ids:
+                winning_query_id = query_ids.pop(0)
+                matches[winning_query_id] = proposals[winning_query_id]
+            for query_id in query_ids:
+                ambiguous[query_id] = [{"fpl_id": fpl_id, "name": self.players[fpl_id]['web_name'], "team": self.players[fpl_id]['team'], "score": proposals[query_id]["score"]}]
+        return matches, ambiguous
+
+    def _describe_candidates(self, block_player_ids: np.ndarray, query_scores: np.ndarray, query_ranking: np.ndarray):
+        return [{
+            "fpl_id": int(block_player_ids[col]),
+            "name": self.players[int(block_player_ids[col])]['web_name'],
+            "team": self.players[int(block_player_ids[col])]['team'],
+            "score": round(float(query_scores[col]), 3),
+        } for col in query_ranking[:self.num_candidates]]
+
+#================================================================================================================================================================
+#========================================================================= OVERRIDES ============================================================================
+#================================================================================================================================================================
+
+def load_match_overrides(file_path: str):
+    """Overrides file written by save_match_overrides, keyed by query ID (as str). Empty if the file does not exist yet."""
+    if not os.path.isfile(file_path):
+        return {}
+    with open(file_path, 'r') as file:
+        return json.load(file)
+
+def save_match_overrides(file_path: str, overrides: dict, ambiguous: dict, query_names: dict):
+    """
+    Write the overrides back with every currently ambiguous name listed (fpl_id None, plus its candidates) for a person to resolve
+    by filling in fpl_id. Resolved overrides are kept as they are, and unresolved ones no longer ambiguous are dropped.
+
+    Parameters:
+    - file_path (str): Path of the overrides file
+    - overrides (dict): Overrides loaded with load_match_overrides
+    - ambiguous (dict): Second output of PlayerNameMatcher.match
+    - query_names (dict): Name per query ID, to make the file readable
+    """
+    updated_overrides = {query_id: override for query_id, override in overrides.items() if override.get("fpl_id") is not None}
+    for query_id, candidates in ambiguous.items():
+        updated_overrides[str(query_id)] = {"fpl_id": None, "name": query_names.get(query_id), "candidates": candidates}
+    output_data_to_json(updated_overrides, file_path)
@@ -0,0 +1,184 @@
+import os
+import json
+
+import numpy as np
+
+from src.functions.data_exporter import output_data_to_json
+
+class PlayerRecord:
+    """Static fields of one player, plus zero-copy views of their stats in the PlayerStatStore the record belongs to."""
+
+    STATIC_FIELDS = ('web_name', 'team', 'team_short_name', 'pos_singular_name_short')
+    __slots__ = ('id', 'store') + STATIC_FIELDS
+
+    def __init__(self, store, player_id: int, static_data: dict):
+        self.id = player_id
+        self.store = store
+        for field in self.STATIC_FIELDS:
+            setattr(self, field, static_data.get(field))
+
+    def stat(self, stat_name: str, look_back: int = 0):
+        return self.store.stat(self.id, stat_name, look_back)
+
+    def rounds(self, look_back: int = 0):
+        return self.store.player_rounds(self.id, look_back)
+
+    @property
+    def value(self):
+        return self.store.latest_values('value', [self.id])[self.id] / 10
+
+class PlayerStatStore:
+    """
+    Array-backed view of the numeric per-round stats of master_summary: a single stats x players x entries float64 cube (NaN
+    padded), plus a players x entries round index and the number of entries of each player. A player's entries are in the same
+    order as in master_summary (so a double gameweek holds two entries for the same round).
+
+    Accessors return zero-copy views into the cube, so lookback windows are O(1) slices rather than list rebuilds. Each player
+    also gets a PlayerRecord (self.records) holding their static fields, for keyed access without touching master_summary.
+    """
+
+    def __init__(self, player_ids: np.ndarray, stat_names: list, rounds: np.ndarray, values: np.ndarray, lengths: np.ndarray, static_data: list):
+        self.player_ids = player_ids
+        self.stat_names = stat_names
+        self.rounds = rounds
+        self.values = values
+        self.lengths = lengths
+        self.player_rows = {int(player_id): row for row, player_id in enumerate(player_ids)}
+        self.stat_columns = {stat_name: col for col, stat_name in enumerate(stat_names)}
+        self.static_data = static_data
+        self.records = {int(player_id): PlayerRecord(self, int(player_id), player_static_data) for player_id, player_static_data in zip(player_ids, static_data)}
+
+    @classmethod
+    def from_master_summary(cls, master_summary: dict):
+        """
+        Parameters:
+        - master_summary (dict): Output of FPLRawDataCompiler._build_master_summary
+
+        Returns:
+        - PlayerStatStore: Store of every stat whose values are all numeric (e.g. kickoff_time is left out), None being read as NaN
+                           (e.g. the score of a fixture still being played, or a price the history was not given).
+        """
+        non_numeric_stats = {'round'}
+        stat_names = []
+        for player_data in master_summary.values():
+            for stat_name, stat_data in player_data.items():
+                if not isinstance(stat_data, list) or stat_name in non_numeric_stats:
+                    continue
+                if not all(x[1] is None or isinstance(x[1], (int, float)) for x in stat_data):
+                    non_numeric_stats.add(stat_name)
+                elif stat_name not in stat_names:
+                    stat_names.append(stat_name)
+        stat_names = [stat_name for stat_name in stat_names if stat_name not in non_numeric_stats]
+
+        player_ids = np.array(list(master_summary.keys()), dtype=np.int32)
+        lengths = np.array([len(player_data['round']) for player_data in master_summary.values()], dtype=np.int32)
+        max_entries = int(lengths.max()) if len(lengths) else 0
+        rounds = np.full((len(player_ids), max_entries), -1, dtype=np.int16)
+        values = np.full((len(stat_names), len(player_ids), max_entries), np.nan)
+        for row, player_data in enumerate(master_summary.values()):
+            rounds[row, :lengths[row]] = player_data['round']
+            for col, stat_name in enumerate(stat_names):
+                stat_data = player_data.get(stat_name)
+                if stat_data:
+                    values[col, row, :len(stat_data)] = [np.nan if x[1] is None else x[1] for x in stat_data]
+        static_data = [{field: player_data.get(field) for field in PlayerRecord.STATIC_FIELDS} for player_data in master_summary.values()]
+        return cls(player_ids, stat_names, rounds, values, lengths, static_data)
+
+    def export(self, directory: str, file_name: str):
+        """
+        Write the cube as a raw fixed-dtype binary ({file_name}.dat) with a JSON sidecar ({file_name}.json) holding its dtype, shape,
+        stat names, player IDs, each player's rounds and their static fields. Both files are written aside and swapped in, so processes that still have
+        the previous cube mapped keep reading a consistent copy.
+
+        Parameters:
+        - directory (str): Directory to write to
+        - file_name (str): File name without extension
+        """
+        values_path = f"{directory}/{file_name}.dat"
+        self.values.tofile(f"{values_path}.tmp")
+        os.replace(f"{values_path}.tmp", values_path)
+        output_data_to_json({
+            "dtype": self.values.dtype.str,
+            "shape": list(self.values.shape),
+            "stat_names": self.stat_names,
+            "player_ids": self.player_ids.tolist(),
+            "rounds": [self.rounds[row, :length].tolist() for row, length in enumerate(self.lengths)],
+            "static_data": self.static_data,
+        }, f"{directory}/{file_name}.json.tmp")
+        os.replace(f"{directory}/{file_name}.json.tmp", f"{directory}/{file_name}.json")
+
+    @classmethod
+    def from_memmap(cls, directory: str, file_name: str):
+        """
+        Open a cube written by export as a read-only memory map: nothing is parsed beyond the sidecar, only the pages of the stats
+        actually read are loaded, and every process opening the same file shares them.
+
+        Parameters:
+        - directory (str): Directory the cube was exported to
+        - file_name (str): File name without extension
+
+        Returns:
+        - PlayerStatStore: Store whose values are an np.memmap.
+        """
+        with open(f"{directory}/{file_name}.json", 'r') as file:
+            sidecar = json.load(file)
+        shape = tuple(sidecar["shape"])
+        if 0 in shape: # np.memmap cannot map an empty file
+            values = np.empty(shape, dtype=np.dtype(sidecar["dtype"]))
+        else:
+            values = np.memmap(f"{directory}/{file_name}.dat", dtype=np.dtype(sidecar["dtype"]), mode='r', shape=shape)
+        lengths = np.array([len(player_rounds) for player_rounds in sidecar["rounds"]], dtype=np.int32)
+        rounds = np.full((len(lengths), shape[2]), -1, dtype=np.int16)
+        for row, player_rounds in enumerate(sidecar["rounds"]):
+            rounds[row, :lengths[row]] = player_rounds
+        return cls(np.array(sidecar["player_ids"], dtype=np.int32), sidecar["stat_names"], rounds, values, lengths, sidecar["static_data"])
+
+    def __contains__(self, player_id):
+        return player_id in self.player_rows
+
+    def has_stat(self, stat_name: str):
+        return stat_name in self.stat_columns
+
+    def stat(self, player_id: int, stat_name: str, look_back: int = 0):
+        """
+        Parameters:
+        - player_id (int): FPL player ID
+        - stat_name (str): Stat as named in master_summary, e.g. 'total_points'
+        - look_back (int): Number of most recent entries to keep, 0 for all of them
+
+        Returns:
+        - np.ndarray: View of the player's values of the stat, oldest first.
+        """
+        row = self.player_rows[player_id]
+        length = self.lengths[row]
+        start = max(0, length - abs(look_back)) if look_back else 0
+        return self.values[self.stat_columns[stat_name], row, start:length]
+
+    def player_rounds(self, player_id: int, look_back: int = 0):
+        row = self.player_rows[player_id]
+        length = self.lengths[row]
+        start = max(0, length - abs(look_back)) if look_back else 0
+        return self.rounds[row, start:length]
+
+    def stat_matrix(self, stat_name: str):
+        """View of a stat for every player (players x entries, NaN padded), in the row order of self.player_ids."""
+        return self.values[self.stat_columns[stat_name]]
+
+    def latest_values(self, stat_name: str, id_values: list):
+        """
+        Batch lookup of each player's most recent known (non-NaN) value of a stat, gathered from the cube in one go.
+
+        Parameters:
+        - stat_name (str): Stat as named in master_summary, e.g. 'value'
+        - id_values (list): FPL player IDs, those without any history being skipped
+
+        Returns:
+        - dict: Latest value per player ID, NaN for players without any known value.
+        """
+        player_ids = [player_id for player_id in id_values if player_id in self.player_rows]
+        rows = np.array([self.player_rows[player_id] for player_id in player_ids], dtype=np.intp)
+        player_values = self.values[self.stat_columns[stat_name], rows]
+        is_known = ~np.isnan(player_values) & (np.arange(player_values.shape[1]) < self.lengths[rows][:, None])
+        latest_entries = player_values.shape[1] - 1 - np.argmax(is_known[:, ::-1], axis=1) if player_values.shape[1] else np.zeros(len(rows), dtype=np.intp)
+        latest = np.where(is_known.any(axis=1), player_values[np.arange(len(rows)), latest_entries], np.nan) if len(rows) else []
+        return dict(zip(player_ids, np.asarray(latest).tolist()))
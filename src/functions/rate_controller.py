@@ -0,0 +1,212 @@
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from urllib.parse import urlparse
+
+import aiohttp
+
+from src.config import config
+
+class AdaptiveRateController:
+    """
+    Adaptive concurrency limit for one host, shared by every client (sync requests on any thread, or aiohttp coroutines) talking to it.
+
+    The limit grows by one after a full window of healthy responses and is cut multiplicatively on a 429, 5xx or connection error (at most once
+    per cooldown, so a burst of throttled responses that were already in flight only counts once). A Retry-After header pauses
+    new requests to the host until it has passed. Every cut is kept in throttle_events.
+    """
+
+    def __init__(self, host: str, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 32, decrease_factor: float = 0.5,
+                 decrease_cooldown: float = 5.0, max_retries: int = 3, backoff_base: float = 1.0, backoff_cap: float = 60.0):
+        self.host = host
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.in_flight = 0
+        self.resume_at = 0
+        self.throttle_events = []
+        self._healthy_streak = 0
+        self._last_decrease = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def concurrency(self):
+        return int(self.limit)
+
+    #========================== Slot acquisition ==========================
+
+    def _hand_out_slots(self):
+        """
+        Give freed capacity to waiters in arrival order, whether they are threads (a threading.Event) or coroutines (a (loop, future)
+        pair), so neither kind can starve the other. Caller holds the lock.
+        """
+        while self._waiters and self.in_flight < self.concurrency:
+            waiter = self._waiters.popleft()
+            self.in_flight += 1
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                loop, future = waiter
+                loop.call_soon_threadsafe(self._resolve_waiter, future)
+
+    def _resolve_waiter(self, future):
+        if future.cancelled():
+            self.release() # The slot was handed to a coroutine that has since been cancelled
+        else:
+            future.set_result(None)
+
+    def acquire(self):
+        with self._lock:
+            if self.in_flight < self.concurrency and not self._waiters:
+                self.in_flight += 1
+                waiter = None
+            else:
+                waiter = threading.Event()
+                self._waiters.append(waiter)
+        if waiter is not None:
+            waiter.wait()
+        pause = self.resume_at - time.time()
+        if pause > 0:
+            time.sleep(pause)
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_flight < self.concurrency and not self._waiters:
+                self.in_flight += 1
+                waiter = None
+            else:
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+        if waiter is not None:
+            future = waiter[1]
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._lock:
+                    still_queued = waiter in self._waiters
+                    if still_queued:
+                        self._waiters.remove(waiter)
+                if not still_queued and future.done() and not future.cancelled():
+                    self.release() # The slot was handed over just before the cancellation
+                raise
+        pause = self.resume_at - time.time()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._hand_out_slots()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot_async(self):
+        await self.acquire_async()
+        try:
+            yield
+        finally:
+            self.release()
+
+    #========================== Feedback ==========================
+
+    @staticmethod
+    def is_throttle(status: int):
+        return status is None or status == 429 or status >= 500
+
+    def record(self, status: int, retry_after: str = None):
+        """
+        Feed a response status back into the controller.
+
+        Parameters:
+        - status (int): HTTP status code of the response, or None if the request failed to connect / timed out
+        - retry_after (str): Retry-After header of the response, if any
+
+        Returns:
+        - bool: True if the response was a throttle (429, 5xx or connection error) worth retrying.
+        """
+        with self._lock:
+            if not self.is_throttle(status):
+                self._healthy_streak += 1
+                if self._healthy_streak >= self.concurrency and self.limit < self.max_limit:
+                    self.limit = min(self.max_limit, self.limit + 1)
+                    self._healthy_streak = 0
+                    self._hand_out_slots()
+                return False
+
+            now = time.time()
+            self._healthy_streak = 0
+            if retry_after and retry_after.isdigit():
+                self.resume_at = max(self.resume_at, now + int(retry_after))
+            if now - self._last_decrease >= self.decrease_cooldown:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                self._last_decrease = now
+                self.throttle_events.append({"time": now, "status": status, "limit": self.concurrency})
+        return True
+
+    def backoff_delay(self, attempt: int):
+        ceiling = min(self.backoff_cap, self.backoff_base * 2 ** attempt)
+        return random.uniform(ceiling / 2, ceiling)
+
+    def describe(self):
+        return f"{self.host}: concurrency {self.concurrency} (max {self.max_limit}), {self.in_flight} in flight, {len(self.throttle_events)} throttle event(s)"
+
+#================================================================================================================================================================
+#========================================================================= REGISTRY =============================================================================
+#================================================================================================================================================================
+
+_rate_controllers = {}
+_registry_lock = threading.Lock()
+
+def grab_rate_controller(host_or_url: str):
+    """
+    Return the controller shared by everything talking to a host, creating it from config.RATE_CONTROL on first use.
+
+    Parameters:
+    - host_or_url (str): Host name (e.g. 'understat.com') or any url on that host
+
+    Returns:
+    - AdaptiveRateController
+    """
+    host = urlparse(host_or_url).hostname if "://" in host_or_url else host_or_url
+    with _registry_lock:
+        if host not in _rate_controllers:
+            _rate_controllers[host] = AdaptiveRateController(host, **{**config.RATE_CONTROL["default"], **config.RATE_CONTROL.get(host, {})})
+        return _rate_controllers[host]
+
+def describe_rate_controllers():
+    with _registry_lock:
+        return "; ".join(controller.describe() for controller in _rate_controllers.values())
+
+def record_requests_response(response, *args, **kwargs):
+    """requests response hook feeding every response of a session into its host's controller."""
+    grab_rate_controller(response.url).record(response.status_code, response.headers.get('Retry-After'))
+
+def build_aiohttp_trace_config():
+    """aiohttp trace config feeding every response of a session into its host's controller."""
+    async def on_request_end(session, trace_config_ctx, params):
+        grab_rate_controller(params.url.host).record(params.response.status, params.response.headers.get('Retry-After'))
+
+    async def on_request_exception(session, trace_config_ctx, params):
+        grab_rate_controller(params.url.host).record(None)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
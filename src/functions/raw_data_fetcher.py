@@ -3,14 +3,18 @@ import os
 sys.path.append(os.path.abspath('..'))
 from src.config import config
 from src.functions.data_exporter import output_data_to_json, grab_path_relative_to_root
-from src.functions.helper_utils import initialize_local_data
+from src.functions.helper_utils import initialize_local_data, run_coroutine_sync
+from src.functions.api_cache import APIResponseCache, RequestCoalescer
+from src.functions.rate_controller import grab_rate_controller, build_aiohttp_trace_config
+from src.functions.data_indexes import BootstrapIndex
 
-import requests
 import json
 import os
+import random
 import pandas as pd
 
 from tqdm.notebook import tqdm_notebook
+from collections import defaultdict, Counter
 from datetime import datetime, timezone
 from dateutil import parser
 
@@ -18,31 +22,59 @@ import asyncio
 import aiohttp
 # from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
 from understat import Understat
-from understatapi import UnderstatClient
+from understat.constants import BASE_URL as UNDERSTAT_BASE_URL
 
 '''
 TIPS:
 async used for aynchronous fns which are recommended for http requests
-In order to use data WITHIN this same chain that is formed from asynchronous counterparts, it is recommended
-to use synchronous contexts to run compile these kinds of data. These cases we use asyncio.run()
-This allows for async contexts to be used synchronously, e,g, i can now use raw_data throughout
+Independent fetch stages are scheduled concurrently on ONE event loop per construction (see FPLFetcher._initialize_async), and blocking
+requests calls are moved onto worker threads with asyncio.to_thread so they overlap with the aiohttp crawls.
+To use async contexts synchronously (e.g. from __init__), use run_coroutine_sync() from helper_utils rather than asyncio.run(), which
+fails inside Jupyter's already running loop. This allows for async contexts to be used synchronously, e,g, i can now use raw_data throughout
 '''
 
 class FPLFetcher:
+    LIVE_MARKET_FIELDS = ('value', 'transfers_balance', 'transfers_in', 'transfers_out') # History fields the event/{gw}/live/ payload does not carry
+
     def __init__(self):
         print("Fetching data from FPL API.")
         self.base_url = config.BASE_URL
-        self.raw_data, self.season_year_span_id = self._process_raw_data()
+        self.api_cache = self._initialize_api_cache()
+        self.request_memo = RequestCoalescer(config.RUN_MEMOIZED_ENDPOINTS)
+        self.raw_element_summary = {}
+        self._bootstrap_index = None
+        run_coroutine_sync(self._initialize_async())
+        self.api_cache.save_index()
+
+    @property
+    def bootstrap_index(self):
+        """BootstrapIndex of self.raw_data, rebuilt only when raw_data has been replaced by a new bootstrap payload."""
+        if self._bootstrap_index is None or not self._bootstrap_index.is_built_from(self.raw_data):
+            self._bootstrap_index = BootstrapIndex(self.raw_data)
+        return self._bootstrap_index
+
+    async def _initialize_async(self):
+        """
+        Populate the fetcher's attributes, running fetch stages concurrently wherever they do not depend on each other:
+        - Stage 1: bootstrap-static, fixtures and the local config
+        - Stage 2 (needs stage 1): rivals, personal FPL data, beacon/league ownership and element summaries
+        Time-to-ready is therefore close to the slowest stage of each group rather than the sum of all of them.
+        """
+        (self.raw_data, self.season_year_span_id), self.fixtures, self.config_data = await asyncio.gather(
+            asyncio.to_thread(self._process_raw_data),
+            asyncio.to_thread(self._fetch_fixtures),
+            asyncio.to_thread(self._get_config_data),
+        )
         self.latest_gw = self._get_latest_gameweek()
         self.player_ids = self._grab_player_ids()
-        self.raw_element_summary = {}
-        self.config_data = self._get_config_data()
-        self.rival_ids = self._fetch_rivals_based_on_pts()
-        self.raw_personal_fpl_data = self._fetch_personal_fpl_data()
-        self.fixtures = self._fetch_fixtures()
         # self.blanks, self.dgws = self.look_for_blanks_and_dgws()
-        self.rival_stats = self._tabulate_rival_stats(self._get_beacon_ids())
-        self.full_element_summary = asyncio.run(self._compile_master_element_summary())
+
+        self.rival_ids, self.raw_personal_fpl_data, (self.rival_id_data, self.rival_stats, self.league_data), self.full_element_summary = await asyncio.gather(
+            asyncio.to_thread(self._fetch_rivals_based_on_pts),
+            asyncio.to_thread(self._fetch_personal_fpl_data),
+            self._compile_ownership_data(),
+            self._compile_element_summary_from_event_live() if config.MASTER_SUMMARY_SOURCE == "event_live" else self._compile_master_element_summary(),
+        )
 
     def _process_raw_data(self):
         raw_data = self.fetch_data_from_api('bootstrap-static/')
@@ -93,15 +125,23 @@ class FPLFetcher:
     def _fetch_fixtures(self):
         return self.fetch_data_from_api('fixtures/')
 
+    def _initialize_api_cache(self):
+        cache_settings = config.API_CACHE
+        return APIResponseCache(
+            grab_path_relative_to_root("cached_data/http_cache", absolute=True, create_if_nonexistent=True),
+            ttls=cache_settings["ttls"],
+            default_ttl=cache_settings["default_ttl"],
+            max_entries=cache_settings["max_entries"],
+            offline=cache_settings["offline"],
+            pool_maxsize=cache_settings["pool_maxsize"],
+            request_timeout=cache_settings["request_timeout"],
+        )
+
     def fetch_data_from_api(self, endpoint):
         url = f'{self.base_url}{endpoint}'
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-        # async with aiohttp.ClientSession() as session:
-        #     async with session.get(url) as response:
-        #         data = await response.json()
-        #         return data
+        if self.request_memo.handles(endpoint):
+            return self.request_memo.fetch(endpoint, lambda: self.api_cache.fetch(endpoint, url))
+        return self.api_cache.fetch(endpoint, url)
     
     def get_season_year_span(self, raw_data):
         datetime_strings = [x['deadline_time'] for x in raw_data['events']]
@@ -145,8 +185,8 @@ class FPLFetcher:
         Returns:
         - overall FPL rank
         """
-        r = self.fetch_fpl_data(ID)
-        return r["general_info"]["summary_overall_rank"]
+        r = self.fetch_data_from_api(f"entry/{ID}")
+        return r["summary_overall_rank"]
 
     def fetch_player_fpl_name(self, ID):
         """
@@ -158,25 +198,116 @@ class FPLFetcher:
         Returns:
         - FPL Account Name
         """
-        r = self.fetch_fpl_data(ID)["general_info"]
+        r = self.fetch_data_from_api(f"entry/{ID}")
         first_name = r["player_first_name"]
         last_name = r["player_last_name"]
         return f"{first_name} {last_name}"
     
+    def _open_crawler_session(self):
+        """
+        Reset the crawl-wide retry budget, and open a pooled aiohttp session for a crawl whose responses feed the FPL rate controller.
+
+        Returns:
+        - aiohttp.ClientSession: Session to be used as an async context manager for the duration of the crawl.
+        """
+        crawler_settings = config.ELEMENT_SUMMARY_CRAWLER
+        self._crawler_retries_left = crawler_settings["retry_budget"]
+        connector = aiohttp.TCPConnector(limit=crawler_settings["connection_limit"])
+        timeout = aiohttp.ClientTimeout(total=crawler_settings["request_timeout"])
+        return aiohttp.ClientSession(connector=connector, timeout=timeout, headers={'Accept': 'application/json'}, trace_configs=[build_aiohttp_trace_config()])
+
     async def _compile_master_element_summary(self):
+        """
+        Crawl element summaries for every player over one pooled aiohttp session, capping the number of requests in flight.
+        Players that still fail after their retries are left out of the output and recorded in self.failed_element_summary_ids.
+
+        Returns:
+        - dict: Element summary per player ID, sorted by ID.
+        """
+        self.failed_element_summary_ids = []
+        semaphore = asyncio.Semaphore(config.ELEMENT_SUMMARY_CRAWLER["max_concurrency"])
+        summary_fingerprints = self._grab_element_summary_fingerprints()
+        stored_summaries = self._load_element_summary_store(summary_fingerprints)
+
         full_element_summary = {}
-        async def fetch_all_summaries():
-            async with aiohttp.ClientSession() as session:
-                tasks = [self.fetch_gameweek_player_data(player_id,session) for player_id in sorted(self.player_ids)]
-                gameweek_histories = await asyncio.gather(*tasks)
-            for player_num, player_id in enumerate(tqdm_notebook(sorted(self.player_ids), desc="Building element summaries")):
-                try:
-                    player_data = gameweek_histories[player_num]
-                    full_element_summary[player_id] = player_data
-                except Exception as e:
-                    print(f"Error with element summary building for ID {player_id}: {e}")
-        asyncio.run(fetch_all_summaries())
-        return full_element_summary
+        async with self._open_crawler_session() as session:
+            async def crawl_player(player_id):
+                async with semaphore:
+                    return player_id, await self.fetch_gameweek_player_data(player_id, session)
+
+            tasks = [crawl_player(player_id) for player_id in sorted(self.player_ids)]
+            with tqdm_notebook(total=len(tasks), desc="Building element summaries") as pbar:
+                for completed_task in asyncio.as_completed(tasks):
+                    player_id, player_data = await completed_task
+                    if player_data is None:
+                        self.failed_element_summary_ids.append(player_id)
+                    else:
+                        full_element_summary[player_id] = player_data
+                    pbar.update(1)
+
+        if self.failed_element_summary_ids:
+            self.failed_element_summary_ids.sort()
+            print(f"Element summaries failed for {len(self.failed_element_summary_ids)} player(s): {self.failed_element_summary_ids}")
+            for player_id in self.failed_element_summary_ids:
+                if player_id in stored_summaries: # Fall back to the last synced (possibly stale) summary, it is retried next run
+                    full_element_summary[player_id] = stored_summaries[player_id]["summary"]
+        self._export_element_summary_store(full_element_summary, summary_fingerprints, stored_summaries)
+        return dict(sorted(full_element_summary.items()))
+
+    def _grab_element_summary_fingerprints(self):
+        """
+        Compile, per player, the bootstrap-static fields that move whenever their element summary could have changed, together with
+        the state of their team's fixtures (finished, rescheduled or newly scheduled).
+
+        Returns:
+        - dict: Fingerprint per player ID.
+        """
+        team_fixture_states = defaultdict(list)
+        for fixture_data in self.fixtures:
+            fixture_state = [fixture_data['id'], fixture_data['event'], fixture_data['finished']]
+            team_fixture_states[fixture_data['team_h']].append(fixture_state)
+            team_fixture_states[fixture_data['team_a']].append(fixture_state)
+        return {
+            x['id']: {
+                **{field: x.get(field) for field in config.ELEMENT_SUMMARY_FRESHNESS_FIELDS},
+                'team': x['team'],
+                'team_fixtures': sorted(team_fixture_states[x['team']]),
+            }
+            for x in self.raw_data['elements']
+        }
+
+    def _grab_element_summary_store_path(self):
+        store_path = grab_path_relative_to_root(f"cached_data/fpl/{self.season_year_span_id}", absolute=True, create_if_nonexistent=True)
+        return f"{store_path}/element_summary_store_{self.season_year_span_id}.json"
+
+    def _load_element_summary_store(self, summary_fingerprints: dict):
+        """
+        Load the persisted element summaries and seed self.raw_element_summary with those whose fingerprint is unchanged since the
+        last sync, so that the crawl only requests players whose data could have changed. In offline mode every stored summary is used.
+
+        Parameters:
+        - summary_fingerprints (dict): Output of _grab_element_summary_fingerprints
+
+        Returns:
+        - dict: Every stored entry ({"fingerprint", "summary"}) per player ID, fresh or not.
+        """
+        store_path = self._grab_element_summary_store_path()
+        if not os.path.exists(store_path):
+            return {}
+        with open(store_path, 'r') as file:
+            stored_summaries = {int(player_id): stored_data for player_id, stored_data in json.load(file).items()}
+        fresh_ids = [player_id for player_id, fingerprint in summary_fingerprints.items() if player_id in stored_summaries and (self.api_cache.offline or stored_summaries[player_id]["fingerprint"] == fingerprint)]
+        for player_id in fresh_ids:
+            self.raw_element_summary.setdefault(player_id, stored_summaries[player_id]["summary"])
+        print(f"Reusing {len(fresh_ids)} stored element summaries, refetching {len(summary_fingerprints) - len(fresh_ids)}.")
+        return stored_summaries
+
+    def _export_element_summary_store(self, full_element_summary: dict, summary_fingerprints: dict, stored_summaries: dict):
+        store = dict(stored_summaries)
+        for player_id, player_data in full_element_summary.items():
+            if player_id not in self.failed_element_summary_ids:
+                store[player_id] = {"fingerprint": summary_fingerprints.get(player_id), "summary": player_data}
+        output_data_to_json(store, self._grab_element_summary_store_path())
     
     async def fetch_gameweek_player_data(self, player_id, session):
         if player_id in self.raw_element_summary:
@@ -189,61 +320,333 @@ class FPLFetcher:
         if player_id in self.raw_element_summary:
             return self.raw_element_summary[player_id]
         if session:
-            headers = {'Accept': 'application/json'}
-            async with session.get(f'{config.BASE_URL}/element-summary/{player_id}/', headers=headers) as resp:
-                if resp.status == 200: #Status code implying success
-                    player_data = await resp.json()
-                    return player_data
-                elif resp.status == 429: # Rate limit exceeded, implement backoff
-                    retry_after = int(resp.headers.get('Retry-After', 5))  # Default to 5 seconds
-                    await asyncio.sleep(retry_after)
-                    return await self.fetch_element_summaries(player_id, session)
-                else: # Handle non-200 status code
-                    print(f"Error: {resp.status} - {resp.reason}")
-                    return None
+            player_data = await self._fetch_json_with_backoff(f'element-summary/{player_id}/', session)
+            if player_data is None:
+                return None
         else:
             player_data = self.fetch_data_from_api(f'element-summary/{player_id}/')
         self.raw_element_summary[player_id] = player_data
         return player_data
+
+    async def _fetch_json_with_backoff(self, endpoint: str, session):
+        """
+        Fetch a single endpoint within a slot of the FPL rate controller, retrying on 429s, 5xxs and connection errors with jittered
+        exponential backoff. A Retry-After pauses every request to the host (sync or async) until the window has passed.
+
+        Parameters:
+        - endpoint (str): Endpoint relative to the FPL base url, e.g. 'element-summary/1/'
+        - session (aiohttp.ClientSession): Session opened through _open_crawler_session
+
+        Returns:
+        - dict or None: Parsed payload, or None once retries (or the crawl-wide retry budget) are exhausted, or when offline.
+        """
+        if self.api_cache.offline:
+            return None
+        crawler_settings = config.ELEMENT_SUMMARY_CRAWLER
+        rate_controller = grab_rate_controller(self.base_url)
+        url = f'{self.base_url}{endpoint}'
+        for attempt in range(crawler_settings["max_retries"] + 1):
+            try:
+                async with rate_controller.slot_async():
+                    async with session.get(url) as resp:
+                        if resp.status == 200: #Status code implying success
+                            return await resp.json()
+                        elif rate_controller.is_throttle(resp.status): # Rate limited or server side hiccup, back off and retry
+                            reason = f"{resp.status} - {resp.reason}"
+                        else: # Handle non-retryable status code
+                            print(f"Error: {resp.status} - {resp.reason} ({endpoint})")
+                            return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                reason = repr(e)
+            if attempt == crawler_settings["max_retries"] or self._crawler_retries_left <= 0:
+                print(f"Error: giving up on '{endpoint}' after {attempt + 1} attempt(s) ({reason})")
+                return None
+            self._crawler_retries_left -= 1
+            await asyncio.sleep(self._calculate_backoff_delay(attempt))
+
+    def _calculate_backoff_delay(self, attempt: int):
+        crawler_settings = config.ELEMENT_SUMMARY_CRAWLER
+        ceiling = min(crawler_settings["backoff_cap"], crawler_settings["backoff_base"] * 2 ** attempt)
+        return random.uniform(ceiling / 2, ceiling)
+
+#================================================================================================================================================================
+#=============================================================== BUILD HISTORY FROM EVENT LIVE ==================================================================
+#================================================================================================================================================================
+
+    async def _compile_element_summary_from_event_live(self):
+        """
+        Alternative to the per-player element summary crawl: rebuild every player's 'history' from the bulk event/{gw}/live/ payloads
+        (one request per gameweek) and their upcoming 'fixtures' from self.fixtures, so consumers of full_element_summary are unchanged.
+        Gameweek rows are cached per gameweek and only the latest gameweek (or one whose data had not been checked yet) is refetched.
+
+        NB: The live payload carries no market data. 'value' and the transfer fields are only known for the current gameweek (from
+        bootstrap-static) and are kept in that gameweek's cache when it is refetched later; any other round leaves them as None
+        rather than stamping today's price onto it, so a cold build has them for the current gameweek only.
+
+        Returns:
+        - dict: Element summary per player ID in the same shape as the element-summary/{id}/ endpoint.
+        """
+        live_data_path = grab_path_relative_to_root(f"cached_data/fpl/{self.season_year_span_id}/event_live", absolute=True, create_if_nonexistent=True)
+        started_events = {gw['id']: gw for gw in self.raw_data['events'] if self.latest_gw and gw['id'] <= self.latest_gw}
+
+        gameweek_rows, cached_rows, gameweeks_to_fetch = {}, {}, []
+        for gameweek, event_data in started_events.items():
+            cached_path = f"{live_data_path}/gw_{gameweek}.json"
+            if os.path.exists(cached_path):
+                with open(cached_path, 'r') as file:
+                    cached_gameweek = json.load(file)
+                if gameweek < self.latest_gw and cached_gameweek['data_checked']:
+                    gameweek_rows[gameweek] = cached_gameweek['rows']
+                    continue
+                cached_rows[gameweek] = cached_gameweek['rows']
+            gameweeks_to_fetch.append(gameweek)
+
+        live_payloads = {}
+        if gameweeks_to_fetch:
+            async with self._open_crawler_session() as session:
+                payloads = await asyncio.gather(*[self._fetch_json_with_backoff(f'event/{gameweek}/live/', session) for gameweek in gameweeks_to_fetch])
+            live_payloads = dict(zip(gameweeks_to_fetch, payloads))
+        for gameweek, live_payload in tqdm_notebook(live_payloads.items(), desc="Building history from live gameweeks"):
+            if live_payload is None:
+                print(f"Error: live data for GW {gameweek} could not be fetched, it will be missing from player histories.")
+                continue
+            if gameweek == self.latest_gw:
+                market_data = {x['id']: self._grab_bootstrap_market_data(x) for x in self.raw_data['elements']}
+            else:
+                market_data = {row['element']: {k: row.get(k) for k in self.LIVE_MARKET_FIELDS} for row in cached_rows.get(gameweek, [])}
+            gameweek_rows[gameweek] = self._build_history_rows_from_live(gameweek, live_payload, market_data)
+            output_data_to_json(
+                {"data_checked": started_events[gameweek]['data_checked'], "rows": gameweek_rows[gameweek]},
+                f"{live_data_path}/gw_{gameweek}.json"
+            )
+
+        full_element_summary = {player_id: {'fixtures': [], 'history': [], 'history_past': []} for player_id in sorted(self.player_ids)}
+        for gameweek in sorted(gameweek_rows):
+            for row in gameweek_rows[gameweek]:
+                if row['element'] in full_element_summary:
+                    full_element_summary[row['element']]['history'].append(row)
+
+        upcoming_fixtures_by_team = defaultdict(list)
+        for fixture_data in self.fixtures:
+            if fixture_data['finished']:
+                continue
+            for team_id, is_home in ((fixture_data['team_h'], True), (fixture_data['team_a'], False)):
+                upcoming_fixtures_by_team[team_id].append({
+                    **{k: v for k, v in fixture_data.items() if k in ['id', 'code', 'team_h', 'team_h_score', 'team_a', 'team_a_score', 'event', 'finished', 'minutes', 'provisional_start_time', 'kickoff_time']},
+                    'event_name': f"Gameweek {fixture_data['event']}" if fixture_data['event'] else None,
+                    'is_home': is_home,
+                    'difficulty': fixture_data['team_h_difficulty'] if is_home else fixture_data['team_a_difficulty'],
+                })
+        for player_id, player_data in full_element_summary.items():
+            player_data['fixtures'] = sorted(upcoming_fixtures_by_team[self.bootstrap_index.element(player_id)['team']], key=lambda x: (x['event'] is None, x['event'] or 0, x['kickoff_time'] or ''))
+        return full_element_summary
+
+    @staticmethod
+    def _grab_bootstrap_market_data(element_data: dict):
+        """Market fields of the current gameweek for one bootstrap-static element, named as in element-summary history rows."""
+        return {
+            'value': element_data['now_cost'],
+            'transfers_balance': element_data['transfers_in_event'] - element_data['transfers_out_event'],
+            'transfers_in': element_data['transfers_in_event'],
+            'transfers_out': element_data['transfers_out_event'],
+        }
+
+    @staticmethod
+    def _grab_fixture_sides(fixture_data: dict):
+        """Side ('h' / 'a') of every player listed in a fixture's stats (bps lists everyone who featured), by player ID."""
+        fixture_sides = {}
+        for stat_data in fixture_data.get('stats') or []:
+            for side in ('h', 'a'):
+                for stat_entry in stat_data.get(side, []):
+                    fixture_sides[stat_entry['element']] = side
+        return fixture_sides
+
+    def _build_history_rows_from_live(self, gameweek: int, live_payload: dict, market_data: dict = None):
+        """
+        Convert one event/{gw}/live/ payload into element-summary style history rows, one per player per fixture played.
+        For double gameweeks the stats broken down in 'explain' are split per fixture, while stats only given as a gameweek total
+        (ICT, expected stats, bps, etc.) are attributed to the player's first fixture so that gameweek sums stay correct.
+
+        Each row's side is resolved from the fixture its 'explain' entry points to: from the fixture's stats when the player is
+        listed there, else from the player's current team when it is team_h or team_a. A player who has since moved club and did
+        not feature cannot be placed on a side, so those rows are skipped (and counted) rather than given a wrong opponent.
+
+        Parameters:
+        - gameweek (int): Gameweek the payload belongs to
+        - live_payload (dict): Response of event/{gw}/live/
+        - market_data (dict): 'value' and transfer fields per player ID, left as None for players not in it
+
+        Returns:
+        - list: History rows for all players in the gameweek.
+        """
+        market_data = market_data or {}
+        fixtures_by_id = {x['id']: x for x in self.fixtures}
+        fixture_sides = {}
+        bootstrap_elements = self.bootstrap_index.elements
+
+        history_rows, unresolved_rows = [], 0
+        for live_element in live_payload['elements']:
+            player_id = live_element['id']
+            element_data = bootstrap_elements.get(player_id)
+            fixture_breakdowns = [x for x in live_element['explain'] if x['fixture'] in fixtures_by_id]
+            if element_data is None or not fixture_breakdowns:
+                continue # Player's team blanked, or player no longer listed in bootstrap
+            gameweek_stats = {k: v for k, v in live_element['stats'].items() if k != 'in_dreamteam'}
+            explained_stat_names = {x['identifier'] for fixture_breakdown in fixture_breakdowns for x in fixture_breakdown['stats']}
+            player_market_data = market_data.get(player_id) or {}
+            for fixture_num, fixture_breakdown in enumerate(sorted(fixture_breakdowns, key=lambda x: fixtures_by_id[x['fixture']]['kickoff_time'] or '')):
+                fixture_data = fixtures_by_id[fixture_breakdown['fixture']]
+                if fixture_data['id'] not in fixture_sides:
+                    fixture_sides[fixture_data['id']] = self._grab_fixture_sides(fixture_data)
+                side = fixture_sides[fixture_data['id']].get(player_id)
+                if side is None and element_data['team'] in (fixture_data['team_h'], fixture_data['team_a']):
+                    side = 'h' if fixture_data['team_h'] == element_data['team'] else 'a'
+                if side is None:
+                    unresolved_rows += 1
+                    continue
+                was_home = side == 'h'
+                if len(fixture_breakdowns) == 1:
+                    fixture_stats = dict(gameweek_stats)
+                else:
+                    explained_stats = {x['identifier']: x['value'] for x in fixture_breakdown['stats']}
+                    fixture_stats = {}
+                    for stat_name, stat_val in gameweek_stats.items():
+                        if stat_name in explained_stat_names:
+                            fixture_stats[stat_name] = explained_stats.get(stat_name, 0)
+                        else:
+                            fixture_stats[stat_name] = stat_val if fixture_num == 0 else "0.0" if isinstance(stat_val, str) else 0
+                    fixture_stats['total_points'] = sum(x['points'] for x in fixture_breakdown['stats'])
+                history_rows.append({
+                    'element': player_id,
+                    'fixture': fixture_data['id'],
+                    'opponent_team': fixture_data['team_a'] if was_home else fixture_data['team_h'],
+                    'total_points': fixture_stats.pop('total_points'),
+                    'was_home': was_home,
+                    'kickoff_time': fixture_data['kickoff_time'],
+                    'team_h_score': fixture_data['team_h_score'],
+                    'team_a_score': fixture_data['team_a_score'],
+                    'round': gameweek,
+                    'modified': False,
+                    **fixture_stats,
+                    **{field: player_market_data.get(field) for field in self.LIVE_MARKET_FIELDS},
+                })
+        if unresolved_rows:
+            print(f"GW {gameweek}: skipped {unresolved_rows} fixture row(s) of players who have since moved club and did not feature.")
+        return history_rows
     
 ##########################################################################################################################
     
-    def _tabulate_rival_stats(self, team_id_list: list):
-        rival_id_data = self.compile_rivals_team(team_id_list)
-        self.rival_id_data = rival_id_data
+#================================================================================================================================================================
+#===================================================================== OWNERSHIP AGGREGATION ====================================================================
+#================================================================================================================================================================
+
+    def _grab_league_definitions(self):
+        pseudo_league_data = [
+            {"name": "beacon_aggregate", "symbol": "☆", "id": None, "custom_info": None},
+            {"name": "beacon_1k", "symbol": "☆₁ₖ", "id": None, "custom_info": {"rank": 1000}},
+            {"name": "beacon_10k", "symbol": "☆₁₀ₖ", "id": None, "custom_info": {"rank": 10000}},
+            {"name": "beacon_100k", "symbol": "☆₁₀₀ₖ", "id": None, "custom_info": {"rank": 100000}}
+        ]
+        specified_league_data = [
+            {
+                "name": str(league_data["id"]),
+                "symbol": league_data["symbol"],
+                "id": league_data["id"],
+                "custom_info": None,
+                }
+            for league_data in self.config_data["fpl_id_data"]["personal_league_ids"]
+        ]
+        return pseudo_league_data, specified_league_data
+
+    async def _compile_ownership_data(self):
+        """
+        Fetch every manager involved in ownership stats (beacons and the rivals of each personal league) concurrently, capped at
+        config.OWNERSHIP_FETCH_CONCURRENCY requests in flight, then build beacon and league ownership from the fetched picks in one pass.
+
+        Returns:
+        - tuple: (rival_id_data, rival_stats, league_data)
+            - rival_id_data (dict): name, points, rank and latest team per beacon ID
+            - rival_stats (dict): unique/similar player IDs across beacon teams and their counts, see _tabulate_rival_stats
+            - league_data (list): league definitions, each with a "summary" of its rivals and per-player ownership counts
+        """
+        semaphore = asyncio.Semaphore(config.OWNERSHIP_FETCH_CONCURRENCY)
+        async def fetch(endpoint):
+            async with semaphore:
+                return await asyncio.to_thread(self.fetch_data_from_api, endpoint)
+
+        beacon_ids = self._get_beacon_ids()
+        personal_fpl_id = self._get_personal_fpl_id()
+        pseudo_league_data, specified_league_data = self._grab_league_definitions()
+
+        #========================== Entry info and league standings ==========================
+        entry_info_ids = list(dict.fromkeys([personal_fpl_id, *beacon_ids]))
+        entry_infos, league_standings = await asyncio.gather(
+            asyncio.gather(*[fetch(f'entry/{manager_id}/') for manager_id in entry_info_ids]),
+            asyncio.gather(*[fetch(f'leagues-classic/{league_data["id"]}/standings/') for league_data in specified_league_data]),
+        )
+        entry_info_by_id = dict(zip(entry_info_ids, entry_infos))
+        personal_info = entry_info_by_id[personal_fpl_id]
+        personal_user_name = f"{personal_info['player_first_name']} {personal_info['player_last_name']}"
+        points_window = 50
+
+        grouped_user_ids_by_league = {}
+        for league_data in pseudo_league_data:
+            if league_data["custom_info"] is not None:
+                grouped_user_ids_by_league[league_data["name"]] = [idx for idx in beacon_ids if entry_info_by_id[idx]["summary_overall_rank"] <= league_data["custom_info"]["rank"]]
+            elif league_data["name"] == "beacon_aggregate":
+                grouped_user_ids_by_league[league_data["name"]] = [idx for idx in beacon_ids]
+        for league_data, league_r in zip(specified_league_data, league_standings):
+            league_players = league_r["standings"]["results"]
+            my_rank, my_points = [(x["rank"], x["total"]) for x in league_players if x["player_name"] == personal_user_name][0]
+            grouped_user_ids_by_league[league_data["name"]] = [x["entry"] for x in league_players if ((x["rank"] < my_rank) or (x["total"] > my_points - points_window and x["rank"] > my_rank))]
+
+        #========================== Latest picks of every involved manager ==========================
+        manager_ids = list(dict.fromkeys([*beacon_ids, *[user_id for user_ids in grouped_user_ids_by_league.values() for user_id in user_ids]]))
+        latest_picks = dict(zip(manager_ids, await asyncio.gather(*[fetch(f"entry/{manager_id}/event/{self.latest_gw}/picks/") for manager_id in manager_ids])))
+        freehit_ids = [manager_id for manager_id, picks in latest_picks.items() if picks['active_chip'] == "freehit"]
+        pre_freehit_picks = dict(zip(freehit_ids, await asyncio.gather(*[fetch(f"entry/{manager_id}/event/{self.latest_gw - 1}/picks/") for manager_id in freehit_ids])))
+        latest_team_ids = {manager_id: [x["element"] for x in picks["picks"]] for manager_id, picks in latest_picks.items()}
+        settled_team_ids = {**latest_team_ids, **{manager_id: [x["element"] for x in picks["picks"]] for manager_id, picks in pre_freehit_picks.items()}}
+
+        #========================== Aggregate ownership ==========================
+        rival_id_data = {
+            beacon_id: {
+                'name': f"{entry_info_by_id[beacon_id]['player_first_name']} {entry_info_by_id[beacon_id]['player_last_name']}",
+                'points': entry_info_by_id[beacon_id]['summary_overall_points'],
+                'rank': entry_info_by_id[beacon_id]['summary_overall_rank'],
+                'team': latest_team_ids[beacon_id],
+            }
+            for beacon_id in beacon_ids
+        }
+        league_data = []
+        for league_info in pseudo_league_data + specified_league_data:
+            user_ids = grouped_user_ids_by_league[league_info["name"]]
+            league_data.append({
+                **league_info,
+                "summary": {
+                    "rivals": user_ids,
+                    "players": dict(Counter(player_id for user_id in user_ids for player_id in settled_team_ids[user_id]))
+                }
+            })
+        return rival_id_data, self._tabulate_rival_stats(rival_id_data), league_data
+
+    def _tabulate_rival_stats(self, rival_id_data: dict):
         list_rival_FPLteam_ids = []
         for rival_id in rival_id_data.keys():
             list_rival_FPLteam_ids.append(rival_id_data[rival_id]['team'])
         similar_ids = list(set.intersection(*map(set,list_rival_FPLteam_ids)))
         all_ids = list(set.union(*map(set,list_rival_FPLteam_ids)))
         unique_ids = list(set(all_ids).difference(similar_ids))
-        id_count = {}
-        for ids in list_rival_FPLteam_ids:
-            for ide in ids:
-                if ide not in id_count.keys():
-                    id_count[ide] = 1
-                else:
-                    id_count[ide] += 1
+        id_count = dict(Counter(ide for ids in list_rival_FPLteam_ids for ide in ids))
         return {'unique_ids': unique_ids, 'similar_ids': similar_ids, 'id_count': id_count}
 
-    def compile_rivals_team(self, team_ids: list):
-        rival_ids_data = {}
-        for team_id in team_ids:
-            r = self.fetch_data_from_api(f'entry/{team_id}/')
-            first_name = r['player_first_name']
-            last_name = r['player_last_name']
-            rival_ids_data[team_id] = {'name': f'{first_name} {last_name}',
-                                  'points': r['summary_overall_points'],
-                                  'rank': r['summary_overall_rank']}
-        for rival_id in rival_ids_data.keys():
-            r = self.fetch_data_from_api(f'entry/{rival_id}/event/{self.latest_gw}/picks/')
-            rival_ids_data[rival_id]['team'] = [i['element'] for i in r['picks']]
-        return rival_ids_data
-
 class UnderstatFetcher():
 
     def __init__(self, fpl_helper_fns, update_and_export_data):
         self.current_szn = "2025"
+        self.season_year_span_id = fpl_helper_fns.season_year_span_id
+        self._understat_player_ingestion = None
+        self._understat_team_ingestion = None
         initialize_local_data(self, [
             {
                 "function": self._fetch_understat_team_data,
@@ -283,26 +686,85 @@ class UnderstatFetcher():
              }
         ], update_and_export_data)
 
+    def _open_understat_session(self, connection_limit: int = 100):
+        """Open an aiohttp session whose responses feed the understat rate controller."""
+        return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=connection_limit), trace_configs=[build_aiohttp_trace_config()])
+
+    async def _request_understat(self, request_fn):
+        """
+        Send one understat request within a slot of the understat rate controller, retrying on connection errors and on error pages
+        (which the understat client surfaces as JSON decode errors) with jittered exponential backoff.
+
+        Parameters:
+        - request_fn (callable): Returns the awaitable of an Understat client call, e.g. lambda: understat.get_player_shots(player_id)
+
+        Returns:
+        - Payload of the call, re-raising its last error once the controller's retries are exhausted.
+        """
+        rate_controller = grab_rate_controller(UNDERSTAT_BASE_URL)
+        for attempt in range(rate_controller.max_retries + 1):
+            try:
+                async with rate_controller.slot_async():
+                    return await request_fn()
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                if attempt == rate_controller.max_retries:
+                    raise
+            await asyncio.sleep(rate_controller.backoff_delay(attempt))
+
 #================================================================================================================================================================
 #================================================================ BUILD UNDERSTAT TEAM DATA =====================================================================
 #================================================================================================================================================================
 
     def _fetch_understat_team_data(self):
-            
-        async def fetch_team_data():
-            async with aiohttp.ClientSession() as session:
+        return self._ingest_understat_team_data()["teams"]
+
+    def _fetch_understat_team_shot_data(self):
+        return self._ingest_understat_team_data()["shots"]
+
+    def _fetch_understat_team_match_data(self):
+        return self._ingest_understat_team_data()["matches"]
+
+    def _ingest_understat_team_data(self):
+        """
+        Fetch the league's teams (with their match history), then every team's stats and results concurrently, all over one
+        pooled session. Runs once per instance and feeds the understat_team_data_raw, understat_team_shot_data_raw and
+        understat_team_match_data_raw attributes.
+
+        Returns:
+        - dict: {"teams": {team_id: {...}}, "shots": {team_id: {...}}, "matches": {team_id: [...]}}
+        """
+        if self._understat_team_ingestion is not None:
+            return self._understat_team_ingestion
+
+        async def ingest_team_data():
+            async with self._open_understat_session(config.UNDERSTAT_TEAM_CONCURRENCY) as session:
                 understat = Understat(session)
-                teams = await understat.get_teams(
+                fetched_team_data = await self._request_understat(lambda: understat.get_teams(
                     league_name='epl', 
                     season=self.current_szn
-                )
-                return teams
-                
-        loop = asyncio.get_event_loop()
-        fetched_team_data = loop.run_until_complete(fetch_team_data())
+                ))
+
+                async def fetch_team_stats_and_results(team_data):
+                    team_stats, team_results = await asyncio.gather(
+                        self._request_understat(lambda: understat.get_team_stats(team_name=team_data["title"], season=self.current_szn)),
+                        self._request_understat(lambda: understat.get_team_results(team_name=team_data["title"], season=self.current_szn)),
+                    )
+                    return int(team_data["id"]), team_stats, team_results
+
+                shot_data, match_data = {}, {}
+                tasks = [fetch_team_stats_and_results(team_data) for team_data in fetched_team_data]
+                with tqdm_notebook(total=len(tasks), desc = "Fetching team shot & match data") as pbar:
+                    for completed_task in asyncio.as_completed(tasks):
+                        team_id, team_stats, team_results = await completed_task
+                        shot_data[team_id] = team_stats
+                        match_data[team_id] = team_results
+                        pbar.update(1)
+                return fetched_team_data, shot_data, match_data
+
+        fetched_team_data, shot_data, match_data = run_coroutine_sync(ingest_team_data())
 
         compiled_team_data = {}
-        for raw_team_data in tqdm_notebook(fetched_team_data, desc = "Fetching team data"):
+        for raw_team_data in fetched_team_data:
             compiled_team_data[raw_team_data["id"]] = raw_team_data.copy()
             temp_data = {}
             for gameweek_data in raw_team_data['history']:
@@ -313,59 +775,9 @@ class UnderstatFetcher():
                     else:
                         temp_data.setdefault(primary_param_name, []).append(primary_param_val)
             compiled_team_data[raw_team_data["id"]]['history'] = temp_data
-        return compiled_team_data
-
-    def _fetch_understat_team_shot_data(self):
-        
-        async def fetch_team_shot_data(team_data, season=self.current_szn):
-            async with aiohttp.ClientSession() as session:
-                understat = Understat(session)
-                player = await understat.get_team_stats(
-                    team_name = team_data["name"],
-                    season = season
-                )
-                return team_data["id"], player
-
-        async def fetch_all_team_shot_data(all_team_data):
-            tasks = [fetch_team_shot_data(team_data) for team_data in all_team_data]
-            results = {}
-            with tqdm_notebook(total=len(all_team_data), desc = "Fetching team shot data") as pbar:
-                for completed_task in asyncio.as_completed(tasks):
-                    team_id, result = await completed_task
-                    results[team_id] = result
-                    pbar.update(1)
-            return results
-        
-        understat_team_identifiers = [{"id": int(x['id']), "name": x['title']} for x in self.understat_team_data_raw.values()]
-        loop = asyncio.get_event_loop()
-        all_team_match_data = loop.run_until_complete(fetch_all_team_shot_data(understat_team_identifiers))
-        return all_team_match_data
 
-    def _fetch_understat_team_match_data(self):
-        
-        async def fetch_team_match_data(team_data, season=self.current_szn):
-            async with aiohttp.ClientSession() as session:
-                understat = Understat(session)
-                player = await understat.get_team_results(
-                    team_name = team_data["name"],
-                    season = season
-                )
-                return team_data["id"], player
-
-        async def fetch_all_team_match_data(all_team_data):
-            tasks = [fetch_team_match_data(team_data) for team_data in all_team_data]
-            results = {}
-            with tqdm_notebook(total=len(all_team_data), desc = "Fetching team match data") as pbar:
-                for completed_task in asyncio.as_completed(tasks):
-                    team_id, result = await completed_task
-                    results[team_id] = result
-                    pbar.update(1)
-            return results
-        
-        understat_team_identifiers = [{"id": int(x['id']), "name": x['title']} for x in self.understat_team_data_raw.values()]
-        loop = asyncio.get_event_loop()
-        all_team_match_data = loop.run_until_complete(fetch_all_team_match_data(understat_team_identifiers))
-        return all_team_match_data
+        self._understat_team_ingestion = {"teams": compiled_team_data, "shots": shot_data, "matches": match_data}
+        return self._understat_team_ingestion
 
 #================================================================================================================================================================
 #================================================================ BUILD UNDERSTAT PLAYER DATA ===================================================================
@@ -374,43 +786,88 @@ class UnderstatFetcher():
     def _fetch_understat_player_data(self):
 
         async def fetch_league_players():
-            async with aiohttp.ClientSession() as session:
+            async with self._open_understat_session() as session:
                 understat = Understat(session)
-                players = await understat.get_league_players(
+                players = await self._request_understat(lambda: understat.get_league_players(
                     league_name='epl', 
                     season=self.current_szn
-                )
+                ))
                 return players
                 
-        loop = asyncio.get_event_loop()
-        return loop.run_until_complete(fetch_league_players())
+        return run_coroutine_sync(fetch_league_players())
 
     def _fetch_understat_player_shot_data(self):
-        player_shot_data = {}
-        
-        with UnderstatClient() as understat:
-            # Get data for all players in the Premier League for the current season
-            league_player_data = understat.league(league="EPL").get_player_data(season=self.current_szn)
-            
-            # Iterate over each player and fetch their shot data
-            for player in tqdm_notebook(league_player_data, desc="Fetching Player Shot Data", unit="player"):
-                player_id = player['id']
-                shots = understat.player(player=player_id).get_shot_data()
-                player_shot_data[player_id] = shots
-        
-        return player_shot_data
+        return self._ingest_understat_player_data()["shots"]
         
     def _fetch_understat_player_match_data(self):
-        player_match_data = {}
-        
-        with UnderstatClient() as understat:
-            # Get data for all players in the Premier League for the current season
-            league_player_data = understat.league(league="EPL").get_player_data(season=self.current_szn)
-            
-            # Iterate over each player and fetch their shot data
-            for player in tqdm_notebook(league_player_data, desc="Fetching Player Match Data", unit="player"):
-                player_id = player['id']
-                shots = understat.player(player=player_id).get_match_data()
-                player_match_data[player_id] = shots
-        
-        return player_match_data
\ No newline at end of file
+        return self._ingest_understat_player_data()["matches"]
+
+    def _ingest_understat_player_data(self):
+        """
+        Fetch shot and match data for every player of the league player list in a single pass, run once per instance and shared
+        by the shot and match attributes. Players are fetched concurrently (config.UNDERSTAT_PLAYER_INGESTION["max_concurrency"]),
+        with both of a player's requests sent together, and progress is checkpointed to disk so an interrupted run resumes
+        where it stopped instead of starting over.
+
+        Returns:
+        - dict: {"shots": {understat_id: [...]}, "matches": {understat_id: [...]}}
+        """
+        if self._understat_player_ingestion is not None:
+            return self._understat_player_ingestion
+
+        ingestion_settings = config.UNDERSTAT_PLAYER_INGESTION
+        checkpoint_dir = grab_path_relative_to_root(f"cached_data/understat/{self.season_year_span_id}/players", absolute=True, create_if_nonexistent=True)
+        checkpoint_path = f"{checkpoint_dir}/player_ingestion_checkpoint.json"
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path, 'r') as file:
+                ingested_data = json.load(file)
+            print(f"Resuming understat player ingestion from checkpoint ({len(ingested_data['shots'])} players already fetched).")
+        else:
+            ingested_data = {"shots": {}, "matches": {}}
+
+        player_ids = [str(x['id']) for x in self.understat_player_data_raw]
+        remaining_ids = [player_id for player_id in player_ids if player_id not in ingested_data["shots"] or player_id not in ingested_data["matches"]]
+        failed_ids = []
+
+        async def ingest_remaining_players():
+            semaphore = asyncio.Semaphore(ingestion_settings["max_concurrency"])
+            async with self._open_understat_session(ingestion_settings["max_concurrency"]) as session:
+                understat = Understat(session)
+
+                async def ingest_player(player_id):
+                    async with semaphore:
+                        try:
+                            shots, matches = await asyncio.gather(
+                                self._request_understat(lambda: understat.get_player_shots(player_id)),
+                                self._request_understat(lambda: understat.get_player_matches(player_id)),
+                            )
+                            return player_id, shots, matches
+                        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                            print(f"Error: giving up on understat player {player_id} ({e!r})")
+                            return player_id, None, None
+
+                with tqdm_notebook(total=len(remaining_ids), desc="Fetching Player Shot & Match Data", unit="player") as pbar:
+                    for completed_num, completed_task in enumerate(asyncio.as_completed([ingest_player(player_id) for player_id in remaining_ids]), start=1):
+                        player_id, shots, matches = await completed_task
+                        if shots is None:
+                            failed_ids.append(player_id)
+                        else:
+                            ingested_data["shots"][player_id] = shots
+                            ingested_data["matches"][player_id] = matches
+                        if completed_num % ingestion_settings["checkpoint_every"] == 0:
+                            output_data_to_json(ingested_data, checkpoint_path)
+                        pbar.update(1)
+
+        if remaining_ids:
+            try:
+                run_coroutine_sync(ingest_remaining_players())
+            except BaseException:
+                output_data_to_json(ingested_data, checkpoint_path) # Keep whatever was fetched before the interruption
+                raise
+        if failed_ids:
+            output_data_to_json(ingested_data, checkpoint_path)
+            print(f"Understat ingestion failed for {len(failed_ids)} player(s), rerun to resume: {sorted(failed_ids, key=int)}")
+        elif os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self._understat_player_ingestion = {kind: {player_id: kind_data[player_id] for player_id in player_ids if player_id in kind_data} for kind, kind_data in ingested_data.items()}
+        return self._understat_player_ingestion
@@ -0,0 +1,128 @@
+import numpy as np
+
+class TeamHistoryStore:
+    """
+    Array-backed view of the per-match history of understat teams: a single teams x matches x metrics float64 array (NaN padded
+    past each team's last match) with dict-valued fields such as ppda expanded into one metric per sub-field (ppda_att, ppda_def),
+    plus the number of matches of each team. Matches are in the order understat lists them, oldest first.
+
+    Prefix sums over the match axis are computed once, so the sum and average of any metric over any lookback window is two array
+    reads per team and metric, and a whole sweep of lookbacks is a single vectorized gather.
+    """
+
+    def __init__(self, team_ids: list, team_titles: list, metric_names: list, values: np.ndarray, lengths: np.ndarray):
+        self.team_ids = team_ids
+        self.team_titles = team_titles
+        self.metric_names = metric_names
+        self.values = values
+        self.lengths = lengths
+        self.team_rows = {team_id: row for row, team_id in enumerate(team_ids)}
+        self.metric_columns = {metric_name: col for col, metric_name in enumerate(metric_names)}
+        self.prefix_sums = np.zeros((values.shape[0], values.shape[1] + 1, values.shape[2]))
+        np.cumsum(np.nan_to_num(values), axis=1, out=self.prefix_sums[:, 1:])
+
+    @staticmethod
+    def _expand_history(history):
+        """
+        Parameters:
+        - history (list or dict): A team's history either as understat sends it (one dict per match) or as flattened by
+                                  UnderstatFetcher._ingest_understat_team_data (one list per field, dict fields already expanded)
+
+        Returns:
+        - dict: One list of values per field, dict-valued fields expanded to "{field}_{sub_field}".
+        """
+        if isinstance(history, dict):
+            return history
+        expanded_history = {}
+        for match_data in history:
+            for field_name, field_value in match_data.items():
+                if isinstance(field_value, dict): # For ppda where values are dicts
+                    for sub_name, sub_value in field_value.items():
+                        expanded_history.setdefault(f"{field_name}_{sub_name}", []).append(sub_value)
+                else:
+                    expanded_history.setdefault(field_name, []).append(field_value)
+        return expanded_history
+
+    @classmethod
+    def from_team_data(cls, team_data: dict):
+        """
+        Parameters:
+        - team_data (dict): understat team data per team ID, as returned by UnderstatFetcher._fetch_understat_team_data
+
+        Returns:
+        - TeamHistoryStore: Store of every history field whose values are all numeric (e.g. h_a, result and date are left out).
+        """
+        histories = [cls._expand_history(x['history']) for x in team_data.values()]
+        non_numeric_metrics = set()
+        metric_names = []
+        for history in histories:
+            for metric_name, metric_values in history.items():
+                if metric_name in non_numeric_metrics:
+                    continue
+                if not all(isinstance(x, (int, float)) and not isinstance(x, bool) for x in metric_values):
+                    non_numeric_metrics.add(metric_name)
+                elif metric_name not in metric_names:
+                    metric_names.append(metric_name)
+        metric_names = [metric_name for metric_name in metric_names if metric_name not in non_numeric_metrics]
+
+        lengths = np.array([max(map(len, history.values()), default=0) for history in histories], dtype=np.int32)
+        max_matches = int(lengths.max()) if len(lengths) else 0
+        values = np.full((len(histories), max_matches, len(metric_names)), np.nan)
+        for row, history in enumerate(histories):
+            for col, metric_name in enumerate(metric_names):
+                metric_values = history.get(metric_name)
+                if metric_values:
+                    values[row, :len(metric_values), col] = metric_values
+        team_ids = [x['id'] for x in team_data.values()]
+        team_titles = [x['title'] for x in team_data.values()]
+        return cls(team_ids, team_titles, metric_names, values, lengths)
+
+    def __contains__(self, team_id):
+        return team_id in self.team_rows
+
+    def has_metric(self, metric_name: str):
+        return metric_name in self.metric_columns
+
+    def window_starts(self, look_backs):
+        """
+        Parameters:
+        - look_backs (int or array-like): Number of most recent matches to keep, 0 for all of them
+
+        Returns:
+        - tuple: (starts, counts), each shaped look_backs' shape + (teams,): the first match of every team's window and its number of matches.
+        """
+        look_backs = np.abs(np.asarray(look_backs, dtype=np.int64))[..., None]
+        starts = np.where(look_backs > 0, np.maximum(0, self.lengths - look_backs), 0)
+        return starts, self.lengths - starts
+
+    def window_sums(self, look_backs, metric_names: list = None):
+        """
+        Sum of metrics over each team's most recent matches.
+
+        Parameters:
+        - look_backs (int or array-like): Number of most recent matches to keep, 0 for all of them; an array sweeps every lookback at once
+        - metric_names (list): Metrics to sum, all of them by default
+
+        Returns:
+        - np.ndarray: Sums shaped look_backs' shape + (teams, metrics).
+        """
+        cols = [self.metric_columns[x] for x in metric_names] if metric_names is not None else slice(None)
+        starts, _ = self.window_starts(look_backs)
+        rows = np.arange(len(self.team_ids))
+        return self.prefix_sums[rows, self.lengths][..., cols] - self.prefix_sums[rows, starts][..., cols]
+
+    def window_averages(self, look_backs, metric_names: list = None):
+        """Average of metrics over each team's most recent matches, shaped as window_sums; NaN for teams without a match."""
+        _, counts = self.window_starts(look_backs)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.window_sums(look_backs, metric_names) / counts[..., None]
+
+    def history(self, team_id, metric_name: str, look_back: int = 0):
+        """
+        Returns:
+        - np.ndarray: View of the team's values of the metric over their most recent look_back matches (all of them for 0), oldest first.
+        """
+        row = self.team_rows[team_id]
+        length = self.lengths[row]
+        start = max(0, length - abs(look_back)) if look_back else 0
+        return self.values[row, start:length, self.metric_columns[metric_name]]
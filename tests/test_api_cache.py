@@ -0,0 +1,50 @@
+import os
+import json
+
+from src.functions.api_cache import APIResponseCache
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200, headers=None):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+def build_cache(cache_dir, responses, **kwargs):
+    cache = APIResponseCache(str(cache_dir), ttls={}, default_ttl=300, **kwargs)
+    sent = []
+    def fake_get(url, headers=None, timeout=None):
+        sent.append(url)
+        return responses[url]
+    cache.session.get = fake_get
+    return cache, sent
+
+def test_cache_hits_do_not_rewrite_the_index_until_it_is_saved(tmp_path):
+    cache, sent = build_cache(tmp_path, {'https://example.com/a/': FakeResponse({'a': 1}, headers={'ETag': 'x'})})
+    assert cache.fetch('a/', 'https://example.com/a/') == {'a': 1}
+    assert cache.fetch('a/', 'https://example.com/a/') == {'a': 1}
+    assert sent == ['https://example.com/a/']
+    assert not os.path.exists(cache.index_path)
+
+    cache.save_index()
+    with open(cache.index_path, 'r') as file:
+        assert json.load(file)['a/']['etag'] == 'x'
+    assert not [x for x in os.listdir(tmp_path) if x.endswith('.tmp')]
+
+    reloaded_cache, resent = build_cache(tmp_path, {}, offline=True)
+    assert reloaded_cache.fetch('a/', 'https://example.com/a/') == {'a': 1}
+    assert resent == []
+
+def test_eviction_persists_the_index_without_the_evicted_entries(tmp_path):
+    responses = {f'https://example.com/{x}/': FakeResponse({'id': x}) for x in 'abc'}
+    cache, _ = build_cache(tmp_path, responses, max_entries=2)
+    for x in 'abc':
+        cache.fetch(f'{x}/', f'https://example.com/{x}/')
+    with open(cache.index_path, 'r') as file:
+        assert sorted(json.load(file)) == ['b/', 'c/']
+    assert not os.path.exists(cache._grab_payload_path('a/'))
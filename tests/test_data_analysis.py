@@ -0,0 +1,87 @@
+import sys
+import importlib
+
+import numpy as np
+import pytest
+
+import src.functions.generated_helper_fns as generated_helper_fns
+from src.functions.generated_helper_fns import FPLDataConsolidationInterpreter
+from src.functions.player_store import PlayerStatStore
+from src.functions.fixture_calendar import FixtureCalendar
+from src.functions.elo_engine import BatchEloEngine, IncrementalEloTracker
+
+LATEST_GW = 3
+LAST_GW = 8
+
+@pytest.fixture
+def data_analysis(monkeypatch):
+    """data_analysis with its module-level helpers left unbuilt (building them fetches from the FPL API)."""
+    monkeypatch.setattr(generated_helper_fns, 'FPLDataConsolidationInterpreter', lambda: None)
+    sys.modules.pop('src.functions.data_analysis', None)
+    yield importlib.import_module('src.functions.data_analysis')
+    sys.modules.pop('src.functions.data_analysis', None)
+
+def build_fixtures():
+    fixtures = []
+    for gameweek in range(1, LAST_GW + 1):
+        team_h, team_a = (1, 2) if gameweek % 2 else (2, 1)
+        is_finished = gameweek <= LATEST_GW
+        fixtures.append({'id': gameweek, 'event': gameweek, 'kickoff_time': f"2025-08-{10 + gameweek}T14:00:00Z", 'team_h': team_h, 'team_a': team_a,
+                         'team_h_difficulty': 2, 'team_a_difficulty': 4, 'team_h_score': gameweek % 3 if is_finished else None,
+                         'team_a_score': 1 if is_finished else None, 'finished': is_finished})
+    return fixtures
+
+def build_master_summary(fixtures, player_teams):
+    master_summary = {}
+    for player_id, team_id in player_teams.items():
+        played = [x for x in fixtures if x['finished']]
+        master_summary[player_id] = {
+            'web_name': f"Player {player_id}", 'team': team_id, 'team_short_name': f"T{team_id}", 'pos_singular_name_short': 'MID',
+            'round': [x['event'] for x in played],
+            'fixture': [(x['event'], x['id']) for x in played],
+            'was_home': [(x['event'], x['team_h'] == team_id) for x in played],
+            'opponent_team': [(x['event'], x['team_a'] if x['team_h'] == team_id else x['team_h']) for x in played],
+            'team_h_score': [(x['event'], x['team_h_score']) for x in played],
+            'team_a_score': [(x['event'], x['team_a_score']) for x in played],
+            'total_points': [(x['event'], float(player_id + x['event'])) for x in played],
+        }
+    return master_summary
+
+def build_analytics(data_analysis, player_teams_in_store, player_teams):
+    fixtures = build_fixtures()
+    helper_fns = object.__new__(FPLDataConsolidationInterpreter)
+    helper_fns.raw_data = {
+        'elements': [{'id': player_id, 'team': team_id} for player_id, team_id in player_teams.items()],
+        'teams': [{'id': 1, 'name': 'One'}, {'id': 2, 'name': 'Two'}],
+        'element_types': [],
+    }
+    helper_fns._bootstrap_index = None
+    helper_fns.latest_gw = LATEST_GW
+    helper_fns.fdr_data = {1: 3, 2: 3}
+    helper_fns.master_summary = build_master_summary(fixtures, player_teams_in_store)
+    helper_fns.player_stat_store = PlayerStatStore.from_master_summary(helper_fns.master_summary)
+    helper_fns.fixture_calendar = FixtureCalendar(fixtures, [1, 2], LAST_GW)
+
+    analytics = object.__new__(data_analysis.FPLDataAnalytics)
+    analytics.helper_fns = helper_fns
+    analytics.elo_engine = BatchEloEngine()
+    all_rows = np.arange(len(helper_fns.player_stat_store.player_ids))
+    analytics.elo_tracker = IncrementalEloTracker(helper_fns.player_stat_store, helper_fns.grab_history_fdr_matrix(all_rows), engine=analytics.elo_engine)
+    analytics.elo_tracker.advance(LATEST_GW)
+    return analytics
+
+def test_prospects_keep_players_missing_from_the_stat_store(data_analysis):
+    # Player 30's element summary was not fetched, so they are in bootstrap but not in master_summary
+    analytics = build_analytics(data_analysis, {10: 1, 20: 2}, {10: 1, 20: 2, 30: 1})
+    df = analytics.apply_scores_and_compile_prospects([10, 30, 20, 10], lookback_period=2)
+
+    assert df['player_id'].tolist() == [20, 10, 30]
+    assert df.loc[df['player_id'] != 30, 'elo_form_score_pres'].notna().all()
+    assert df.loc[df['player_id'] == 30, ['elo_form_score_pres', 'elo_form_score_hist', 'elo_form_score_net']].isna().all(axis=None)
+    assert df['fixture_score'].notna().all()
+
+def test_fixture_scoring_accepts_an_empty_id_list(data_analysis):
+    analytics = build_analytics(data_analysis, {10: 1}, {10: 1})
+    future_data = analytics._compile_future_fixture_arrays([], games_ahead=4)
+    assert future_data['is_home'].shape == (0, 4) and future_data['fdr'].shape == (0, 4)
+    assert analytics.score_players_on_fixtures([], 4) == {}
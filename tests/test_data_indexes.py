@@ -0,0 +1,15 @@
+from src.functions.data_indexes import BootstrapIndex
+
+RAW_DATA = {
+    'elements': [{'id': 1, 'web_name': 'Raya', 'team': 1, 'element_type': 1}, {'id': 2, 'web_name': 'Saka', 'team': 1, 'element_type': 3}],
+    'teams': [{'id': 1, 'name': 'Arsenal', 'short_name': 'ARS'}],
+    'element_types': [{'id': 1, 'singular_name_short': 'GKP'}, {'id': 3, 'singular_name_short': 'MID'}],
+}
+
+def test_player_position_resolves_through_the_bootstrap_index():
+    bootstrap_index = BootstrapIndex(RAW_DATA)
+    positions = {player_id: bootstrap_index.position(bootstrap_index.element(player_id)['element_type'])['singular_name_short'] for player_id in (1, 2)}
+    assert positions == {1: 'GKP', 2: 'MID'}
+    assert bootstrap_index.team_by_name('Arsenal')['short_name'] == 'ARS'
+    assert bootstrap_index.position(99) is None
+    assert bootstrap_index.is_built_from(RAW_DATA) and not bootstrap_index.is_built_from(dict(RAW_DATA))
@@ -0,0 +1,238 @@
+import numpy as np
+import pytest
+
+from src.functions.elo_engine import BatchEloEngine, IncrementalEloTracker, gather_windows
+from src.functions.player_store import PlayerStatStore
+
+#==================================================================================================================================
+#====================================================== SCALAR REFERENCE ==========================================================
+#==================================================================================================================================
+
+# Round-by-round form Elo of a single player, as FPLDataAnalytics computed it before BatchEloEngine
+
+def _calculate_expected_score(player_score, average_score):
+    """Calculate the expected score based on player's score and average score."""
+    return player_score / average_score
+
+def _bin_score(score):
+    """Bin the score into categories."""
+    if score < 4:
+        return 1  # Bad
+    elif 4 <= score <= 6:
+        return 2  # Average
+    elif 7 <= score <= 9:
+        return 3  # Good
+    else:
+        return 4  # Excellent
+
+def _update_elo_with_fdr(current_rating, player_score, average_score, fdr, home_away, k_factor=30, weight=1, adjustment_factor=0):
+    """Update the Elo rating considering Fixture Difficulty Rating (FDR) and home/away status."""
+    expected_score = _calculate_expected_score(player_score, average_score)
+
+    # Determine home/away factor
+    home_away_factor = 0 if home_away == 1 else 200 if home_away == 0 else 0
+
+    # Calculate FDR adjustment
+    fdr_adjustment = _calculate_fdr_adjustment(fdr, home_away_factor)
+
+    # Update new rating with both adjustments
+    new_rating = current_rating + k_factor * (player_score - expected_score) * weight + adjustment_factor + fdr_adjustment
+    return new_rating
+
+def _calculate_fdr_adjustment(fdr, home_away_factor=0, base_adjustment=20):
+    """
+    Calculate the adjustment factor based on Fixture Difficulty Rating (FDR).
+
+    Parameters:
+    - fdr: The Fixture Difficulty Rating for the upcoming fixture.
+    - home_away_factor: Adjustment based on whether the match is home or away.
+    - base_adjustment: The base adjustment value to apply (default is 5).
+
+    Returns:
+    - adjustment: The calculated adjustment factor based on FDR.
+    """
+    # Adjustments can be positive or negative based on FDR and home/away factor
+    adjustment = base_adjustment * (fdr - 3) + home_away_factor
+    return adjustment
+
+def _calculate_current_elo(scores, average_scores, fdrs, h_a, initial_rating):
+    """Calculate the current Elo rating based on scores from all rounds."""
+    weights = [2.5, 2.0, 1.5, 1.0, 0.8, 0.5]
+
+    current_rating = initial_rating
+    adjustment_factor = 0
+    consecutive_bad_count = 0
+    consecutive_good_count = 0
+    # print(f"{scores} {average_scores}")
+    for i in range(len(scores)):
+        player_score = scores[i]
+        weight = weights[i] if i < len(weights) else 0.5  # Default weight for older scores
+
+        # Determine the bin of the current score
+        current_bin = _bin_score(player_score)
+
+        # Adjust adjustment factor based on current bin
+        if current_bin == 1:
+            # Increment consecutive bad count and apply negative adjustment
+            consecutive_bad_count += 1
+            if consecutive_bad_count >= 2: consecutive_good_count = 0
+            # Penalty increases with consecutive bad scores; more for recent ones
+            penalty = (-1*4**consecutive_bad_count) * (1 + (len(scores) - i) / len(scores))  # More penalty for recent bad scores
+            adjustment_factor += penalty
+
+        elif current_bin == 2:
+            # Reset consecutive bad count and increase good count
+            consecutive_bad_count = 0
+            consecutive_good_count += 1
+
+            # Increase bonus for good performances (average)
+            adjustment_factor += min(2**consecutive_good_count, 2000)  # Cap bonus to +20
+
+        elif current_bin == 3:
+            # Reset bad count and increase good count
+            consecutive_bad_count = 0
+            consecutive_good_count += 1
+
+            # Increase bonus for excellent performances
+            adjustment_factor += min(4**consecutive_good_count, 2000)  # Cap bonus to +30
+
+        elif current_bin == 4:
+            # Reset bad count and increase good count
+            consecutive_bad_count = 0
+            consecutive_good_count += 1
+
+            # Increase bonus for excellent performances
+            adjustment_factor += min(8**consecutive_good_count, 2000)  # Cap bonus to +30
+
+        current_rating = _update_elo_with_fdr(current_rating, player_score, average_scores[i], fdrs[i], h_a[i], weight=weight, adjustment_factor=adjustment_factor)
+
+    return current_rating
+
+#==================================================================================================================================
+#=========================================================== FIXTURES =============================================================
+#==================================================================================================================================
+
+@pytest.fixture
+def player_histories():
+    """Padded players x rounds points, FDRs and home/away flags, with histories of varied length (including empty)."""
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(0, 39, size=60)
+    lengths[:3] = (0, 1, 38)
+    width = int(lengths.max())
+    in_history = np.arange(width) < lengths[:, None]
+    points = np.where(in_history, rng.integers(-2, 20, size=(len(lengths), width)), np.nan)
+    fdrs = np.where(in_history, rng.integers(1, 6, size=(len(lengths), width)), 0)
+    h_a = np.where(in_history, rng.integers(0, 2, size=(len(lengths), width)), np.nan)
+    return points, fdrs, h_a, lengths
+
+#==================================================================================================================================
+#============================================================ TESTS ===============================================================
+#==================================================================================================================================
+
+@pytest.mark.parametrize("lookback_period", [0, 3, 6, 40])
+def test_batch_rate_matches_scalar_reference_over_lookback_windows(player_histories, lookback_period):
+    points, fdrs, h_a, lengths = player_histories
+    split = lengths - lookback_period
+    split = np.where(split >= 0, split, np.maximum(0, lengths + split))
+    present_lengths = lengths - split
+
+    ratings = BatchEloEngine().rate(
+        gather_windows(points, split, present_lengths),
+        6,
+        gather_windows(fdrs, split, present_lengths, fill_value=0),
+        gather_windows(h_a, split, present_lengths),
+        present_lengths,
+        500
+    )
+    for row in range(len(lengths)):
+        window = slice(split[row], lengths[row])
+        expected = _calculate_current_elo(points[row, window], [6] * present_lengths[row], fdrs[row, window], h_a[row, window], 500)
+        assert ratings[row] == expected
+
+#==================================================================================================================================
+#===================================================== INCREMENTAL TRACKER ========================================================
+#==================================================================================================================================
+
+NUM_GAMEWEEKS = 12
+
+def build_master_summary(player_ids, seed=1):
+    """Fake master_summary with blank gameweeks, doubles and late joiners, as built by FPLRawDataCompiler._build_master_summary."""
+    rng = np.random.default_rng(seed)
+    master_summary = {}
+    for player_id in player_ids:
+        first_gw = int(rng.integers(1, 5))
+        rounds = [gw for gw in range(first_gw, NUM_GAMEWEEKS + 1) if rng.random() > 0.15 for _ in range(2 if rng.random() < 0.1 else 1)]
+        master_summary[player_id] = {
+            'web_name': f"Player {player_id}", 'team': 1, 'team_short_name': 'ABC', 'pos_singular_name_short': 'MID',
+            'round': rounds,
+            'total_points': [(gw, int(rng.integers(-2, 16))) for gw in rounds],
+            'was_home': [(gw, bool(rng.integers(0, 2))) for gw in rounds],
+        }
+    return master_summary
+
+def build_fdr_matrix(player_stat_store, seed=2):
+    rng = np.random.default_rng(seed)
+    in_history = np.arange(player_stat_store.rounds.shape[1]) < player_stat_store.lengths[:, None]
+    return np.where(in_history, rng.integers(1, 6, size=in_history.shape), 0)
+
+def recompute_ratings(player_stat_store, fdr_matrix, entry_counts):
+    """Ratings over each player's first entry_counts entries, replaying them all with BatchEloEngine.rate."""
+    starts = np.zeros(len(entry_counts), dtype=np.int64)
+    return BatchEloEngine().rate(
+        gather_windows(player_stat_store.stat_matrix('total_points'), starts, entry_counts),
+        6,
+        gather_windows(fdr_matrix, starts, entry_counts, fill_value=0),
+        gather_windows(player_stat_store.stat_matrix('was_home'), starts, entry_counts),
+        entry_counts,
+        500
+    )
+
+def entries_up_to(player_stat_store, gameweek):
+    in_history = np.arange(player_stat_store.rounds.shape[1]) < player_stat_store.lengths[:, None]
+    return (in_history & (player_stat_store.rounds <= gameweek)).sum(axis=1)
+
+@pytest.fixture
+def tracked_store():
+    player_stat_store = PlayerStatStore.from_master_summary(build_master_summary(range(1, 41)))
+    return player_stat_store, build_fdr_matrix(player_stat_store)
+
+def test_advance_checkpoints_match_a_full_recompute(tracked_store):
+    player_stat_store, fdr_matrix = tracked_store
+    tracker = IncrementalEloTracker(player_stat_store, fdr_matrix)
+    for gameweek in (3, 4, 9, NUM_GAMEWEEKS):
+        tracker.advance(gameweek)
+    for gameweek in range(NUM_GAMEWEEKS + 1):
+        expected = recompute_ratings(player_stat_store, fdr_matrix, entries_up_to(player_stat_store, gameweek))
+        np.testing.assert_allclose(tracker.ratings(gameweek), expected, rtol=1e-11)
+
+    entry_counts = np.random.default_rng(3).integers(0, player_stat_store.lengths + 1)
+    rows = np.arange(len(player_stat_store.player_ids))
+    np.testing.assert_allclose(tracker.ratings_over_first_entries(rows, entry_counts), recompute_ratings(player_stat_store, fdr_matrix, entry_counts), rtol=1e-11)
+
+def test_saved_state_reloads_and_keeps_advancing(tracked_store, tmp_path):
+    player_stat_store, fdr_matrix = tracked_store
+    file_path = str(tmp_path / "elo_state.npz")
+    tracker = IncrementalEloTracker(player_stat_store, fdr_matrix)
+    tracker.advance(6)
+    tracker.save(file_path)
+
+    reloaded_tracker = IncrementalEloTracker.load(file_path, player_stat_store, fdr_matrix)
+    assert reloaded_tracker.latest_gameweek == 6
+    np.testing.assert_array_equal(reloaded_tracker.ratings(), tracker.ratings())
+    reloaded_tracker.advance(NUM_GAMEWEEKS)
+    expected = recompute_ratings(player_stat_store, fdr_matrix, player_stat_store.lengths)
+    np.testing.assert_allclose(reloaded_tracker.ratings(), expected, rtol=1e-11)
+
+    # A store with the players in another order plus a newcomer is realigned by player ID, the newcomer starting from scratch
+    reordered_master_summary = {**build_master_summary([99], seed=4), **dict(reversed(build_master_summary(range(1, 41)).items()))}
+    reordered_store = PlayerStatStore.from_master_summary(reordered_master_summary)
+    reordered_fdr_matrix = build_fdr_matrix(reordered_store)
+    for row, player_id in enumerate(reordered_store.player_ids.tolist()):
+        if player_id in player_stat_store:
+            reordered_fdr_matrix[row] = 0
+            reordered_fdr_matrix[row, :fdr_matrix.shape[1]] = fdr_matrix[player_stat_store.player_rows[player_id]]
+    realigned_tracker = IncrementalEloTracker.load(file_path, reordered_store, reordered_fdr_matrix)
+    assert realigned_tracker.latest_gameweek == 6
+    realigned_tracker.advance(NUM_GAMEWEEKS)
+    expected = recompute_ratings(reordered_store, reordered_fdr_matrix, reordered_store.lengths)
+    np.testing.assert_allclose(realigned_tracker.ratings(), expected, rtol=1e-11)
@@ -0,0 +1,59 @@
+from src.functions.raw_data_fetcher import FPLFetcher
+
+FIXTURES = [
+    {'id': 10, 'event': 5, 'kickoff_time': '2025-09-20T11:30:00Z', 'team_h': 1, 'team_a': 2, 'team_h_score': 2, 'team_a_score': 1,
+     'stats': [{'identifier': 'bps', 'h': [{'element': 100, 'value': 30}, {'element': 200, 'value': 12}], 'a': []}]},
+    {'id': 11, 'event': 5, 'kickoff_time': '2025-09-23T19:00:00Z', 'team_h': 3, 'team_a': 1, 'team_h_score': 0, 'team_a_score': 0,
+     'stats': [{'identifier': 'bps', 'h': [], 'a': [{'element': 100, 'value': 8}]}]},
+]
+
+RAW_DATA = {
+    'elements': [
+        {'id': 100, 'team': 1, 'now_cost': 80, 'transfers_in_event': 50, 'transfers_out_event': 20},
+        {'id': 200, 'team': 4, 'now_cost': 55, 'transfers_in_event': 5, 'transfers_out_event': 9}, # Moved from team 1, featured in fixture 10
+        {'id': 300, 'team': 4, 'now_cost': 45, 'transfers_in_event': 0, 'transfers_out_event': 0}, # Moved from team 3, did not feature
+    ],
+    'teams': [{'id': x, 'name': f"Team {x}"} for x in (1, 2, 3, 4)],
+    'element_types': [],
+}
+
+def build_live_element(player_id, gameweek_stats, fixture_breakdowns):
+    return {
+        'id': player_id,
+        'stats': {**gameweek_stats, 'in_dreamteam': False},
+        'explain': [{'fixture': fixture_id, 'stats': [{'identifier': k, 'points': points, 'value': v} for k, (v, points) in stats.items()]} for fixture_id, stats in fixture_breakdowns],
+    }
+
+LIVE_PAYLOAD = {'elements': [
+    build_live_element(100, {'minutes': 180, 'goals_scored': 1, 'total_points': 9, 'bps': 38, 'ict_index': '12.3'},
+                       [(11, {'minutes': (90, 2)}), (10, {'minutes': (90, 2), 'goals_scored': (1, 5)})]),
+    build_live_element(200, {'minutes': 90, 'goals_scored': 0, 'total_points': 2, 'bps': 12, 'ict_index': '3.1'}, [(10, {'minutes': (90, 2)})]),
+    build_live_element(300, {'minutes': 0, 'goals_scored': 0, 'total_points': 0, 'bps': 0, 'ict_index': '0.0'}, [(11, {'minutes': (0, 0)})]),
+]}
+
+def build_fetcher():
+    fetcher = object.__new__(FPLFetcher)
+    fetcher.fixtures = FIXTURES
+    fetcher.raw_data = RAW_DATA
+    fetcher._bootstrap_index = None
+    return fetcher
+
+def test_double_gameweek_is_split_per_fixture_with_sides_from_the_fixture():
+    fetcher = build_fetcher()
+    market_data = {100: fetcher._grab_bootstrap_market_data(RAW_DATA['elements'][0])}
+    rows = [x for x in fetcher._build_history_rows_from_live(5, LIVE_PAYLOAD, market_data) if x['element'] == 100]
+
+    assert [(x['fixture'], x['was_home'], x['opponent_team']) for x in rows] == [(10, True, 2), (11, False, 3)]
+    assert [x['total_points'] for x in rows] == [7, 2]
+    assert [x['goals_scored'] for x in rows] == [1, 0]
+    assert [x['minutes'] for x in rows] == [90, 90]
+    assert [x['bps'] for x in rows] == [38, 0] # Gameweek-only stats go to the first fixture
+    assert [x['ict_index'] for x in rows] == ['12.3', '0.0']
+    assert all(x['value'] == 80 and x['transfers_balance'] == 30 for x in rows)
+
+def test_players_who_moved_club_keep_their_side_or_are_skipped():
+    rows = build_fetcher()._build_history_rows_from_live(5, LIVE_PAYLOAD)
+    moved_rows = [x for x in rows if x['element'] == 200]
+    assert [(x['fixture'], x['was_home'], x['opponent_team']) for x in moved_rows] == [(10, True, 2)]
+    assert not [x for x in rows if x['element'] == 300]
+    assert all(x[field] is None for x in rows for field in FPLFetcher.LIVE_MARKET_FIELDS) # Never stamped from today's bootstrap
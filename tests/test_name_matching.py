@@ -0,0 +1,26 @@
+from src.functions.name_matching import PlayerNameMatcher
+
+FPL_PLAYERS = [
+    {'id': 1, 'team': 1, 'web_name': 'B.Williams', 'first_name': 'Brandon', 'second_name': 'Williams'},
+    {'id': 2, 'team': 1, 'web_name': 'R.Williams', 'first_name': 'Rhys', 'second_name': 'Williams'},
+    {'id': 3, 'team': 2, 'web_name': 'Haaland', 'first_name': 'Erling', 'second_name': 'Haaland'},
+]
+
+def test_narrow_lead_lowers_confidence_below_score():
+    matcher = PlayerNameMatcher(FPL_PLAYERS, min_score=0.5, min_margin=0.05, confident_margin=0.2)
+    matches, ambiguous = matcher.match([
+        {'id': 10, 'name': 'Erling Haaland', 'team_ids': [2]},
+        {'id': 11, 'name': 'Bran Williams', 'team_ids': [1]},
+    ])
+    assert not ambiguous
+    assert matches[10]['fpl_id'] == 3 and matches[10]['confidence'] == matches[10]['score'] == 1.0
+    assert matches[11]['fpl_id'] == 1 and matches[11]['confidence'] < matches[11]['score']
+
+def test_most_confident_claim_wins_and_the_other_is_left_for_review():
+    matcher = PlayerNameMatcher(FPL_PLAYERS, min_score=0.5, min_margin=0.05, confident_margin=0.2)
+    matches, ambiguous = matcher.match([
+        {'id': 10, 'name': 'Brandon Williams', 'team_ids': [1]},
+        {'id': 11, 'name': 'Bran Williams', 'team_ids': [1]},
+    ])
+    assert matches[10]['fpl_id'] == 1
+    assert [x['fpl_id'] for x in ambiguous[11]] == [1]
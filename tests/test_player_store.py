@@ -0,0 +1,34 @@
+import numpy as np
+
+from src.functions.player_store import PlayerRecord, PlayerStatStore
+
+def build_master_summary():
+    static_data = {'web_name': 'Saka', 'team': 1, 'team_short_name': 'ARS', 'pos_singular_name_short': 'MID'}
+    return {
+        7: {**static_data, 'round': [1, 2, 2, 4], 'total_points': [(1, 2.0), (2, 9.0), (2, 1.0), (4, 6.0)],
+            'value': [(1, None), (2, None), (2, 101.0), (4, None)], 'kickoff_time': [(1, 'a'), (2, 'b'), (2, 'c'), (4, 'd')]},
+        8: {**static_data, 'web_name': 'Rice', 'round': [3], 'total_points': [(3, 3.0)], 'value': [(3, None)], 'kickoff_time': [(3, 'e')]},
+    }
+
+def test_none_values_are_stored_as_nan_and_skipped_by_latest_values():
+    player_stat_store = PlayerStatStore.from_master_summary(build_master_summary())
+    assert player_stat_store.has_stat('value') and not player_stat_store.has_stat('kickoff_time')
+    np.testing.assert_array_equal(player_stat_store.stat(7, 'value'), [np.nan, np.nan, 101.0, np.nan])
+    latest_values = player_stat_store.latest_values('value', [7, 8, 9])
+    assert latest_values[7] == 101.0 and np.isnan(latest_values[8]) and 9 not in latest_values
+    assert player_stat_store.records[7].value == 10.1
+
+def test_export_reopens_as_a_read_only_memmap(tmp_path):
+    player_stat_store = PlayerStatStore.from_master_summary(build_master_summary())
+    player_stat_store.export(str(tmp_path), 'player_stat_store')
+    reopened_store = PlayerStatStore.from_memmap(str(tmp_path), 'player_stat_store')
+    assert isinstance(reopened_store.values, np.memmap) and not reopened_store.values.flags.writeable
+    assert sorted(x.name for x in tmp_path.iterdir()) == ['player_stat_store.dat', 'player_stat_store.json']
+    assert reopened_store.stat_names == player_stat_store.stat_names
+    for player_id in (7, 8):
+        for stat_name in player_stat_store.stat_names:
+            np.testing.assert_array_equal(reopened_store.stat(player_id, stat_name), player_stat_store.stat(player_id, stat_name))
+            np.testing.assert_array_equal(reopened_store.stat(player_id, stat_name, 2), player_stat_store.stat(player_id, stat_name, 2))
+        np.testing.assert_array_equal(reopened_store.player_rounds(player_id), player_stat_store.player_rounds(player_id))
+        assert all(getattr(reopened_store.records[player_id], x) == getattr(player_stat_store.records[player_id], x) for x in PlayerRecord.STATIC_FIELDS)
+    assert reopened_store.records[7].value == 10.1
@@ -0,0 +1,57 @@
+import time
+import asyncio
+import threading
+
+from src.functions.rate_controller import AdaptiveRateController
+
+def test_sync_acquire_is_served_in_arrival_order_among_async_waiters():
+    controller = AdaptiveRateController("example.com", initial_limit=1, max_limit=1)
+    order = []
+
+    def sync_worker():
+        with controller.slot():
+            order.append("sync")
+            time.sleep(0.01)
+
+    async def async_worker(name):
+        async with controller.slot_async():
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def wait_for_waiters(count):
+        while len(controller._waiters) < count:
+            await asyncio.sleep(0.001)
+
+    async def scenario():
+        await controller.acquire_async()
+        early_tasks = [asyncio.create_task(async_worker(f"async-{i}")) for i in range(3)]
+        await wait_for_waiters(3)
+        sync_thread = threading.Thread(target=sync_worker)
+        sync_thread.start()
+        await wait_for_waiters(4)
+        late_tasks = [asyncio.create_task(async_worker(f"async-{i}")) for i in range(3, 6)]
+        await wait_for_waiters(7)
+        controller.release()
+        await asyncio.gather(*early_tasks, *late_tasks)
+        await asyncio.to_thread(sync_thread.join)
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=10))
+    assert order == ["async-0", "async-1", "async-2", "sync", "async-3", "async-4", "async-5"]
+    assert controller.in_flight == 0
+
+def test_cancelled_async_waiter_gives_up_its_place():
+    controller = AdaptiveRateController("example.com", initial_limit=1, max_limit=1)
+
+    async def scenario():
+        await controller.acquire_async()
+        waiting_task = asyncio.create_task(controller.acquire_async())
+        while not controller._waiters:
+            await asyncio.sleep(0.001)
+        waiting_task.cancel()
+        await asyncio.gather(waiting_task, return_exceptions=True)
+        assert not controller._waiters
+        controller.release()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert controller.in_flight == 0
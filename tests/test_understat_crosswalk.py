@@ -0,0 +1,14 @@
+import json
+
+from src.functions.data_indexes import UnderstatCrosswalk
+
+def test_crosswalk_translates_both_ways_after_a_json_round_trip():
+    crosswalk = UnderstatCrosswalk(
+        team_data=[{"fpl": {"id": 1, "name": "Arsenal"}, "understat": {"id": 83, "name": "Arsenal"}}],
+        player_data=[{"fpl": {"id": 2, "name": "Saka"}, "understat": {"id": 7322, "name": "Bukayo Saka"}}],
+    )
+    reloaded_crosswalk = UnderstatCrosswalk.from_dict(json.loads(json.dumps(crosswalk.to_dict())))
+    for lookup in (crosswalk, reloaded_crosswalk):
+        assert lookup.player_understat_id(2) == 7322 and lookup.player_fpl_id("7322") == 2
+        assert lookup.team_understat_id(1) == 83 and lookup.team_understat_name(1) == "Arsenal" and lookup.team_fpl_id(83) == 1
+        assert lookup.player_understat_id(3) is None
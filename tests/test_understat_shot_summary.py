@@ -0,0 +1,26 @@
+import json
+
+from src.functions.data_builder import UnderstatRawDataCompiler
+
+def build_shot(match_id, result, shot_type, date="2025-08-23 15:00:00"):
+    return {'id': '1', 'minute': '10', 'result': result, 'X': '0.9', 'Y': '0.5', 'xG': '0.3', 'shotType': shot_type, 'match_id': match_id,
+            'h_team': f"H{match_id}", 'a_team': f"A{match_id}", 'date': date, 'h_goals': '1', 'a_goals': '0'}
+
+def test_shot_summary_is_keyed_by_int_and_survives_a_json_round_trip():
+    compiler = object.__new__(UnderstatRawDataCompiler)
+    compiler.raw_data_fpl = {'events': [{'deadline_time': '2025-08-15T17:30:00Z'}]}
+    compiler.understat_player_shot_data = {
+        7: [build_shot('1', 'Goal', 'Head'), build_shot('1', 'MissedShots', 'RightFoot'), build_shot('2', 'SavedShot', 'LeftFoot')],
+        9: [build_shot('3', 'MissedShots', 'RightFoot'), build_shot('0', 'Goal', 'Head', date="2024-05-19 15:00:00")],
+    }
+    compiler.understat_player_shot_facts = compiler._build_understat_player_shot_facts()
+    shot_summary = compiler._compile_understat_player_shot_data()
+
+    assert sorted(shot_summary) == [7, 9]
+    match_summaries = {x['match_id']: x for x in shot_summary[7]}
+    assert match_summaries['1']['Goal'] == 1 and match_summaries['1']['Head'] == 1
+    assert match_summaries['2']['Goal'] == 0 and match_summaries['2']['Head'] is None
+    assert [x['match_id'] for x in shot_summary[9]] == ['3'] # Shots before the season start are left out
+
+    cached_shot_summary = json.loads(json.dumps(shot_summary, allow_nan=False))
+    assert compiler._key_by_fpl_player_id(cached_shot_summary) == compiler._key_by_fpl_player_id(shot_summary)